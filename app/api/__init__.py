@@ -1,3 +1,3 @@
-from . import auth, products, alerts, monitor
+from . import auth, products, alerts, monitor, dashboard, events, metrics, profiles
 
-__all__ = ["auth", "products", "alerts", "monitor"]
+__all__ = ["auth", "products", "alerts", "monitor", "dashboard", "events", "metrics", "profiles"]
@@ -1,14 +1,19 @@
+import uuid
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
-from app.domain import User, Product, PriceAlert
-from app.domain.schemas import PriceAlertCreate, PriceAlertResponse
+from app.core.serialization import FastJSONResponse, columns_for, response_fields, serialize_rows
+from app.domain import User, Product, PriceAlert, NotificationOutbox
+from app.domain.schemas import PriceAlertCreate, PriceAlertGroupCreate, PriceAlertResponse
 
 router = APIRouter(prefix="/alerts", tags=["Price Alerts"])
 
+ALERT_FIELDS = response_fields(PriceAlertResponse)
+ALERT_COLUMNS = columns_for(PriceAlert, PriceAlertResponse)
+
 
 @router.post("/", response_model=PriceAlertResponse, status_code=status.HTTP_201_CREATED)
 async def create_alert(
@@ -32,7 +37,10 @@ async def create_alert(
     db_alert = PriceAlert(
         user_id=current_user.id,
         product_id=alert_data.product_id,
-        target_price=alert_data.target_price
+        rule_type=alert_data.rule_type,
+        target_price=alert_data.target_price,
+        threshold=alert_data.threshold,
+        window_days=alert_data.window_days
     )
     
     db.add(db_alert)
@@ -42,7 +50,47 @@ async def create_alert(
     return db_alert
 
 
-@router.get("/", response_model=List[PriceAlertResponse])
+@router.post("/group", response_model=List[PriceAlertResponse], status_code=status.HTTP_201_CREATED)
+async def create_alert_group(
+    alert_data: PriceAlertGroupCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Create one rule over several products; it fires once, for the first product that matches"""
+    product_ids = list(dict.fromkeys(alert_data.product_ids))
+    owned = db.query(Product.id).filter(
+        Product.id.in_(product_ids),
+        Product.user_id == current_user.id
+    ).count()
+    
+    if owned != len(product_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    
+    group_id = uuid.uuid4().hex
+    alerts = [
+        PriceAlert(
+            user_id=current_user.id,
+            product_id=product_id,
+            rule_type=alert_data.rule_type,
+            target_price=alert_data.target_price,
+            threshold=alert_data.threshold,
+            window_days=alert_data.window_days,
+            group_id=group_id
+        )
+        for product_id in product_ids
+    ]
+    
+    db.add_all(alerts)
+    db.commit()
+    
+    # One query for the whole group rather than a refresh per alert
+    return db.query(PriceAlert).filter(PriceAlert.group_id == group_id).order_by(PriceAlert.id).all()
+
+
+@router.get("/", response_model=List[PriceAlertResponse], response_class=FastJSONResponse)
 async def list_alerts(
     skip: int = 0,
     limit: int = 100,
@@ -51,13 +99,13 @@ async def list_alerts(
     db: Session = Depends(get_db)
 ):
     """List all alerts for current user"""
-    query = db.query(PriceAlert).filter(PriceAlert.user_id == current_user.id)
+    query = db.query(*ALERT_COLUMNS).filter(PriceAlert.user_id == current_user.id)
     
     if active_only:
         query = query.filter(PriceAlert.is_active == True)
     
-    alerts = query.offset(skip).limit(limit).all()
-    return alerts
+    rows = query.order_by(PriceAlert.id).offset(skip).limit(limit).all()
+    return FastJSONResponse(serialize_rows(ALERT_FIELDS, rows))
 
 
 @router.delete("/{alert_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -78,5 +126,9 @@ async def delete_alert(
             detail="Alert not found"
         )
     
+    # Sent or pending notifications outlive the alert
+    db.query(NotificationOutbox).filter(NotificationOutbox.alert_id == alert_id).update(
+        {NotificationOutbox.alert_id: None}, synchronize_session=False
+    )
     db.delete(alert)
     db.commit()
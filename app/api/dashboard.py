@@ -0,0 +1,23 @@
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.security import get_current_active_user
+from app.core.cache import get_redis
+from app.domain import User
+from app.services.archive import ColdArchive, get_cold_archive
+from app.services.dashboard import DashboardService
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+
+@router.get("/")
+async def get_dashboard(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis),
+    archive: Optional[ColdArchive] = Depends(get_cold_archive)
+):
+    """Current price, latest change, stats and sparkline for all user's products"""
+    return DashboardService(db, cache, archive).get_dashboard(current_user.id)
@@ -0,0 +1,58 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import get_current_active_user
+from app.domain import User, Product
+from app.services.events import EventBroker, SubscriberLimitReached, get_event_broker
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+@router.get("/stream")
+async def stream_events(
+    product_ids: Optional[List[int]] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    broker: EventBroker = Depends(get_event_broker)
+):
+    """
+    Server-sent events for the user's products (all of them by default):
+    `price_update` when a new price is recorded and `alert_triggered` when
+    an alert fires.
+    """
+    if product_ids:
+        owned = db.query(Product.id).filter(
+            Product.user_id == current_user.id,
+            Product.id.in_(product_ids)
+        ).all()
+        if len(owned) != len(set(product_ids)):
+            raise HTTPException(status_code=404, detail="Product not found")
+    
+    user_id = current_user.id
+    # The stream can stay open for hours; give the connection back to the pool now
+    db.close()
+    
+    try:
+        subscriber = await broker.subscribe(user_id, product_ids)
+    except SubscriberLimitReached:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event subscribers, try again later"
+        )
+    
+    async def frames():
+        try:
+            async for frame in subscriber.frames_until_closed(settings.EVENTS_HEARTBEAT_SECONDS):
+                yield frame
+        finally:
+            await broker.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.core.cache import get_redis
+from app.core.http_cache import cached_product_response
+from app.core.serialization import FastJSONResponse, to_json
 from app.domain import User, Product
 from app.services.monitor import PriceMonitorService
+from app.services.sites import AdapterMetrics, site_registry
 
 router = APIRouter(prefix="/monitor", tags=["Monitoring"])
 
@@ -61,30 +64,66 @@ async def check_all_user_products(
     }
 
 
-@router.get("/stats/{product_id}")
+@router.get("/adapters")
+async def get_adapter_metrics(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get scrape counts, success rate and latency for each site adapter"""
+    return {
+        "adapters": AdapterMetrics().summaries(site_registry.all())
+    }
+
+
+@router.get("/stats")
+async def get_products_stats(
+    product_ids: Optional[List[int]] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis)
+):
+    """Get price statistics for several products (all of the user's by default)"""
+    query = db.query(Product.id).filter(Product.user_id == current_user.id)
+    if product_ids:
+        query = query.filter(Product.id.in_(product_ids))
+    owned_ids = [product_id for (product_id,) in query]
+    
+    monitor = PriceMonitorService(db, cache)
+    stats = monitor.get_price_stats_batch(owned_ids)
+    
+    return {
+        "count": len(stats),
+        "stats": [stats[product_id] for product_id in owned_ids if product_id in stats]
+    }
+
+
+@router.get("/stats/{product_id}", response_class=FastJSONResponse)
 async def get_product_stats(
     product_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
     cache = Depends(get_redis)
 ):
-    """Get price statistics for a product"""
+    """Get price statistics for a product (supports If-None-Match)"""
     # Verify product belongs to user
-    product = db.query(Product).filter(
+    version = db.query(Product.version).filter(
         Product.id == product_id,
         Product.user_id == current_user.id
-    ).first()
+    ).scalar()
     
-    if not product:
+    if version is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    monitor = PriceMonitorService(db, cache)
-    stats = monitor.get_price_stats(product_id)
-    
-    if not stats:
-        raise HTTPException(
-            status_code=404,
-            detail="No price history available for this product"
-        )
+    def build() -> bytes:
+        monitor = PriceMonitorService(db, cache)
+        stats = monitor.get_price_stats(product_id)
+        
+        if not stats:
+            raise HTTPException(
+                status_code=404,
+                detail="No price history available for this product"
+            )
+        
+        return to_json(stats)
     
-    return stats
+    return cached_product_response(request, cache, product_id, version, build)
@@ -1,20 +1,32 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
-from app.domain import User, Product, PriceHistory
+from app.core.cache import get_redis
+from app.core.http_cache import cached_product_response, invalidate_product_responses
+from app.core.serialization import FastJSONResponse, columns_for, response_fields, serialize_row, serialize_rows
+from app.domain import User, Product, PriceHistory, PriceAlert, ProductDailyPrice, ProductPriceAggregate, NotificationOutbox
 from app.domain.schemas import ProductCreate, ProductResponse, ProductUpdate, PriceHistoryResponse
+from app.services.archive import ColdArchive, get_cold_archive
+from app.services.dashboard import invalidate_dashboard
+from app.services.history import PriceHistoryReader
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+PRODUCT_FIELDS = response_fields(ProductResponse)
+PRODUCT_COLUMNS = columns_for(Product, ProductResponse)
+HISTORY_FIELDS = response_fields(PriceHistoryResponse)
+
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis)
 ):
     """Create a new product to monitor"""
     db_product = Product(
@@ -26,11 +38,12 @@ async def create_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    invalidate_dashboard(cache, current_user.id)
     
     return db_product
 
 
-@router.get("/", response_model=List[ProductResponse])
+@router.get("/", response_model=List[ProductResponse], response_class=FastJSONResponse)
 async def list_products(
     skip: int = 0,
     limit: int = 100,
@@ -38,32 +51,45 @@ async def list_products(
     db: Session = Depends(get_db)
 ):
     """List all products for current user"""
-    products = db.query(Product).filter(
+    rows = db.query(*PRODUCT_COLUMNS).filter(
         Product.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).order_by(Product.id).offset(skip).limit(limit).all()
     
-    return products
+    return FastJSONResponse(serialize_rows(PRODUCT_FIELDS, rows))
 
 
-@router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(
-    product_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Get a specific product"""
-    product = db.query(Product).filter(
+def _product_version(db: Session, product_id: int, user_id: int) -> int:
+    """Version of a product owned by the user, or 404"""
+    version = db.query(Product.version).filter(
         Product.id == product_id,
-        Product.user_id == current_user.id
-    ).first()
+        Product.user_id == user_id
+    ).scalar()
     
-    if not product:
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    return product
+    return version
+
+
+@router.get("/{product_id}", response_model=ProductResponse, response_class=FastJSONResponse)
+async def get_product(
+    product_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis)
+):
+    """Get a specific product (supports If-None-Match)"""
+    version = _product_version(db, product_id, current_user.id)
+    
+    def build() -> bytes:
+        row = db.query(*PRODUCT_COLUMNS).filter(Product.id == product_id).one()
+        return serialize_row(PRODUCT_FIELDS, row)
+    
+    return cached_product_response(request, cache, product_id, version, build)
 
 
 @router.patch("/{product_id}", response_model=ProductResponse)
@@ -71,7 +97,8 @@ async def update_product(
     product_id: int,
     product_data: ProductUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis)
 ):
     """Update a product"""
     product = db.query(Product).filter(
@@ -88,9 +115,12 @@ async def update_product(
     update_data = product_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(product, field, value)
+    product.version = Product.version + 1
     
     db.commit()
     db.refresh(product)
+    invalidate_product_responses(cache, product.id)
+    invalidate_dashboard(cache, current_user.id)
     
     return product
 
@@ -99,7 +129,9 @@ async def update_product(
 async def delete_product(
     product_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis),
+    archive: Optional[ColdArchive] = Depends(get_cold_archive)
 ):
     """Delete a product"""
     product = db.query(Product).filter(
@@ -113,32 +145,44 @@ async def delete_product(
             detail="Product not found"
         )
     
-    db.delete(product)
+    # Bulk deletes: db.delete() would load every history row and alert only to orphan them
+    alert_ids = db.query(PriceAlert.id).filter(PriceAlert.product_id == product_id)
+    db.query(NotificationOutbox).filter(NotificationOutbox.alert_id.in_(alert_ids)).update(
+        {NotificationOutbox.alert_id: None}, synchronize_session=False
+    )
+    for model in (PriceHistory, PriceAlert, ProductDailyPrice, ProductPriceAggregate):
+        db.query(model).filter(model.product_id == product_id).delete(synchronize_session=False)
+    # Detached, the instance keeps its attributes like after db.delete()
+    db.expunge(product)
+    db.query(Product).filter(Product.id == product_id).delete(synchronize_session=False)
     db.commit()
+    # Ids can be reused (SQLite), and a new product must not inherit this history
+    if archive:
+        archive.remove(product_id)
+    invalidate_product_responses(cache, product_id)
+    invalidate_dashboard(cache, current_user.id)
 
 
-@router.get("/{product_id}/history", response_model=List[PriceHistoryResponse])
+@router.get("/{product_id}/history", response_model=List[PriceHistoryResponse], response_class=FastJSONResponse)
 async def get_price_history(
     product_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache = Depends(get_redis),
+    archive: Optional[ColdArchive] = Depends(get_cold_archive)
 ):
-    """Get price history for a product"""
-    product = db.query(Product).filter(
-        Product.id == product_id,
-        Product.user_id == current_user.id
-    ).first()
-    
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
+    """Get price history for a product, optionally limited to a time range (supports If-None-Match)"""
+    version = _product_version(db, product_id, current_user.id)
     
-    history = db.query(PriceHistory).filter(
-        PriceHistory.product_id == product_id
-    ).order_by(PriceHistory.timestamp.desc()).offset(skip).limit(limit).all()
+    def build() -> bytes:
+        reader = PriceHistoryReader(db, archive)
+        # Rows come back as (id, product_id, price, timestamp), the schema's field order
+        rows = reader.page(product_id, skip=skip, limit=limit, since=since, until=until)
+        return serialize_rows(HISTORY_FIELDS, rows)
     
-    return history
+    return cached_product_response(request, cache, product_id, version, build)
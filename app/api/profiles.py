@@ -0,0 +1,49 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore, get_profile_store, is_profiling_token
+from app.core.security import get_current_active_user
+from app.domain import User
+
+router = APIRouter(prefix="/profiles", tags=["Profiles"])
+
+
+def require_profiling_token(request: Request, current_user: User = Depends(get_current_active_user)) -> User:
+    """Logged-in user who also sent the profiling token; profiles show other users' requests"""
+    if not is_profiling_token(request.headers.get(settings.PROFILING_HEADER)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling token required"
+        )
+    return current_user
+
+
+@router.get("/", response_model=List[dict])
+def list_profiles(
+    current_user: User = Depends(require_profiling_token),
+    store: ProfileStore = Depends(get_profile_store)
+):
+    """Stored request and task profiles, newest first"""
+    return store.list()
+
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+def get_profile(
+    profile_id: str,
+    current_user: User = Depends(require_profiling_token),
+    store: ProfileStore = Depends(get_profile_store)
+):
+    """A profile in folded-stack format (flamegraph.pl, speedscope, inferno)"""
+    body = store.read(profile_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    
+    return PlainTextResponse(
+        body,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+    )
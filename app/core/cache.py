@@ -1,11 +1,12 @@
 import redis
 import json
-from typing import Optional, Any
+from typing import Any, Optional
 from app.core.config import settings
+from app.core.metrics import metrics
 
 class RedisClient:
-    def __init__(self):
-        self.redis = redis.Redis(
+    def __init__(self, client: Optional[redis.Redis] = None):
+        self.redis = client or redis.Redis(
             host=settings.REDIS_HOST,
             port=settings.REDIS_PORT,
             db=settings.REDIS_DB,
@@ -16,10 +17,12 @@ class RedisClient:
         """Get value from cache"""
         try:
             value = self.redis.get(key)
+            metrics.cache_lookup("get", "hit" if value else "miss")
             if value:
                 return json.loads(value)
             return None
         except Exception as e:
+            metrics.cache_lookup("get", "error")
             print(f"Redis GET error: {e}")
             return None
     
@@ -45,6 +48,40 @@ class RedisClient:
             print(f"Redis DELETE error: {e}")
             return False
     
+    def get_field(self, key: str, field: str) -> Optional[Any]:
+        """Get one field of a cached hash"""
+        try:
+            value = self.redis.hget(key, field)
+            metrics.cache_lookup("get_field", "hit" if value else "miss")
+            if value:
+                return json.loads(value)
+            return None
+        except Exception as e:
+            metrics.cache_lookup("get_field", "error")
+            print(f"Redis HGET error: {e}")
+            return None
+    
+    def set_field(self, key: str, field: str, value: Any, ttl: int = settings.CACHE_TTL_SECONDS) -> bool:
+        """Set one field of a cached hash and refresh the hash's TTL"""
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hset(key, field, json.dumps(value))
+            pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis HSET error: {e}")
+            return False
+    
+    def publish(self, channel: str, message: Any) -> bool:
+        """Publish a JSON message on a pub/sub channel"""
+        try:
+            self.redis.publish(channel, json.dumps(message))
+            return True
+        except Exception as e:
+            print(f"Redis PUBLISH error: {e}")
+            return False
+    
     def exists(self, key: str) -> bool:
         """Check if key exists"""
         try:
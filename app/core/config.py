@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -10,7 +10,18 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./price_monitor.db"
-    
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = True
+
+    # SQLite tuning (applied on every new connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256 MB
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -29,10 +40,90 @@ class Settings(BaseSettings):
     # Scraping
     SCRAPING_INTERVAL_MINUTES: int = 60
     REQUEST_TIMEOUT: int = 30
-    MAX_RETRIES: int = 3
+    MAX_RETRIES: int = 3  # attempts per fetch; only network errors, 429 and 5xx are retried
+    SCRAPER_BACKOFF_SECONDS: float = 1.0  # first retry delay ceiling, doubled per attempt (full jitter)
+    SCRAPER_BACKOFF_MAX_SECONDS: float = 30
+    SCRAPER_RETRY_AFTER_MAX_SECONDS: float = 120  # longer Retry-After opens the domain's breaker instead
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failed fetches before a domain is shed
+    CIRCUIT_RESET_SECONDS: float = 60  # how long a domain stays shed before a probe
+    SCRAPER_MAX_BYTES: int = 2 * 1024 * 1024  # body read per page at most; reading stops early once the price is in
+    SITE_ADAPTERS_FILE: Optional[str] = None  # JSON list of extra site adapters (see app.services.sites)
+    SNAPSHOT_DIR: Optional[str] = None  # keep fetched pages for re-parsing, disabled when unset
+    SNAPSHOT_MAX_BYTES: int = 1024 * 1024 * 1024  # 1 GB of compressed pages, least recently used evicted
+    SCRAPER_KEEPALIVE_SECONDS: float = 30  # idle connections kept open for the next scrape of the same host
+    SCRAPER_WARM_DOMAINS: List[str] = []  # resolved at worker start and pre-connected before each sweep
+    
+    # DNS cache (in process, shared by every scraper)
+    DNS_CACHE_MIN_TTL_SECONDS: float = 5  # record TTLs are honored within these bounds
+    DNS_CACHE_MAX_TTL_SECONDS: float = 3600
+    DNS_CACHE_DEFAULT_TTL_SECONDS: float = 300  # for names answered by the system resolver (no TTL)
+    DNS_LOOKUP_TIMEOUT_SECONDS: float = 5
+    
+    # Headless rendering (only for sites flagged needs_js, after static extraction found no price)
+    RENDER_DOMAINS: List[str] = []  # extra domains to render, besides adapters with "needs_js"
+    RENDER_CONCURRENCY: int = 2  # pages rendered at once per process (one browser context each)
+    RENDER_QUEUE_MAX: int = 20  # render requests waiting for a context before new ones fail fast
+    RENDER_CONTEXT_MAX_USES: int = 50  # pages rendered in a context before it is replaced
+    RENDER_TIMEOUT_SECONDS: float = 20
+    RENDER_BLOCKED_RESOURCES: List[str] = ["image", "font", "media"]
+    
+    # Ingestion pipeline (Redis Streams: fetch -> parse -> persist)
+    PIPELINE_ENABLED: bool = False  # hourly sweep enqueues fetch jobs instead of checking inline
+    PIPELINE_BATCH_SIZE: int = 50  # entries read per XREADGROUP
+    PIPELINE_BLOCK_MS: int = 5000  # how long an idle consumer waits for new entries
+    PIPELINE_MAX_BACKLOG: int = 1000  # a stage pauses while its output stream is longer than this
+    PIPELINE_CLAIM_IDLE_MS: int = 60000  # entries pending this long on a dead consumer are taken over
+    PIPELINE_FETCH_CONCURRENCY: int = 20  # in-flight requests per fetch consumer
+    PIPELINE_PARSE_PROCESSES: Optional[int] = None  # parse pool size, defaults to the CPU count
+    PIPELINE_DEAD_LETTER_MAXLEN: int = 10000
+    
+    # Price history storage
+    HISTORY_PARTITIONS_AHEAD: int = 3  # monthly partitions created in advance (PostgreSQL)
+    RETENTION_BATCH_SIZE: int = 5000  # ids per delete batch
+    RETENTION_PAUSE_SECONDS: float = 0.1  # pause between batches
+    RETENTION_MAX_RUNTIME_SECONDS: int = 600
+    RETENTION_ARCHIVE_DIR: Optional[str] = None  # archive rows here before deleting
+    HOT_HISTORY_DAYS: int = 180  # older rows are moved to the cold archive; retention moves its rows there first
+    COLD_ARCHIVE_DIR: Optional[str] = None  # columnar cold tier, disabled when unset
+    COLD_ARCHIVE_PRICE_SCALE: int = 100  # prices are stored as integer cents
+    
+    # Dashboard
+    DASHBOARD_HISTORY_DAYS: int = 90  # window used for dashboard stats and sparklines
+    DASHBOARD_SPARKLINE_POINTS: int = 30
+    
+    # Notifications (outbox dispatcher)
+    NOTIFICATION_CHANNELS: List[str] = ["log", "webhook"]  # webhook only when a URL is set
+    NOTIFICATION_WEBHOOK_URL: Optional[str] = None
+    NOTIFICATION_BATCH_SIZE: int = 100
+    NOTIFICATION_MAX_ATTEMPTS: int = 8
+    NOTIFICATION_BACKOFF_SECONDS: float = 30  # first retry delay, doubled per attempt
+    NOTIFICATION_BACKOFF_MAX_SECONDS: float = 3600
+    NOTIFICATION_TIMEOUT_SECONDS: float = 10
+    NOTIFICATION_LEASE_SECONDS: int = 300  # claimed rows are retried after this if never finished
+    NOTIFICATION_WEBHOOK_CONCURRENCY: int = 10  # in-flight requests per dispatcher
+    
+    # Real-time events (SSE)
+    EVENTS_QUEUE_SIZE: int = 32  # undelivered events kept per subscriber; oldest dropped first
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_MAX_SUBSCRIBERS: int = 50000  # per API process
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # Prometheus metrics, served by the API at /metrics
+    METRICS_WORKER_PORT: Optional[int] = None  # Celery workers and pipeline processes serve theirs on this port
+    TRACING_ENABLED: bool = False  # OpenTelemetry spans (needs opentelemetry-api and an SDK configured)
+    PROFILING_ENABLED: bool = False  # profile API requests sent with PROFILING_HEADER or sampled
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_TOKEN: Optional[str] = None  # PROFILING_HEADER must carry it to profile a request or read profiles
+    PROFILING_SAMPLE_RATE: float = 0.0  # share of all other requests profiled
+    PROFILING_INTERVAL_MS: float = 5  # between stack samples
+    PROFILING_MAX_CONCURRENT: int = 2  # profiles taken at once per process; others run unprofiled
+    PROFILE_DIR: str = "./profiles"  # folded-stack files, served at /api/v1/profiles
+    PROFILE_MAX_FILES: int = 200  # oldest removed first
     
     # Cache
     CACHE_TTL_SECONDS: int = 300  # 5 minutes
+    RESPONSE_CACHE_ENABLED: bool = True  # serve product reads from Redis when unchanged
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
     
     class Config:
         env_file = ".env"
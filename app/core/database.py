@@ -1,12 +1,66 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 from app.domain.models import Base
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+
+def engine_options(url: str) -> dict:
+    """Build create_engine keyword arguments for the given database URL"""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if _is_sqlite(url):
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        # In-memory databases use a singleton pool that takes no sizing options
+        if _is_sqlite_memory(url):
+            return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Tune a raw SQLite connection for concurrent readers and writers"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def build_engine(url: str) -> Engine:
+    """Create an engine with pool settings and SQLite pragmas applied"""
+    db_engine = create_engine(url, **engine_options(url))
+
+    if _is_sqlite(url):
+        event.listen(db_engine, "connect", apply_sqlite_pragmas)
+    instrument_engine(db_engine)
+
+    return db_engine
+
+
+engine = build_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
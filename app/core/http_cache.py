@@ -0,0 +1,83 @@
+"""
+Conditional GETs and server-side response caching for per-product reads.
+
+Every product carries a version counter that is bumped whenever the product
+or its price history changes. A response's strong ETag is derived from the
+product id, that version and the request (path plus normalized query), so a
+matching If-None-Match can be answered with 304 after a single primary key
+lookup. Full bodies are also kept in one Redis hash per product, keyed by
+ETag; writers drop the hash, and an entry for an older version can never be
+served because its ETag no longer matches.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+
+from app.core.cache import RedisClient
+from app.core.config import settings
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def response_cache_key(product_id: int) -> str:
+    return f"http:product:{product_id}"
+
+
+def invalidate_product_responses(cache: RedisClient, product_id: int):
+    """Drop every cached response for a product after it changed"""
+    cache.delete(response_cache_key(product_id))
+
+
+def request_variant(request: Request) -> str:
+    """Path plus query parameters in a stable order"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def product_etag(product_id: int, version: int, variant: str) -> str:
+    """Strong ETag for one representation of a product version"""
+    digest = hashlib.blake2b(
+        f"{product_id}:{version}:{variant}".encode(), digest_size=12
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cached_product_response(
+    request: Request,
+    cache: RedisClient,
+    product_id: int,
+    version: int,
+    build: Callable[[], bytes]
+) -> Response:
+    """
+    304 when the client already has this version, otherwise the JSON body from
+    the response cache or from `build()`, always with ETag and Cache-Control.
+    """
+    etag = product_etag(product_id, version, request_variant(request))
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = response_cache_key(product_id)
+    body = cache.get_field(key, etag) if settings.RESPONSE_CACHE_ENABLED else None
+    if body is not None:
+        body = body.encode()
+    else:
+        body = build()
+        if settings.RESPONSE_CACHE_ENABLED:
+            cache.set_field(key, etag, body.decode(), ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+
+    return Response(content=body, media_type="application/json", headers=headers)
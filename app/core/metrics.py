@@ -0,0 +1,217 @@
+"""
+Prometheus metrics and optional OpenTelemetry spans for the hot paths.
+
+    http_request_duration_seconds{method,route,status}  API requests, by route template
+    http_request_db_queries{route}                      SQL statements per API request
+    db_query_duration_seconds{statement}                every statement (select, insert, update, delete, other)
+    cache_requests_total{operation,result}              RedisClient reads: hit, miss or error
+    scrape_fetch_duration_seconds{domain}               until a product page's headers are in, retries included
+    scrape_parse_duration_seconds{site}                 extracting the price from the page
+    scrape_duration_seconds{site}                       whole scrape: fetch, parse and rendering
+    scrape_downloaded_bytes_total{site}
+    scrape_results_total{site,outcome}                  success, miss (no price on the page) or failure
+    scrape_rendered_total{site}                         scrapes that needed the headless browser
+    celery_task_duration_seconds{task,status}
+
+Domains are only used as labels for sites with an adapter; everything else
+is reported as "other", so user-added URLs can't grow the label set.
+
+The scrape metrics also feed GET /monitor/adapters (app.services.sites.AdapterMetrics).
+The API serves the metrics at /metrics. Celery workers and pipeline
+processes have their own: METRICS_WORKER_PORT makes them serve them too, and
+with PROMETHEUS_MULTIPROC_DIR set (prometheus_client's multiprocess mode)
+every process on the host is reported together, which prefork workers need.
+
+Each measurement is a clock read and a labelled observe, a few microseconds
+next to requests and scrapes that take milliseconds
+(python -m benchmarks.metrics_overhead). With METRICS_ENABLED=false nothing
+is recorded. With TRACING_ENABLED the scraper and the API also open
+OpenTelemetry spans; opentelemetry-api must be installed, and spans are
+exported by whatever SDK the deployment configures.
+"""
+import os
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import List, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+SHORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SCRAPE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request duration", ["method", "route", "status"]
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements per API request", ["route"], buckets=COUNT_BUCKETS
+)
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement duration", ["statement"], buckets=SHORT_BUCKETS
+)
+CACHE_REQUESTS = Counter("cache_requests", "Cache reads", ["operation", "result"])
+FETCH_SECONDS = Histogram(
+    "scrape_fetch_duration_seconds", "Time until a product page's headers are in", ["domain"]
+)
+PARSE_SECONDS = Histogram(
+    "scrape_parse_duration_seconds", "Time spent extracting prices", ["site"], buckets=SHORT_BUCKETS
+)
+SCRAPE_SECONDS = Histogram(
+    "scrape_duration_seconds", "Whole scrape: fetch, parse and rendering", ["site"], buckets=SCRAPE_BUCKETS
+)
+DOWNLOADED_BYTES = Counter("scrape_downloaded_bytes", "Bytes downloaded by the scraper", ["site"])
+SCRAPE_RESULTS = Counter("scrape_results", "Scrape outcomes", ["site", "outcome"])
+RENDERED = Counter("scrape_rendered", "Scrapes that needed the headless browser", ["site"])
+TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds", "Celery task duration", ["task", "status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+
+STATEMENTS = {"select", "insert", "update", "delete"}
+
+# SQL statements run by the request being handled (None outside API requests)
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+_NO_SPAN = nullcontext()
+
+
+def _tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("TRACING_ENABLED is set but opentelemetry-api is not installed; spans are disabled")
+        return None
+    return trace.get_tracer("price_monitor")
+
+
+class Metrics:
+    """Records hot-path measurements when enabled"""
+
+    def __init__(self, enabled: bool = settings.METRICS_ENABLED, tracing: bool = settings.TRACING_ENABLED):
+        self.enabled = enabled
+        self.tracer = _tracer() if tracing else None
+        # labels() locks and validates on every call; the label sets are small and fixed
+        self._children = {}
+
+    def _child(self, metric, *labels):
+        key = (metric, labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*labels)
+        return child
+
+    def span(self, name: str, **attributes):
+        """OpenTelemetry span around a block, or nothing when tracing is off"""
+        if self.tracer is None:
+            return _NO_SPAN
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    def request(self, method: str, route: str, status: int, seconds: float, queries: int):
+        if self.enabled:
+            self._child(REQUEST_SECONDS, method, route, str(status)).observe(seconds)
+            self._child(REQUEST_QUERIES, route).observe(queries)
+
+    def query(self, statement: str, seconds: float):
+        if self.enabled:
+            self._child(QUERY_SECONDS, statement).observe(seconds)
+
+    def cache_lookup(self, operation: str, result: str):
+        if self.enabled:
+            self._child(CACHE_REQUESTS, operation, result).inc()
+
+    def fetch(self, domain: str, seconds: float):
+        if self.enabled:
+            self._child(FETCH_SECONDS, domain).observe(seconds)
+
+    def scrape(
+        self, site: str, outcome: str, seconds: float, parse_seconds: float, bytes_read: int, rendered: bool = False
+    ):
+        if self.enabled:
+            self._child(SCRAPE_RESULTS, site, outcome).inc()
+            self._child(SCRAPE_SECONDS, site).observe(seconds)
+            self._child(PARSE_SECONDS, site).observe(parse_seconds)
+            if bytes_read:
+                self._child(DOWNLOADED_BYTES, site).inc(bytes_read)
+            if rendered:
+                self._child(RENDERED, site).inc()
+
+    def task(self, name: str, status: str, seconds: float):
+        if self.enabled:
+            self._child(TASK_SECONDS, name, status).observe(seconds)
+
+
+def statement_kind(statement: str) -> str:
+    """Label for a SQL statement: its verb when it is a common one"""
+    kind = statement.lstrip()[:6].lower()
+    return kind if kind in STATEMENTS else "other"
+
+
+def _before_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    metrics.query(statement_kind(statement), time.perf_counter() - started)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def instrument_engine(engine: Engine):
+    """Time every statement run on an engine"""
+    event.listen(engine, "before_cursor_execute", _before_query)
+    event.listen(engine, "after_cursor_execute", _after_query)
+
+
+class MetricsMiddleware:
+    """Times API requests and counts their SQL statements"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            with metrics.span("http.request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            _request_queries.reset(token)
+            # The route template, not the path: ids would make a label per product
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.request(scope["method"], route, status, time.perf_counter() - started, queries[0])
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to export: every process on the host in multiprocess mode, else this one"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+# Shared by everything in this process
+metrics = Metrics()
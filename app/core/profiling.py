@@ -0,0 +1,278 @@
+"""
+Opt-in sampling profiler for slow API requests and worker tasks.
+
+A StackSampler thread wakes every PROFILING_INTERVAL_MS, reads the Python
+stack of every other thread (sys._current_frames) and counts identical
+stacks. Threads parked in a wait (idle pool workers, the event loop waiting
+for I/O) are left out. The result is written to PROFILE_DIR in the folded
+format ("root;caller;callee count" per line) read by flamegraph.pl,
+speedscope and inferno.
+
+What gets profiled:
+    API requests     with PROFILING_ENABLED, those sent with the
+                     PROFILING_HEADER header set to PROFILING_TOKEN and a
+                     PROFILING_SAMPLE_RATE share of the rest; the response
+                     carries X-Profile-Id
+    Celery tasks     check_product_task / check_all_products_task called with
+                     profile=True; the task result carries profile_id
+
+Profiles are listed and downloaded from /api/v1/profiles by logged-in users
+sending the same header and token; without a PROFILING_TOKEN the header is
+ignored and profiles are not served. Only
+PROFILING_MAX_CONCURRENT profiles run at once (others just run
+unprofiled), and the newest PROFILE_MAX_FILES are kept.
+
+Every thread is sampled, so a profile taken on a busy API process also shows
+what concurrent requests were doing; each stack starts with its thread name.
+With PROFILING_ENABLED=false the middleware isn't installed at all, and
+tasks only check their profile argument.
+"""
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+# Leaf frames of a thread that is waiting, not working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_base.py", "result")
+}
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[a-z_]+-[0-9a-f]{8}$")
+
+_slots = threading.BoundedSemaphore(settings.PROFILING_MAX_CONCURRENT)
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for root in (os.getcwd(), sys.prefix):
+        if filename.startswith(root):
+            filename = os.path.relpath(filename, root)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts the Python stacks of every other thread on a timer"""
+
+    def __init__(self, interval: float = settings.PROFILING_INTERVAL_MS / 1000, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling; returns the count of each folded stack"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Record the current stack of every other thread"""
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                continue
+
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                frames.append(label)
+                frame = frame.f_back
+            frames.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(frames))] += 1
+        self.samples += 1
+
+
+class ProfileStore:
+    """Folded-stack profiles kept as files, newest PROFILE_MAX_FILES only"""
+
+    def __init__(self, directory: str = settings.PROFILE_DIR, max_files: int = settings.PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    @staticmethod
+    def new_id(kind: str) -> str:
+        return f"{datetime.utcnow():%Y%m%dT%H%M%S}-{kind}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, stacks: Counter):
+        """Write a profile under the given id"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile_id)
+        with open(f"{path}.tmp", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(f"{path}.tmp", path)
+        self._evict()
+
+    def read(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[dict]:
+        """Stored profiles, newest first"""
+        profiles = []
+        for profile_id in self._ids():
+            try:
+                size = os.path.getsize(self._path(profile_id))
+            except FileNotFoundError:
+                continue
+            created, kind, _ = profile_id.split("-")
+            profiles.append({
+                "id": profile_id,
+                "kind": kind,
+                "created_at": datetime.strptime(created, "%Y%m%dT%H%M%S").isoformat(),
+                "bytes": size
+            })
+        return profiles
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-len(".folded")] for name in names if name.endswith(".folded")]
+        return sorted((i for i in ids if PROFILE_ID.match(i)), reverse=True)
+
+    def _evict(self):
+        for profile_id in self._ids()[self.max_files:]:
+            try:
+                os.remove(self._path(profile_id))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.folded")
+
+
+class Profile:
+    """Outcome of a profiled block; id is None when no profile was taken"""
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.samples = 0
+
+
+@contextmanager
+def profiled(kind: str, store: Optional[ProfileStore] = None) -> Iterator[Profile]:
+    """Sample stacks while the block runs and save them; skipped when enough profiles are running"""
+    profile = Profile()
+    if not _slots.acquire(blocking=False):
+        yield profile
+        return
+
+    store = store or profile_store
+    # Known up front so a response can name its profile before the body is sent
+    profile.id = store.new_id(kind)
+    sampler = StackSampler()
+    sampler.start()
+    try:
+        yield profile
+    finally:
+        stacks = sampler.stop()
+        _slots.release()
+        profile.samples = sampler.samples
+        try:
+            store.save(profile.id, stacks)
+        except OSError as e:
+            print(f"Profile save error: {e}")
+
+
+def profiled_if(enabled: bool, kind: str):
+    """profiled() when enabled, otherwise a block yielding None"""
+    return profiled(kind) if enabled else nullcontext()
+
+
+def is_profiling_token(value: Optional[str], token: Optional[str] = None) -> bool:
+    """Whether a header value is the configured profiling token (never true without one)"""
+    token = settings.PROFILING_TOKEN if token is None else token
+    if not token or not value:
+        return False
+    return hmac.compare_digest(value.encode(), token.encode())
+
+
+class ProfilingMiddleware:
+    """Profiles requests sent with the profiling token and a sampled share of the rest"""
+
+    def __init__(
+        self,
+        app,
+        header: str = settings.PROFILING_HEADER,
+        sample_rate: float = settings.PROFILING_SAMPLE_RATE,
+        store: Optional[ProfileStore] = None,
+        token: Optional[str] = None
+    ):
+        self.app = app
+        self.header = header.lower().encode()
+        self.token = token
+        self.sample_rate = sample_rate
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        with profiled("request", self.store) as profile:
+            async def send_with_profile_id(message):
+                if message["type"] == "http.response.start" and profile.id is not None:
+                    # The file is written once the request ends
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
+
+    def _wanted(self, scope) -> bool:
+        # Anyone can send the header; only the token makes it count
+        if any(
+            name == self.header and is_profiling_token(value.decode("latin-1"), self.token)
+            for name, value in scope["headers"]
+        ):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+# Where profiles of this process go
+profile_store = ProfileStore()
+
+
+def get_profile_store() -> ProfileStore:
+    """Dependency for the profile store"""
+    return profile_store
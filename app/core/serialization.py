@@ -0,0 +1,39 @@
+from typing import Any, Iterable, Sequence, Tuple, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def response_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Field names of a response schema, in the order Pydantic serializes them"""
+    return tuple(schema.model_fields)
+
+
+def columns_for(model, schema: Type[BaseModel]) -> list:
+    """ORM columns matching a response schema's fields, for column-only selects"""
+    return [getattr(model, field) for field in response_fields(schema)]
+
+
+def serialize_rows(fields: Sequence[str], rows: Iterable[tuple]) -> bytes:
+    """
+    Serialize result tuples straight to JSON bytes, producing the same output
+    as validating each row into the response schema and dumping it.
+    Rows must be ordered like `fields`.
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+
+def serialize_row(fields: Sequence[str], row: tuple) -> bytes:
+    """Serialize a single result tuple as a JSON object"""
+    return orjson.dumps(dict(zip(fields, row)))
+
+
+def to_json(value: Any) -> bytes:
+    """Serialize plain dicts/lists (datetimes included) to JSON bytes"""
+    return orjson.dumps(value)
+
+
+class FastJSONResponse(Response):
+    """Response for bodies that are already serialized JSON bytes"""
+    media_type = "application/json"
@@ -1,4 +1,4 @@
-from .models import Base, User, Product, PriceHistory, PriceAlert
+from .models import Base, User, Product, PriceHistory, PriceAlert, ProductPriceAggregate, ProductDailyPrice, NotificationOutbox
 from .schemas import *
 
 __all__ = [
@@ -7,4 +7,7 @@ __all__ = [
     "Product",
     "PriceHistory",
     "PriceAlert",
+    "ProductPriceAggregate",
+    "ProductDailyPrice",
+    "NotificationOutbox",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -32,11 +32,19 @@ class Product(Base):
     last_checked = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every change to the product or its history; drives ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     user = relationship("User", back_populates="products")
     price_history = relationship("PriceHistory", back_populates="product")
     alerts = relationship("PriceAlert", back_populates="product")
+    
+    __table_args__ = (
+        # Listing a user's products, all or only the active ones. The sweep
+        # filters on is_active alone and reads most of the table, so it scans
+        Index("ix_products_user_id_is_active", "user_id", "is_active"),
+    )
 
 
 class PriceHistory(Base):
@@ -45,10 +53,15 @@ class PriceHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     price = Column(Float, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
     product = relationship("Product", back_populates="price_history")
+    
+    __table_args__ = (
+        # History pages and stats: WHERE product_id = ? ORDER BY timestamp DESC
+        Index("ix_price_history_product_id_timestamp", "product_id", "timestamp"),
+    )
 
 
 class PriceAlert(Base):
@@ -57,7 +70,11 @@ class PriceAlert(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
-    target_price = Column(Float, nullable=False)
+    rule_type = Column(String, nullable=False, default="below_price", server_default="below_price")
+    target_price = Column(Float, nullable=True)  # below_price
+    threshold = Column(Float, nullable=True)  # percent_drop: percent below the window average
+    window_days = Column(Integer, nullable=True)  # percent_drop: 7, 30 or 90
+    group_id = Column(String, nullable=True, index=True)  # "any of these products" rules
     is_active = Column(Boolean, default=True)
     triggered_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -65,3 +82,66 @@ class PriceAlert(Base):
     # Relationships
     user = relationship("User", back_populates="alerts")
     product = relationship("Product", back_populates="alerts")
+    
+    __table_args__ = (
+        # Alert checks only ever look at active alerts of one product
+        Index(
+            "ix_price_alerts_product_id_active",
+            "product_id",
+            postgresql_where=is_active == True,
+            sqlite_where=is_active == True,
+        ),
+        Index("ix_price_alerts_user_id_is_active", "user_id", "is_active"),
+    )
+
+
+class ProductPriceAggregate(Base):
+    """Rolling price aggregates per product, maintained on every observation"""
+    __tablename__ = "product_price_aggregates"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    observations = Column(Integer, nullable=False, default=0)
+    last_price = Column(Float, nullable=True)
+    last_observed_at = Column(DateTime, nullable=True)
+    all_time_low = Column(Float, nullable=True)
+    all_time_high = Column(Float, nullable=True)
+    window_day = Column(Date, nullable=True)  # day the windows below end on
+    sum_7d = Column(Float, nullable=False, default=0.0)
+    count_7d = Column(Integer, nullable=False, default=0)
+    sum_30d = Column(Float, nullable=False, default=0.0)
+    count_30d = Column(Integer, nullable=False, default=0)
+    sum_90d = Column(Float, nullable=False, default=0.0)
+    count_90d = Column(Integer, nullable=False, default=0)
+
+
+class ProductDailyPrice(Base):
+    """Per-day price totals, kept only as long as the longest rolling window"""
+    __tablename__ = "product_daily_prices"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class NotificationOutbox(Base):
+    """Notifications waiting to be sent, written in the same transaction as the alert"""
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    alert_id = Column(Integer, ForeignKey("price_alerts.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    channel = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    dedup_key = Column(String, unique=True, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Dispatcher: WHERE status IN (...) AND next_attempt_at <= now ORDER BY next_attempt_at
+        Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, HttpUrl, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, HttpUrl, Field, model_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -62,21 +62,45 @@ class PriceHistoryResponse(BaseModel):
 
 
 # Price Alert Schemas
-class PriceAlertBase(BaseModel):
+class PriceAlertRule(BaseModel):
+    rule_type: Literal["below_price", "percent_drop", "all_time_low"] = "below_price"
+    target_price: Optional[float] = Field(None, gt=0)
+    threshold: Optional[float] = Field(None, gt=0, lt=100)
+    window_days: Optional[Literal[7, 30, 90]] = None
+    
+    @model_validator(mode="after")
+    def check_rule_fields(self):
+        if self.rule_type == "below_price" and self.target_price is None:
+            raise ValueError("below_price alerts need target_price")
+        if self.rule_type == "percent_drop":
+            if self.threshold is None:
+                raise ValueError("percent_drop alerts need threshold (percent)")
+            if self.window_days is None:
+                self.window_days = 30
+        return self
+
+
+class PriceAlertCreate(PriceAlertRule):
     product_id: int
-    target_price: float = Field(..., gt=0)
 
 
-class PriceAlertCreate(PriceAlertBase):
-    pass
+class PriceAlertGroupCreate(PriceAlertRule):
+    """One rule that fires for whichever of the products matches first"""
+    product_ids: List[int] = Field(..., min_length=1)
 
 
-class PriceAlertResponse(PriceAlertBase):
+class PriceAlertResponse(BaseModel):
+    product_id: int
+    target_price: Optional[float]
     id: int
     user_id: int
     is_active: bool
     triggered_at: Optional[datetime]
     created_at: datetime
+    rule_type: str
+    threshold: Optional[float]
+    window_days: Optional[int]
+    group_id: Optional[str]
     
     class Config:
         from_attributes = True
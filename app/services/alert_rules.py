@@ -0,0 +1,208 @@
+"""
+Alert rule engine.
+
+Rule types:
+
+    below_price   price <= target_price
+    percent_drop  price at least `threshold` percent below the average of the
+                  last `window_days` days (7, 30 or 90)
+    all_time_low  price lower than every price seen before
+
+A rule over several products ("below X for any of these") is stored as one
+alert per product sharing a group_id; the first one to fire closes the group.
+
+Rules never read price history. Each product has a ProductPriceAggregate row
+with running sums per window, updated on every observation, plus one small
+bucket per day. When the day changes, the buckets that slid out of each
+window are subtracted once, so maintenance is amortized O(1) per observation.
+Rules come from the partial index on a product's active alerts and each one
+is checked in O(1) against the aggregates as they were before the new price.
+"""
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.domain import PriceAlert, ProductDailyPrice, ProductPriceAggregate
+from app.services.analytics import load_series
+from app.services.archive import ColdArchive
+
+BELOW_PRICE = "below_price"
+PERCENT_DROP = "percent_drop"
+ALL_TIME_LOW = "all_time_low"
+RULE_TYPES = (BELOW_PRICE, PERCENT_DROP, ALL_TIME_LOW)
+
+WINDOWS = (7, 30, 90)
+
+
+def window_average(aggregate: ProductPriceAggregate, days: int) -> Optional[float]:
+    """Average price over the last `days` days, or None without observations"""
+    count = getattr(aggregate, f"count_{days}d")
+    if not count:
+        return None
+    return getattr(aggregate, f"sum_{days}d") / count
+
+
+def rule_matches(alert: PriceAlert, aggregate: ProductPriceAggregate, price: float) -> bool:
+    """Whether a new price fires the alert, given the aggregates before it"""
+    if alert.rule_type == BELOW_PRICE:
+        return alert.target_price is not None and price <= alert.target_price
+
+    if alert.rule_type == PERCENT_DROP:
+        average = window_average(aggregate, alert.window_days)
+        return average is not None and price <= average * (1 - alert.threshold / 100)
+
+    if alert.rule_type == ALL_TIME_LOW:
+        return aggregate.all_time_low is not None and price < aggregate.all_time_low
+
+    return False
+
+
+class PriceAggregateStore:
+    """Maintains ProductPriceAggregate and ProductDailyPrice rows"""
+
+    def __init__(self, db: Session, archive: Optional[ColdArchive] = None):
+        self.db = db
+        self.archive = archive
+
+    def load(self, product_id: int, observed_at: datetime) -> ProductPriceAggregate:
+        """Lock a product's aggregates, building them from history the first time"""
+        aggregate = self.db.query(ProductPriceAggregate).filter(
+            ProductPriceAggregate.product_id == product_id
+        ).with_for_update().first()
+
+        if aggregate is None:
+            aggregate = self._bootstrap(product_id, observed_at)
+            self.db.flush()
+
+        self.roll(aggregate, observed_at.date())
+        return aggregate
+
+    def _bootstrap(self, product_id: int, observed_at: datetime) -> ProductPriceAggregate:
+        """One-off build from existing hot and cold history before `observed_at`"""
+        aggregate = ProductPriceAggregate(product_id=product_id, observations=0)
+        for days in WINDOWS:
+            setattr(aggregate, f"sum_{days}d", 0.0)
+            setattr(aggregate, f"count_{days}d", 0)
+        today = observed_at.date()
+        aggregate.window_day = today
+        self.db.add(aggregate)
+
+        series = load_series(self.db, [product_id], self.archive)
+        before = series.timestamps < np.datetime64(observed_at, "us")
+        prices = series.prices[before]
+        if prices.size == 0:
+            return aggregate
+
+        days = series.timestamps[before].astype("datetime64[D]")
+        aggregate.observations = int(prices.size)
+        aggregate.last_price = float(prices[-1])
+        aggregate.last_observed_at = series.timestamps[before][-1].astype(datetime)
+        aggregate.all_time_low = float(prices.min())
+        aggregate.all_time_high = float(prices.max())
+
+        end = np.datetime64(today, "D")
+        for window in WINDOWS:
+            in_window = days > end - window
+            setattr(aggregate, f"sum_{window}d", float(prices[in_window].sum()))
+            setattr(aggregate, f"count_{window}d", int(in_window.sum()))
+
+        recent = days > end - max(WINDOWS)
+        bucket_days, inverse = np.unique(days[recent], return_inverse=True)
+        totals = np.bincount(inverse, weights=prices[recent])
+        counts = np.bincount(inverse)
+        self.db.add_all([
+            ProductDailyPrice(product_id=product_id, day=day.astype(date), total=float(total), count=int(count))
+            for day, total, count in zip(bucket_days, totals, counts)
+        ])
+        return aggregate
+
+    def roll(self, aggregate: ProductPriceAggregate, today: date):
+        """Move the windows forward to end on `today`, subtracting expired days"""
+        if aggregate.window_day is None:
+            aggregate.window_day = today
+            return
+        if today <= aggregate.window_day:
+            return
+
+        previous = aggregate.window_day
+        longest = max(WINDOWS)
+        buckets = self.db.query(ProductDailyPrice).filter(
+            ProductDailyPrice.product_id == aggregate.product_id,
+            ProductDailyPrice.day > previous - timedelta(days=longest),
+            ProductDailyPrice.day <= today - timedelta(days=min(WINDOWS))
+        ).all()
+
+        for window in WINDOWS:
+            # Days that were inside the window ending on `previous` but not in the one ending today
+            first, last = previous - timedelta(days=window), today - timedelta(days=window)
+            expired = [bucket for bucket in buckets if first < bucket.day <= last]
+            count = getattr(aggregate, f"count_{window}d") - sum(bucket.count for bucket in expired)
+            total = getattr(aggregate, f"sum_{window}d") - sum(bucket.total for bucket in expired)
+            setattr(aggregate, f"count_{window}d", count)
+            setattr(aggregate, f"sum_{window}d", total if count else 0.0)
+
+        self.db.query(ProductDailyPrice).filter(
+            ProductDailyPrice.product_id == aggregate.product_id,
+            ProductDailyPrice.day <= today - timedelta(days=longest)
+        ).delete(synchronize_session=False)
+        aggregate.window_day = today
+
+    def observe(self, aggregate: ProductPriceAggregate, price: float, observed_at: datetime):
+        """Add one observation to the aggregates and its day's bucket"""
+        day = observed_at.date()
+        bucket = self.db.get(ProductDailyPrice, (aggregate.product_id, day))
+        if bucket is None:
+            bucket = ProductDailyPrice(product_id=aggregate.product_id, day=day, total=0.0, count=0)
+            self.db.add(bucket)
+            # Sessions don't autoflush: a later observation of this day must find the bucket
+            self.db.flush()
+        bucket.total += price
+        bucket.count += 1
+
+        for window in WINDOWS:
+            setattr(aggregate, f"sum_{window}d", getattr(aggregate, f"sum_{window}d") + price)
+            setattr(aggregate, f"count_{window}d", getattr(aggregate, f"count_{window}d") + 1)
+
+        aggregate.observations += 1
+        aggregate.last_price = price
+        aggregate.last_observed_at = observed_at
+        aggregate.all_time_low = price if aggregate.all_time_low is None else min(aggregate.all_time_low, price)
+        aggregate.all_time_high = price if aggregate.all_time_high is None else max(aggregate.all_time_high, price)
+
+
+class AlertRuleEngine:
+    """Evaluates a product's active alert rules on each new observation"""
+
+    def __init__(self, db: Session, archive: Optional[ColdArchive] = None):
+        self.db = db
+        self.aggregates = PriceAggregateStore(db, archive)
+
+    def process(self, product_id: int, price: float, observed_at: datetime) -> List[PriceAlert]:
+        """Record an observation and return the alerts it triggered (already deactivated)"""
+        aggregate = self.aggregates.load(product_id, observed_at)
+
+        alerts = self.db.query(PriceAlert).filter(
+            PriceAlert.product_id == product_id,
+            PriceAlert.is_active == True
+        ).all()
+        triggered = [alert for alert in alerts if rule_matches(alert, aggregate, price)]
+
+        self.aggregates.observe(aggregate, price, observed_at)
+
+        for alert in triggered:
+            alert.is_active = False
+            alert.triggered_at = observed_at
+            if alert.group_id:
+                # First match closes the rest of an "any of these products" rule
+                self.db.query(PriceAlert).filter(
+                    PriceAlert.group_id == alert.group_id,
+                    PriceAlert.id != alert.id,
+                    PriceAlert.is_active == True
+                ).update({PriceAlert.is_active: False}, synchronize_session=False)
+
+        if triggered:
+            # Later observations in the same batch query active alerts from the database
+            self.db.flush()
+        return triggered
@@ -0,0 +1,191 @@
+"""
+Vectorized price analytics.
+
+Price series are loaded with column-only queries (no ORM objects) into flat
+NumPy arrays sorted by (product_id, timestamp). Every metric is then computed
+for all products at once with segmented reductions over those arrays.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.domain import PriceHistory
+from app.services.archive import ColdArchive
+
+PERCENTILES = (10, 25, 50, 75, 90)
+MOVING_AVERAGE_DAYS = (7, 30)
+LOWEST_IN_DAYS = (30, 90)
+
+
+class PriceSeries(NamedTuple):
+    """Observations of many products, sorted by product then time"""
+    product_ids: np.ndarray  # int64
+    timestamps: np.ndarray  # datetime64[us]
+    prices: np.ndarray  # float64
+
+
+def load_series(
+    db: Session,
+    product_ids: Iterable[int],
+    archive: Optional[ColdArchive] = None,
+    since: Optional[datetime] = None
+) -> PriceSeries:
+    """Load price series for the given products from both history tiers"""
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return PriceSeries(np.empty(0, np.int64), np.empty(0, "datetime64[us]"), np.empty(0))
+
+    query = select(
+        PriceHistory.product_id,
+        PriceHistory.timestamp,
+        PriceHistory.price
+    ).where(PriceHistory.product_id.in_(product_ids))
+    if since:
+        query = query.where(PriceHistory.timestamp >= since)
+    rows = db.execute(query).all()
+
+    if archive:
+        for product_id in product_ids:
+            rows.extend(
+                (row.product_id, row.timestamp, row.price)
+                for row in archive.read(product_id, since=since)
+            )
+
+    if not rows:
+        return PriceSeries(np.empty(0, np.int64), np.empty(0, "datetime64[us]"), np.empty(0))
+
+    ids, timestamps, prices = zip(*rows)
+    series = PriceSeries(
+        np.array(ids, dtype=np.int64),
+        np.array(timestamps, dtype="datetime64[us]"),
+        np.array(prices, dtype=np.float64)
+    )
+    order = np.lexsort((series.timestamps, series.product_ids))
+    return PriceSeries(*(column[order] for column in series))
+
+
+def _segment_percentiles(prices: np.ndarray, group: np.ndarray, starts: np.ndarray,
+                         counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated percentile of each segment (like np.percentile)"""
+    by_value = np.lexsort((prices, group))
+    ordered = prices[by_value]
+    position = starts + (counts - 1) * (q / 100.0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    weight = position - lower
+    return ordered[lower] * (1 - weight) + ordered[upper] * weight
+
+
+def compute_metrics(series: PriceSeries, now: Optional[datetime] = None) -> Dict[int, dict]:
+    """Compute statistics for every product in series"""
+    prices = series.prices
+    if prices.size == 0:
+        return {}
+
+    # Segment boundaries: one segment per product
+    boundaries = np.flatnonzero(np.diff(series.product_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [prices.size]))
+    counts = ends - starts
+    group = np.repeat(np.arange(starts.size), counts)
+    last = ends - 1
+
+    minimum = np.minimum.reduceat(prices, starts)
+    maximum = np.maximum.reduceat(prices, starts)
+    mean = np.add.reduceat(prices, starts) / counts
+    current = prices[last]
+
+    percentiles = {
+        q: _segment_percentiles(prices, group, starts, counts, q) for q in PERCENTILES
+    }
+
+    # Volatility: standard deviation of log returns within each product.
+    # Returns are attributed to the later observation of each pair.
+    raw_returns = np.diff(np.log(np.where(prices > 0, prices, np.nan)))
+    valid = (group[1:] == group[:-1]) & np.isfinite(raw_returns)
+    returns = np.concatenate(([0.0], np.where(valid, raw_returns, 0.0)))
+    returns_valid = np.concatenate(([0.0], valid.astype(np.float64)))
+    n_returns = np.add.reduceat(returns_valid, starts)
+    sum_returns = np.add.reduceat(returns, starts)
+    sum_squares = np.add.reduceat(returns * returns, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (sum_squares - sum_returns ** 2 / n_returns) / (n_returns - 1)
+    volatility = np.where(n_returns > 1, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+
+    # Drawdown: offset each product so one running maximum serves all segments
+    offset = group * (maximum.max() + 1.0)
+    running_peak = np.maximum.accumulate(prices + offset) - offset
+    drawdowns = prices / running_peak - 1.0
+    max_drawdown = np.minimum.reduceat(drawdowns, starts)
+    current_drawdown = current / maximum - 1.0
+
+    reference = np.datetime64(now, "us") if now else series.timestamps[last]
+    reference = np.broadcast_to(reference, starts.shape)
+    row_reference = reference[group]
+
+    moving_averages = {}
+    for days in MOVING_AVERAGE_DAYS:
+        in_window = series.timestamps >= row_reference - np.timedelta64(days, "D")
+        window_sum = np.add.reduceat(np.where(in_window, prices, 0.0), starts)
+        window_count = np.add.reduceat(in_window.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            moving_averages[days] = np.where(window_count > 0, window_sum / window_count, np.nan)
+
+    lowest_in = {}
+    for days in LOWEST_IN_DAYS:
+        in_window = series.timestamps >= row_reference - np.timedelta64(days, "D")
+        window_min = np.minimum.reduceat(np.where(in_window, prices, np.inf), starts)
+        lowest_in[days] = current <= window_min
+
+    first_seen = series.timestamps[starts].astype(datetime)
+    last_seen = series.timestamps[last].astype(datetime)
+    product_ids = series.product_ids[starts]
+
+    def as_float(value) -> Optional[float]:
+        value = float(value)
+        return None if np.isnan(value) else value
+
+    results = {}
+    for i, product_id in enumerate(product_ids.tolist()):
+        results[product_id] = {
+            "product_id": product_id,
+            "observations": int(counts[i]),
+            "first_seen": first_seen[i],
+            "last_seen": last_seen[i],
+            "latest_price": float(current[i]),
+            "min_price": float(minimum[i]),
+            "max_price": float(maximum[i]),
+            "avg_price": float(mean[i]),
+            "percentiles": {f"p{q}": float(percentiles[q][i]) for q in PERCENTILES},
+            "volatility": float(volatility[i]),
+            "moving_averages": {
+                f"{days}d": as_float(moving_averages[days][i]) for days in MOVING_AVERAGE_DAYS
+            },
+            "drawdown_from_peak": float(current_drawdown[i]),
+            "max_drawdown": float(max_drawdown[i]),
+            "lowest_in_days": {
+                f"{days}d": bool(lowest_in[days][i]) for days in LOWEST_IN_DAYS
+            },
+        }
+
+    return results
+
+
+class PriceAnalyticsService:
+    """Batch price statistics for many products"""
+
+    def __init__(self, db: Session, archive: Optional[ColdArchive] = None):
+        self.db = db
+        self.archive = archive
+
+    def product_metrics(
+        self,
+        product_ids: Iterable[int],
+        since: Optional[datetime] = None
+    ) -> Dict[int, dict]:
+        """Metrics keyed by product id; products without history are omitted"""
+        series = load_series(self.db, product_ids, self.archive, since)
+        return compute_metrics(series)
@@ -0,0 +1,263 @@
+"""
+Columnar archive for cold price history.
+
+Each product has one file of appended segments. A segment holds a batch of
+observations as three zlib-compressed little-endian int64 columns:
+
+    ids         delta-encoded
+    timestamps  microseconds since the epoch, delta-encoded
+    prices      scaled integers (price * scale), delta-encoded
+
+Segment layout:
+
+    header  <4sHHIqqi   magic, version, reserved, count, min_ts, max_ts, scale
+    sizes   <III        compressed size of each column
+    columns ids | timestamps | prices
+
+Files are only ever appended to and are read through mmap, so a reader never
+sees a segment that is still being written (incomplete trailing segments are
+ignored). Appends skip row ids the file already holds, so moving rows again
+after a crash between the append and the database delete is harmless.
+"""
+import argparse
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.domain import PriceHistory
+
+MAGIC = b"PHC1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIqqi")
+SIZES = struct.Struct("<III")
+EPOCH = datetime(1970, 1, 1)
+
+
+class ColdRow(NamedTuple):
+    id: int
+    product_id: int
+    price: float
+    timestamp: datetime
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _encode_column(values: List[int]) -> bytes:
+    deltas = array("q", [values[0]] + [b - a for a, b in zip(values, values[1:])])
+    if sys.byteorder != "little":
+        deltas.byteswap()
+    return zlib.compress(deltas.tobytes(), 6)
+
+
+def _decode_column(blob: bytes) -> List[int]:
+    deltas = array("q")
+    deltas.frombytes(zlib.decompress(blob))
+    if sys.byteorder != "little":
+        deltas.byteswap()
+    return list(accumulate(deltas))
+
+
+def encode_segment(rows: List[ColdRow], scale: int = 100) -> bytes:
+    """Encode rows (sorted by timestamp) into one archive segment"""
+    ids = [row.id for row in rows]
+    timestamps = [_to_micros(row.timestamp) for row in rows]
+    prices = [round(row.price * scale) for row in rows]
+
+    columns = [_encode_column(ids), _encode_column(timestamps), _encode_column(prices)]
+    header = HEADER.pack(MAGIC, VERSION, 0, len(rows), min(timestamps), max(timestamps), scale)
+    return header + SIZES.pack(*(len(c) for c in columns)) + b"".join(columns)
+
+
+class ColdArchive:
+    """Per-product columnar files under a local directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, product_id: int) -> str:
+        return os.path.join(self.root, f"{product_id % 256:02x}", f"{product_id}.phc")
+
+    def has(self, product_id: int) -> bool:
+        return os.path.exists(self.path_for(product_id))
+
+    def append(self, product_id: int, rows: Iterable[ColdRow]) -> int:
+        """Append rows not archived yet as a new segment; returns the number of rows written"""
+        path = self.path_for(product_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                archived = self.ids(product_id)
+                rows = sorted((row for row in rows if row.id not in archived), key=lambda row: row.timestamp)
+                if not rows:
+                    return 0
+                f.write(encode_segment(rows, settings.COLD_ARCHIVE_PRICE_SCALE))
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return len(rows)
+
+    def _segments(self, product_id: int) -> Iterator[Tuple[int, int, int, mmap.mmap, List[int]]]:
+        """(min_ts, max_ts, scale, data, column offsets) of every complete segment"""
+        path = self.path_for(product_id)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            while offset + HEADER.size + SIZES.size <= len(data):
+                magic, _, _, count, min_ts, max_ts, scale = HEADER.unpack_from(data, offset)
+                if magic != MAGIC:
+                    break
+                sizes = SIZES.unpack_from(data, offset + HEADER.size)
+                start = offset + HEADER.size + SIZES.size
+                end = start + sum(sizes)
+                if end > len(data):
+                    break  # segment still being written
+                offset = end
+                yield min_ts, max_ts, scale, data, [start, start + sizes[0], start + sizes[0] + sizes[1], end]
+
+    def ids(self, product_id: int) -> Set[int]:
+        """Ids of every archived row of a product"""
+        archived = set()
+        for _, _, _, data, bounds in self._segments(product_id):
+            archived.update(_decode_column(data[bounds[0]:bounds[1]]))
+        return archived
+
+    def read(
+        self,
+        product_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[ColdRow]:
+        """Rows for a product in [since, until), oldest first"""
+        low = _to_micros(since) if since else None
+        high = _to_micros(until) if until else None
+        rows = []
+
+        for min_ts, max_ts, scale, data, bounds in self._segments(product_id):
+            # Skip segments entirely outside the requested range
+            if (low is not None and max_ts < low) or (high is not None and min_ts >= high):
+                continue
+
+            ids, timestamps, prices = (_decode_column(data[a:b]) for a, b in zip(bounds, bounds[1:]))
+            for row_id, ts, price in zip(ids, timestamps, prices):
+                if (low is not None and ts < low) or (high is not None and ts >= high):
+                    continue
+                rows.append(ColdRow(row_id, product_id, price / scale, _from_micros(ts)))
+
+        rows.sort(key=lambda row: row.timestamp)
+        return rows
+
+    def remove(self, product_id: int):
+        """Delete a product's archive"""
+        path = self.path_for(product_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Singleton instance (None when the cold tier is disabled)
+cold_archive = ColdArchive(settings.COLD_ARCHIVE_DIR) if settings.COLD_ARCHIVE_DIR else None
+
+
+def get_cold_archive() -> Optional[ColdArchive]:
+    """Dependency for the cold history archive"""
+    return cold_archive
+
+
+def move_to_cold(db: Session, archive: ColdArchive, cutoff: datetime, batch_size: int = 5000) -> dict:
+    """
+    Move hot rows older than cutoff into the archive, one product at a time.
+    Rows are deleted from the database only after their segment is on disk;
+    rows archived by a run that died before deleting them are not written twice.
+    """
+    product_ids = [
+        product_id for (product_id,) in db.query(PriceHistory.product_id).filter(
+            PriceHistory.timestamp < cutoff
+        ).distinct()
+    ]
+
+    moved = 0
+    for product_id in product_ids:
+        while True:
+            rows = db.query(
+                PriceHistory.id,
+                PriceHistory.product_id,
+                PriceHistory.price,
+                PriceHistory.timestamp
+            ).filter(
+                PriceHistory.product_id == product_id,
+                PriceHistory.timestamp < cutoff
+            ).order_by(PriceHistory.timestamp).limit(batch_size).all()
+            if not rows:
+                break
+
+            archive.append(product_id, [ColdRow(*row) for row in rows])
+            db.query(PriceHistory).filter(
+                PriceHistory.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+            db.commit()
+            moved += len(rows)
+
+    return {"products": len(product_ids), "moved_count": moved}
+
+
+def restore_to_hot(db: Session, archive: ColdArchive, product_id: int) -> dict:
+    """Copy a product's archived rows back into the database and drop its archive"""
+    rows = archive.read(product_id)
+    db.bulk_insert_mappings(PriceHistory, [row._asdict() for row in rows])
+    db.commit()
+    archive.remove(product_id)
+
+    return {"product_id": product_id, "restored_count": len(rows)}
+
+
+def main():
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move price history between hot and cold tiers")
+    parser.add_argument("--dir", default=settings.COLD_ARCHIVE_DIR, help="Archive directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    move = commands.add_parser("move", help="Archive hot rows older than N days")
+    move.add_argument("--older-than-days", type=int, default=settings.HOT_HISTORY_DAYS)
+
+    restore = commands.add_parser("restore", help="Load a product's archive back into the database")
+    restore.add_argument("product_id", type=int)
+
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("set COLD_ARCHIVE_DIR or pass --dir")
+
+    archive = ColdArchive(args.dir)
+    db = SessionLocal()
+    try:
+        if args.command == "move":
+            cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+            print(move_to_cold(db, archive, cutoff))
+        else:
+            print(restore_to_hot(db, archive, args.product_id))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
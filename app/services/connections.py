@@ -0,0 +1,355 @@
+"""
+Connection reuse for the retailer hosts scraped over and over.
+
+DNSCache keeps resolved addresses in process for the TTL of their records
+(clamped to DNS_CACHE_MIN_TTL_SECONDS..DNS_CACHE_MAX_TTL_SECONDS). Records
+are looked up with dnspython so the TTL is known; names it can't answer
+(single-label service names, /etc/hosts entries) go to the system resolver
+and are kept for DNS_CACHE_DEFAULT_TTL_SECONDS. Concurrent lookups of the
+same host share one query. Failed lookups are not cached.
+
+CachingTransport is an httpx transport over an httpcore connection pool
+built with CachingBackend as its network backend: connections are opened
+to the cached addresses in order, while TLS still verifies the host name.
+When none of them answer the entry is dropped, so the next attempt
+resolves again.
+
+SharedClient keeps one AsyncClient per event loop, so scrapes in the same
+loop reuse open connections instead of starting a client (and a handshake)
+per page. warm_up() resolves the SCRAPER_WARM_DOMAINS and opens a
+connection to each, all at once: the Celery worker resolves them when it
+starts and the hourly sweep pre-connects before its first product. Pages
+whose download stopped early (see app.services.streaming) close their
+connection instead of returning it to the pool.
+
+Like the render pool, the client belongs to the loop that created it: code
+running the scraper in a short-lived loop closes it before closing the loop.
+"""
+import asyncio
+import ipaddress
+import socket
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import httpcore
+import httpx
+
+from app.core.config import settings
+from app.services.sites import DEFAULT_HEADERS
+
+# Resolves a host name to its addresses and their TTL (None when unknown)
+Resolver = Callable[[str], Awaitable[Tuple[List[str], Optional[float]]]]
+
+
+class DNSLookupError(OSError):
+    """A host name could not be resolved"""
+
+
+_dns_resolver = None
+
+
+def _records_resolver():
+    global _dns_resolver
+    if _dns_resolver is None:
+        _dns_resolver = dns.asyncresolver.Resolver()
+        _dns_resolver.lifetime = settings.DNS_LOOKUP_TIMEOUT_SECONDS
+    return _dns_resolver
+
+
+async def resolve_host(host: str) -> Tuple[List[str], Optional[float]]:
+    """Addresses of a host (IPv4 first) with the TTL of their records"""
+    if "." in host and host != "localhost":
+        try:
+            resolver = _records_resolver()
+            for record_type in ("A", "AAAA"):
+                try:
+                    answer = await resolver.resolve(host, record_type)
+                except dns.resolver.NoAnswer:
+                    continue
+                return [record.address for record in answer], answer.rrset.ttl
+        except dns.exception.DNSException:
+            pass
+
+    # Names DNS doesn't know may still be in /etc/hosts or a container network
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise DNSLookupError(f"Cannot resolve {host}: {e}") from e
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    return addresses, None
+
+
+class DNSCache:
+    """Resolved addresses per host, kept for the TTL of their records"""
+
+    def __init__(
+        self,
+        resolver: Resolver = resolve_host,
+        min_ttl: float = settings.DNS_CACHE_MIN_TTL_SECONDS,
+        max_ttl: float = settings.DNS_CACHE_MAX_TTL_SECONDS,
+        default_ttl: float = settings.DNS_CACHE_DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.resolver = resolver
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries: Dict[str, Tuple[List[str], float]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._loop = None
+
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str) -> List[str]:
+        """Addresses to connect to for a host, from the cache while its TTL lasts"""
+        if _is_ip(host):
+            return [host]
+
+        entry = self._entries.get(host)
+        if entry is not None and entry[1] > self.clock():
+            self.hits += 1
+            return entry[0]
+
+        self._bind_loop()
+        pending = self._pending.get(host)
+        if pending is not None:
+            # Someone is already asking: wait for the same answer
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        pending = self._pending[host] = asyncio.get_running_loop().create_future()
+        try:
+            addresses, ttl = await self.resolver(host)
+            if not addresses:
+                raise DNSLookupError(f"No addresses for {host}")
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Retrieved so an unawaited failure isn't reported as never retrieved
+            pending.exception()
+            raise
+        else:
+            ttl = self.default_ttl if ttl is None else min(max(ttl, self.min_ttl), self.max_ttl)
+            self._entries[host] = (addresses, self.clock() + ttl)
+            pending.set_result(addresses)
+            return addresses
+        finally:
+            del self._pending[host]
+
+    def _bind_loop(self):
+        # Futures belong to a loop; lookups left over from a closed one are dropped
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+
+    def invalidate(self, host: str):
+        """Forget a host's addresses so the next connection resolves it again"""
+        self._entries.pop(host, None)
+
+    async def warm(self, hosts: Iterable[str]) -> Dict[str, bool]:
+        """Resolve hosts ahead of use; returns whether each one resolved"""
+        hosts = list(dict.fromkeys(hosts))
+        results = await asyncio.gather(*(self.resolve(host) for host in hosts), return_exceptions=True)
+        for host, result in zip(hosts, results):
+            if isinstance(result, Exception):
+                print(f"DNS warm-up failed for {host}: {result}")
+        return {host: not isinstance(result, Exception) for host, result in zip(hosts, results)}
+
+    def stats(self) -> dict:
+        now = self.clock()
+        return {
+            "hosts": sum(1 for _, expires in self._entries.values() if expires > now),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CachingBackend(httpcore.AsyncNetworkBackend):
+    """Network backend opening connections to cached addresses"""
+
+    def __init__(self, cache: DNSCache, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self.cache = cache
+        self.backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await self.cache.resolve(host)
+        except DNSLookupError as e:
+            # Reported like any other failed connection, so it is retried the same way
+            raise httpcore.ConnectError(str(e)) from e
+        error = None
+        for address in addresses:
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # The host may have moved: look it up again next time
+        self.cache.invalidate(host)
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    """An httpcore response body read through httpx"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def __aiter__(self):
+        with httpx_errors():
+            async for chunk in self.stream:
+                yield chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+
+@contextmanager
+def httpx_errors():
+    """Raise httpcore errors as the httpx error of the same name, as httpx's own transport does"""
+    try:
+        yield
+    except (
+        httpcore.TimeoutException, httpcore.NetworkError, httpcore.ProtocolError,
+        httpcore.ProxyError, httpcore.UnsupportedProtocol
+    ) as e:
+        raise getattr(httpx, type(e).__name__, httpx.TransportError)(str(e)) from e
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore pool resolving host names through the DNS cache"""
+
+    def __init__(
+        self,
+        cache: Optional[DNSCache] = None,
+        limits: httpx.Limits = httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        verify: bool = True,
+        http2: bool = False
+    ):
+        self.pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http2=http2,
+            network_backend=CachingBackend(cache or dns_cache)
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with httpx_errors():
+            response = await self.pool.handle_async_request(httpcore.Request(
+                method=request.method,
+                url=httpcore.URL(
+                    scheme=request.url.raw_scheme,
+                    host=request.url.raw_host,
+                    port=request.url.port,
+                    target=request.url.raw_path
+                ),
+                headers=request.headers.raw,
+                content=request.stream,
+                extensions=request.extensions
+            ))
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+def warm_up_origin(domain: str) -> str:
+    """URL opened to warm up a domain ("https://" unless the entry has a scheme)"""
+    return f"{domain.rstrip('/')}/" if "://" in domain else f"https://{domain}/"
+
+
+async def warm_up(client: httpx.AsyncClient, domains: Iterable[str]) -> Dict[str, bool]:
+    """Resolve domains and open a connection to each, all at once; returns whether each one answered"""
+    domains = list(dict.fromkeys(domains))
+
+    async def connect(domain: str) -> bool:
+        try:
+            # HEAD has no body, so the connection goes straight back to the pool
+            await client.head(warm_up_origin(domain), headers=DEFAULT_HEADERS)
+            return True
+        except httpx.HTTPError as e:
+            print(f"Warm-up failed for {domain}: {e!r}")
+            return False
+
+    results = await asyncio.gather(*(connect(domain) for domain in domains))
+    return dict(zip(domains, results))
+
+
+class SharedClient:
+    """One long-lived scraping client per event loop"""
+
+    def __init__(
+        self,
+        timeout: float = settings.REQUEST_TIMEOUT,
+        keepalive: float = settings.SCRAPER_KEEPALIVE_SECONDS,
+        cache: Optional[DNSCache] = None
+    ):
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.cache = cache
+        self.clients_created = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+
+    def get(self) -> httpx.AsyncClient:
+        """The client for the running loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop or self._client is None:
+            # A client left over from a closed loop can't be closed from this one
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=CachingTransport(
+                    self.cache or dns_cache,
+                    limits=httpx.Limits(keepalive_expiry=self.keepalive)
+                )
+            )
+            self.clients_created += 1
+        return self._client
+
+    async def warm_up(self, domains: Iterable[str]) -> Dict[str, bool]:
+        """Pre-connect the loop's client to the given domains"""
+        return await warm_up(self.get(), domains)
+
+    async def close(self):
+        """Close the client and its connections"""
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# Shared by every scraper in this process
+dns_cache = DNSCache()
+shared_client = SharedClient()
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.core.cache import RedisClient
+from app.core.config import settings
+from app.domain import Product
+from app.services.analytics import PriceSeries, compute_metrics, load_series
+from app.services.archive import ColdArchive
+
+
+def dashboard_cache_key(user_id: int) -> str:
+    return f"dashboard:{user_id}"
+
+
+def invalidate_dashboard(cache: RedisClient, user_id: int):
+    """Drop a user's cached dashboard after one of their products changed"""
+    cache.delete(dashboard_cache_key(user_id))
+
+
+def downsample(series: PriceSeries, points: int) -> Dict[int, dict]:
+    """
+    Reduce every product's series to at most `points` time buckets, averaging
+    the prices inside each bucket. All products are bucketed in one pass.
+    """
+    if series.prices.size == 0:
+        return {}
+
+    boundaries = np.flatnonzero(np.diff(series.product_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [series.prices.size]))
+    group = np.repeat(np.arange(starts.size), ends - starts)
+
+    micros = series.timestamps.astype(np.int64)
+    first = micros[starts][group]
+    span = (micros[ends - 1] - micros[starts])[group]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        position = np.where(span > 0, (micros - first) / span, 0.0)
+    bucket = np.minimum((position * points).astype(np.int64), points - 1)
+
+    key = group * points + bucket
+    size = starts.size * points
+    counts = np.bincount(key, minlength=size)
+    price_sums = np.bincount(key, weights=series.prices, minlength=size)
+    time_sums = np.bincount(key, weights=micros - first, minlength=size)
+
+    filled = np.flatnonzero(counts)
+    bucket_group = filled // points
+    prices = price_sums[filled] / counts[filled]
+    offsets = (time_sums[filled] / counts[filled]).astype(np.int64)
+    timestamps = (micros[starts][bucket_group] + offsets).astype("datetime64[us]").astype(datetime)
+
+    # Buckets are ordered by product, so one split yields each product's points
+    splits = np.searchsorted(bucket_group, np.arange(1, starts.size))
+    product_ids = series.product_ids[starts].tolist()
+    return {
+        product_id: {"timestamps": bucket_times.tolist(), "prices": np.round(bucket_prices, 2).tolist()}
+        for product_id, bucket_times, bucket_prices in zip(
+            product_ids, np.split(timestamps, splits), np.split(prices, splits)
+        )
+    }
+
+
+def latest_changes(series: PriceSeries) -> Dict[int, dict]:
+    """
+    Last price movement per product: the current price against the last
+    different one, dated when it moved. Products whose price never moved
+    inside the series have no entry.
+    """
+    if series.prices.size == 0:
+        return {}
+
+    same_product = series.product_ids[1:] == series.product_ids[:-1]
+    # Rows whose price differs from the product's previous observation
+    moved = np.flatnonzero(same_product & (series.prices[1:] != series.prices[:-1])) + 1
+    if moved.size == 0:
+        return {}
+    last_moves = moved[np.concatenate((np.flatnonzero(np.diff(series.product_ids[moved])), [moved.size - 1]))]
+
+    changes = {}
+    for row in last_moves.tolist():
+        price, previous = float(series.prices[row]), float(series.prices[row - 1])
+        changes[int(series.product_ids[row])] = {
+            "price": price,
+            "previous_price": previous,
+            "change": round(price - previous, 2),
+            "change_pct": round((price - previous) / previous * 100, 2) if previous else None,
+            "timestamp": series.timestamps[row].astype(datetime),
+        }
+    return changes
+
+
+class DashboardService:
+    """Builds a user's whole dashboard with a fixed number of queries"""
+
+    def __init__(self, db: Session, cache: RedisClient, archive: Optional[ColdArchive] = None):
+        self.db = db
+        self.cache = cache
+        self.archive = archive
+
+    def get_dashboard(self, user_id: int) -> dict:
+        """Cached dashboard payload (JSON-ready) for a user"""
+        cache_key = dashboard_cache_key(user_id)
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+
+        dashboard = jsonable_encoder(self._build(user_id))
+        self.cache.set(cache_key, dashboard)
+        return dashboard
+
+    def _build(self, user_id: int) -> dict:
+        # Query 1: the user's products, columns only
+        products = self.db.query(
+            Product.id,
+            Product.name,
+            Product.url,
+            Product.is_active,
+            Product.current_price,
+            Product.last_checked
+        ).filter(Product.user_id == user_id).order_by(Product.id).all()
+
+        # Query 2: every product's recent history in one go
+        since = datetime.utcnow() - timedelta(days=settings.DASHBOARD_HISTORY_DAYS)
+        series = load_series(self.db, [p.id for p in products], self.archive, since=since)
+
+        metrics = compute_metrics(series)
+        changes = latest_changes(series)
+        sparklines = downsample(series, settings.DASHBOARD_SPARKLINE_POINTS)
+
+        items: List[dict] = []
+        for product in products:
+            stats = metrics.get(product.id)
+            items.append({
+                "id": product.id,
+                "name": product.name,
+                "url": product.url,
+                "is_active": product.is_active,
+                "current_price": product.current_price,
+                "last_checked": product.last_checked,
+                "latest_change": changes.get(product.id),
+                "stats": stats,
+                "sparkline": sparklines.get(product.id, {"timestamps": [], "prices": []}),
+            })
+
+        return {
+            "user_id": user_id,
+            "generated_at": datetime.utcnow(),
+            "history_days": settings.DASHBOARD_HISTORY_DAYS,
+            "product_count": len(items),
+            "products": items,
+        }
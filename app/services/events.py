@@ -0,0 +1,240 @@
+"""
+Real-time price events.
+
+Writers publish small JSON events on a per-user Redis channel
+(`events:user:{id}`). Each API process runs one EventBroker holding a single
+pub/sub connection; it subscribes to a user's channel while at least one of
+that user's clients is connected and fans every message out to the local
+subscribers.
+
+A subscriber only holds a bounded deque of pre-encoded SSE frames while
+events are pending, so an idle one costs a couple of hundred bytes on top of
+the connection itself. Slow clients lose their oldest undelivered events instead
+of growing memory.
+"""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+import redis.asyncio as aioredis
+
+from app.core.cache import RedisClient
+from app.core.config import settings
+
+PRICE_UPDATE = "price_update"
+ALERT_TRIGGERED = "alert_triggered"
+
+POLL_SECONDS = 1.0
+RECONNECT_SECONDS = 1.0
+HEARTBEAT = b": keepalive\n\n"
+
+
+def user_channel(user_id: int) -> str:
+    return f"events:user:{user_id}"
+
+
+def publish_event(cache: RedisClient, user_id: int, event_type: str, product_id: int, data: dict) -> bool:
+    """Publish an event to every API process with subscribers for the user"""
+    return cache.publish(user_channel(user_id), {
+        "type": event_type,
+        "product_id": product_id,
+        "data": data
+    })
+
+
+def publish_price_update(cache: RedisClient, product, previous_price: Optional[float], timestamp: datetime) -> bool:
+    """A new price was recorded for a product"""
+    return publish_event(cache, product.user_id, PRICE_UPDATE, product.id, {
+        "product_id": product.id,
+        "name": product.name,
+        "price": product.current_price,
+        "previous_price": previous_price,
+        "timestamp": timestamp.isoformat()
+    })
+
+
+def publish_alert_triggered(cache: RedisClient, alert, price: float) -> bool:
+    """An alert's rule fired; rule_type says which fields describe it"""
+    return publish_event(cache, alert.user_id, ALERT_TRIGGERED, alert.product_id, {
+        "alert_id": alert.id,
+        "product_id": alert.product_id,
+        "rule_type": alert.rule_type,
+        "target_price": alert.target_price,
+        "threshold": alert.threshold,
+        "window_days": alert.window_days,
+        "price": price,
+        "triggered_at": alert.triggered_at.isoformat()
+    })
+
+
+def format_sse(event_type: str, data: str) -> bytes:
+    """Encode one server-sent event frame"""
+    return f"event: {event_type}\ndata: {data}\n\n".encode()
+
+
+class Subscriber:
+    """
+    One connected client. The frame buffer and the wakeup future only exist
+    while there is something to hold, keeping idle subscribers tiny.
+    """
+
+    __slots__ = ("user_id", "product_ids", "queue_size", "frames", "waiter")
+
+    def __init__(self, user_id: int, product_ids: Optional[Iterable[int]] = None,
+                 queue_size: int = settings.EVENTS_QUEUE_SIZE):
+        self.user_id = user_id
+        self.product_ids = frozenset(product_ids) if product_ids else None
+        self.queue_size = queue_size
+        self.frames: Optional[deque] = None
+        self.waiter: Optional[asyncio.Future] = None
+
+    def wants(self, product_id: int) -> bool:
+        return self.product_ids is None or product_id in self.product_ids
+
+    def push(self, frame: bytes):
+        if self.frames is None:
+            self.frames = deque(maxlen=self.queue_size)
+        self.frames.append(frame)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def frames_until_closed(self, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+        """Yield pending frames as they arrive, or a heartbeat when idle"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.frames:
+                self.waiter = loop.create_future()
+                try:
+                    async with asyncio.timeout(heartbeat_seconds):
+                        await self.waiter
+                except TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                finally:
+                    self.waiter = None
+
+            while self.frames:
+                yield self.frames.popleft()
+            # Release the buffer until the next event
+            self.frames = None
+
+
+class SubscriberLimitReached(Exception):
+    """This process already serves EVENTS_MAX_SUBSCRIBERS clients"""
+
+
+class EventBroker:
+    """Per-process fan-out of Redis pub/sub events to connected clients"""
+
+    def __init__(self, client: Optional[aioredis.Redis] = None,
+                 max_subscribers: int = settings.EVENTS_MAX_SUBSCRIBERS):
+        self._client = client
+        self.max_subscribers = max_subscribers
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self.subscriber_count = 0
+
+    async def _start(self):
+        if self._client is None:
+            self._client = aioredis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                decode_responses=True
+            )
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def subscribe(self, user_id: int, product_ids: Optional[Iterable[int]] = None) -> Subscriber:
+        """Register a client; the user's channel is subscribed on first use"""
+        subscriber = Subscriber(user_id, product_ids)
+        async with self._lock:
+            # Checked under the lock: clients waiting on it would all pass an earlier check
+            if self.subscriber_count >= self.max_subscribers:
+                raise SubscriberLimitReached()
+            if self._pubsub is None:
+                await self._start()
+            local = self._subscribers.get(user_id)
+            if local is None:
+                local = self._subscribers[user_id] = set()
+                await self._pubsub.subscribe(user_channel(user_id))
+            local.add(subscriber)
+            self.subscriber_count += 1
+
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        """Remove a client; the channel is dropped with the user's last client"""
+        async with self._lock:
+            local = self._subscribers.get(subscriber.user_id)
+            if not local or subscriber not in local:
+                return
+            local.discard(subscriber)
+            self.subscriber_count -= 1
+            if not local:
+                del self._subscribers[subscriber.user_id]
+                try:
+                    await self._pubsub.unsubscribe(user_channel(subscriber.user_id))
+                except Exception as e:
+                    print(f"Event UNSUBSCRIBE error: {e}")
+
+    def dispatch(self, channel: str, raw: str):
+        """Deliver one published message to the matching local subscribers"""
+        user_id = int(channel.rsplit(":", 1)[1])
+        local = self._subscribers.get(user_id)
+        if not local:
+            return
+
+        message = json.loads(raw)
+        # Encoded once and shared by every subscriber
+        frame = format_sse(message["type"], json.dumps(message["data"]))
+        for subscriber in local:
+            if subscriber.wants(message["product_id"]):
+                subscriber.push(frame)
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(POLL_SECONDS)
+                    continue
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=POLL_SECONDS
+                )
+                if message and message["type"] == "message":
+                    self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py reconnects and resubscribes on the next read
+                print(f"Event listener error: {e}")
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def close(self):
+        """Stop listening and close the pub/sub connection"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribers.clear()
+        self.subscriber_count = 0
+
+
+# Singleton instance
+event_broker = EventBroker()
+
+
+def get_event_broker() -> EventBroker:
+    """Dependency for the event broker"""
+    return event_broker
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.domain import PriceHistory
+from app.services.archive import ColdArchive
+
+
+class PriceHistoryReader:
+    """
+    Reads price history across the hot (database) and cold (archive) tiers.
+    Cold rows are always older than hot ones, so newest-first pages are the
+    hot rows followed by the archived rows.
+    """
+    
+    def __init__(self, db: Session, archive: Optional[ColdArchive] = None):
+        self.db = db
+        self.archive = archive
+    
+    def _hot_query(self, product_id: int, since: Optional[datetime], until: Optional[datetime]):
+        # Plain tuples in ColdRow order; no ORM objects are built
+        query = self.db.query(
+            PriceHistory.id,
+            PriceHistory.product_id,
+            PriceHistory.price,
+            PriceHistory.timestamp
+        ).filter(PriceHistory.product_id == product_id)
+        
+        # Time bounds let PostgreSQL prune monthly partitions
+        if since:
+            query = query.filter(PriceHistory.timestamp >= since)
+        if until:
+            query = query.filter(PriceHistory.timestamp < until)
+        
+        return query
+    
+    def page(
+        self,
+        product_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> list:
+        """Newest-first page of (id, product_id, price, timestamp) rows"""
+        query = self._hot_query(product_id, since, until)
+        rows = query.order_by(PriceHistory.timestamp.desc()).offset(skip).limit(limit).all()
+        
+        if len(rows) >= limit or not self.archive or not self.archive.has(product_id):
+            return rows
+        
+        hot_total = len(rows) + skip if rows else query.count()
+        cold_skip = max(0, skip - hot_total)
+        cold = self.archive.read(product_id, since, until)[::-1]
+        
+        return rows + cold[cold_skip:cold_skip + limit - len(rows)]
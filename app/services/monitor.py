@@ -1,18 +1,26 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 
 from app.domain import Product, PriceHistory, PriceAlert
 from app.services.scraper import scraper_service
+from app.services.archive import ColdArchive, get_cold_archive
+from app.services.alert_rules import AlertRuleEngine
+from app.services.analytics import PriceAnalyticsService
+from app.services.dashboard import invalidate_dashboard
 from app.core.cache import RedisClient
+from app.core.http_cache import invalidate_product_responses
+from app.services.events import publish_alert_triggered, publish_price_update
+from app.services.notifications import enqueue_alert_notifications
 
 
 class PriceMonitorService:
     """Service for monitoring product prices"""
     
-    def __init__(self, db: Session, cache: RedisClient):
+    def __init__(self, db: Session, cache: RedisClient, archive: Optional[ColdArchive] = None):
         self.db = db
         self.cache = cache
+        self.archive = archive if archive is not None else get_cold_archive()
     
     async def check_product_price(self, product_id: int) -> Optional[dict]:
         """
@@ -25,8 +33,7 @@ class PriceMonitorService:
             return None
         
         # Check cache first
-        cache_key = f"price:{product_id}"
-        cached_price = self.cache.get(cache_key)
+        cached_price = self.cache.get(f"price:{product_id}")
         if cached_price:
             return cached_price
         
@@ -35,35 +42,93 @@ class PriceMonitorService:
         if not scraped_data:
             return None
         
+        checked_at = datetime.utcnow()
+        previous_price, triggered = self._record_price(product, scraped_data["price"], checked_at)
+        
+        # Commit changes
+        self.db.commit()
+        
+        self._after_commit(product, scraped_data, previous_price, checked_at, triggered)
+        
+        return scraped_data
+    
+    def record_prices(self, observations: List[dict]) -> int:
+        """
+        Persist a batch of already scraped prices in one transaction
+        Each observation has product_id, price, title, source and timestamp
+        Returns the number of prices recorded
+        """
+        product_ids = {observation["product_id"] for observation in observations}
+        products = {
+            product.id: product
+            for product in self.db.query(Product).filter(
+                Product.id.in_(product_ids),
+                Product.is_active == True
+            )
+        }
+        
+        recorded = []
+        for observation in sorted(observations, key=lambda observation: observation["timestamp"]):
+            product = products.get(observation["product_id"])
+            if product is None:
+                continue
+            previous_price, triggered = self._record_price(product, observation["price"], observation["timestamp"])
+            recorded.append((product, observation, previous_price, triggered))
+        
+        self.db.commit()
+        
+        for product, observation, previous_price, triggered in recorded:
+            self._after_commit(product, observation, previous_price, observation["timestamp"], triggered)
+        
+        return len(recorded)
+    
+    def _record_price(self, product: Product, price: float, checked_at: datetime) -> tuple:
+        """Add a new price to the session; returns the previous price and the triggered alerts"""
         # Update product
-        product.current_price = scraped_data["price"]
-        product.last_checked = datetime.utcnow()
+        previous_price = product.current_price
+        product.current_price = price
+        product.last_checked = checked_at
+        product.version = Product.version + 1
         
         # Save to price history
         price_history = PriceHistory(
             product_id=product.id,
-            price=scraped_data["price"],
-            timestamp=datetime.utcnow()
+            price=price,
+            timestamp=checked_at
         )
         self.db.add(price_history)
         
         # Check alerts
-        await self._check_alerts(product)
-        
-        # Commit changes
-        self.db.commit()
+        triggered = self._evaluate_alerts(product, checked_at)
         
-        # Cache the result
-        self.cache.set(cache_key, scraped_data)
-        
-        return scraped_data
+        return previous_price, triggered
+    
+    def _after_commit(
+        self,
+        product: Product,
+        scraped_data: dict,
+        previous_price: Optional[float],
+        checked_at: datetime,
+        triggered: List[PriceAlert]
+    ):
+        """Cache and publish a committed price"""
+        # Cache the result; cached responses and the owner's dashboard are now stale
+        self.cache.set(f"price:{product.id}", scraped_data)
+        invalidate_product_responses(self.cache, product.id)
+        invalidate_dashboard(self.cache, product.user_id)
+        
+        # Push to subscribed clients only once the change is committed
+        publish_price_update(self.cache, product, previous_price, checked_at)
+        for alert in triggered:
+            publish_alert_triggered(self.cache, alert, scraped_data["price"])
     
     async def check_all_products(self, user_id: Optional[int] = None) -> List[dict]:
         """
         Check prices for all active products
         Optionally filter by user_id
         """
-        query = self.db.query(Product).filter(Product.is_active == True)
+        # Columns only: each check commits, which would expire loaded products and reload them one by one
+        query = self.db.query(Product.id, Product.name).filter(Product.is_active == True)
         
         if user_id:
             query = query.filter(Product.user_id == user_id)
@@ -71,60 +136,63 @@ class PriceMonitorService:
         products = query.all()
         results = []
         
-        for product in products:
-            result = await self.check_product_price(product.id)
+        for product_id, product_name in products:
+            result = await self.check_product_price(product_id)
             if result:
                 results.append({
-                    "product_id": product.id,
-                    "product_name": product.name,
+                    "product_id": product_id,
+                    "product_name": product_name,
                     **result
                 })
         
         return results
     
-    async def _check_alerts(self, product: Product):
-        """Check and trigger price alerts for a product"""
-        if not product.current_price:
-            return
-        
-        # Get active alerts for this product
-        alerts = self.db.query(PriceAlert).filter(
-            PriceAlert.product_id == product.id,
-            PriceAlert.is_active == True
-        ).all()
-        
-        for alert in alerts:
-            if product.current_price <= alert.target_price:
-                # Trigger alert
-                alert.is_active = False
-                alert.triggered_at = datetime.utcnow()
-                
-                # Here you could send email/notification
-                print(f"🔔 ALERT TRIGGERED: Product {product.name} reached target price!")
-                print(f"   Current: R$ {product.current_price:.2f}")
-                print(f"   Target: R$ {alert.target_price:.2f}")
+    async def _check_alerts(self, product: Product, observed_at: Optional[datetime] = None) -> List[PriceAlert]:
+        """Evaluate a product's alert rules on its new price; returns the triggered ones"""
+        return self._evaluate_alerts(product, observed_at)
     
-    def get_price_stats(self, product_id: int) -> Optional[dict]:
-        """Get price statistics for a product"""
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            return None
+    def _evaluate_alerts(self, product: Product, observed_at: Optional[datetime] = None) -> List[PriceAlert]:
+        if not product.current_price:
+            return []
         
-        history = self.db.query(PriceHistory).filter(
-            PriceHistory.product_id == product_id
-        ).order_by(PriceHistory.timestamp.desc()).all()
+        engine = AlertRuleEngine(self.db, self.archive)
+        triggered = engine.process(product.id, product.current_price, observed_at or datetime.utcnow())
         
-        if not history:
-            return None
+        for alert in triggered:
+            # Queued in this transaction; the dispatcher sends it later
+            enqueue_alert_notifications(self.db, alert, product)
         
-        prices = [h.price for h in history]
+        return triggered
+    
+    def get_price_stats(self, product_id: int) -> Optional[dict]:
+        """Get price statistics for a product"""
+        return self.get_price_stats_batch([product_id]).get(product_id)
+    
+    def get_price_stats_batch(self, product_ids: List[int]) -> Dict[int, dict]:
+        """Get price statistics for many products, computed in one pass"""
+        products = self.db.query(
+            Product.id, Product.current_price, Product.last_checked
+        ).filter(Product.id.in_(product_ids)).all()
+        if not products:
+            return {}
+        
+        # Hot and archived history, loaded column-only into arrays
+        metrics = PriceAnalyticsService(self.db, self.archive).product_metrics(
+            [product.id for product in products]
+        )
         
-        return {
-            "product_id": product_id,
-            "current_price": product.current_price,
-            "min_price": min(prices),
-            "max_price": max(prices),
-            "avg_price": sum(prices) / len(prices),
-            "price_changes": len(history),
-            "last_checked": product.last_checked
-        }
+        stats = {}
+        for product in products:
+            product_metrics = metrics.get(product.id)
+            if not product_metrics:
+                continue
+            
+            stats[product.id] = {
+                **product_metrics,
+                "product_id": product.id,
+                "current_price": product.current_price,
+                "price_changes": product_metrics["observations"],
+                "last_checked": product.last_checked
+            }
+        
+        return stats
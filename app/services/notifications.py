@@ -0,0 +1,269 @@
+"""
+Alert notifications through a transactional outbox.
+
+_check_alerts only inserts outbox rows, in the same transaction that marks
+the alert as triggered, so a price check never waits for a provider and no
+notification is lost or sent for a rolled back alert. NotificationDispatcher
+(run by a Celery task) claims due rows in batches, sends them concurrently
+with a concurrency limit per channel, and records the outcome: sent, retried
+later with exponential backoff and jitter, or failed for good.
+
+Every row has a unique dedup_key that is also sent as the Idempotency-Key
+header, so a receiver can drop the rare duplicate delivered when a dispatcher
+dies between sending and recording the result.
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.domain import NotificationOutbox, PriceAlert, Product
+from app.services.alert_rules import ALL_TIME_LOW, BELOW_PRICE, PERCENT_DROP
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class PermanentFailure(Exception):
+    """Delivery can never succeed (e.g. the receiver rejected the request); don't retry"""
+
+
+def enabled_channels() -> List[str]:
+    """Channels a new notification is queued for"""
+    return [
+        channel for channel in settings.NOTIFICATION_CHANNELS
+        if channel != "webhook" or settings.NOTIFICATION_WEBHOOK_URL
+    ]
+
+
+def enqueue_alert_notifications(db: Session, alert: PriceAlert, product: Product) -> List[NotificationOutbox]:
+    """Add outbox rows for a triggered alert to the current transaction"""
+    payload = json.dumps({
+        "event": "alert_triggered",
+        "alert_id": alert.id,
+        "user_id": alert.user_id,
+        "product_id": product.id,
+        "product_name": product.name,
+        "product_url": product.url,
+        "price": product.current_price,
+        "rule_type": alert.rule_type,
+        "target_price": alert.target_price,
+        "threshold": alert.threshold,
+        "window_days": alert.window_days,
+        "triggered_at": alert.triggered_at.isoformat()
+    })
+
+    rows = [
+        NotificationOutbox(
+            alert_id=alert.id,
+            user_id=alert.user_id,
+            channel=channel,
+            payload=payload,
+            dedup_key=f"alert:{alert.id}:{alert.triggered_at:%Y%m%dT%H%M%S%f}:{channel}",
+            status=PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        for channel in enabled_channels()
+    ]
+    db.add_all(rows)
+    return rows
+
+
+def describe_rule(payload: dict) -> str:
+    """What happened to the price, for the rule that fired"""
+    # Rows queued before rules had types only carry a target price
+    rule_type = payload.get("rule_type") or BELOW_PRICE
+    if rule_type == PERCENT_DROP:
+        return f"dropped {payload['threshold']:g}% below its {payload['window_days']}-day average!"
+    if rule_type == ALL_TIME_LOW:
+        return "hit an all-time low!"
+    return "reached target price!"
+
+
+class LogSender:
+    """Prints notifications to the worker log"""
+
+    channel = "log"
+    concurrency = 1
+
+    async def send(self, payload: dict, dedup_key: str):
+        print(f"🔔 ALERT TRIGGERED: Product {payload['product_name']} {describe_rule(payload)}")
+        print(f"   Current: R$ {payload['price']:.2f}")
+        if payload.get("target_price") is not None:
+            print(f"   Target: R$ {payload['target_price']:.2f}")
+
+    async def aclose(self):
+        pass
+
+
+class WebhookSender:
+    """POSTs the payload as JSON to a webhook URL"""
+
+    channel = "webhook"
+
+    def __init__(
+        self,
+        url: str,
+        concurrency: int = settings.NOTIFICATION_WEBHOOK_CONCURRENCY,
+        timeout: float = settings.NOTIFICATION_TIMEOUT_SECONDS
+    ):
+        self.url = url
+        self.concurrency = concurrency
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, payload: dict, dedup_key: str):
+        response = await self.client.post(self.url, json=payload, headers={"Idempotency-Key": dedup_key})
+        if response.status_code < 400:
+            return
+        # Timeouts, rate limits and server errors are worth retrying
+        if response.status_code in (408, 429) or response.status_code >= 500:
+            response.raise_for_status()
+        raise PermanentFailure(f"webhook answered {response.status_code}")
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def default_senders() -> dict:
+    """Senders for the configured channels"""
+    senders = {"log": LogSender()}
+    if settings.NOTIFICATION_WEBHOOK_URL:
+        senders["webhook"] = WebhookSender(settings.NOTIFICATION_WEBHOOK_URL)
+    return senders
+
+
+class ClaimedNotification(NamedTuple):
+    id: int
+    channel: str
+    payload: str
+    dedup_key: str
+    attempts: int
+
+
+class NotificationDispatcher:
+    """Sends due outbox rows in batches"""
+
+    def __init__(
+        self,
+        db: Session,
+        senders: Optional[dict] = None,
+        batch_size: int = settings.NOTIFICATION_BATCH_SIZE,
+        max_attempts: int = settings.NOTIFICATION_MAX_ATTEMPTS,
+        timeout: float = settings.NOTIFICATION_TIMEOUT_SECONDS,
+        lease_seconds: int = settings.NOTIFICATION_LEASE_SECONDS
+    ):
+        self.db = db
+        self.senders = senders if senders is not None else default_senders()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self._limits = {
+            channel: asyncio.Semaphore(sender.concurrency) for channel, sender in self.senders.items()
+        }
+
+    def claim(self, now: Optional[datetime] = None) -> List[ClaimedNotification]:
+        """
+        Lease a batch of due rows. Rows left in `sending` by a dispatcher that
+        died become due again once their lease expires. On PostgreSQL, SKIP
+        LOCKED lets several dispatchers claim batches side by side.
+        """
+        now = now or datetime.utcnow()
+        rows = self.db.query(NotificationOutbox).filter(
+            NotificationOutbox.status.in_([PENDING, SENDING]),
+            NotificationOutbox.next_attempt_at <= now
+        ).order_by(NotificationOutbox.next_attempt_at).limit(self.batch_size).with_for_update(
+            skip_locked=True
+        ).all()
+
+        claimed = []
+        for row in rows:
+            row.status = SENDING
+            row.next_attempt_at = now + timedelta(seconds=self.lease_seconds)
+            claimed.append(ClaimedNotification(row.id, row.channel, row.payload, row.dedup_key, row.attempts))
+        self.db.commit()
+
+        return claimed
+
+    async def _deliver(self, notification: ClaimedNotification) -> Optional[Exception]:
+        """Send one notification; returns the error, if any"""
+        sender = self.senders.get(notification.channel)
+        if sender is None:
+            return PermanentFailure(f"no sender for channel {notification.channel!r}")
+
+        async with self._limits[notification.channel]:
+            try:
+                await asyncio.wait_for(
+                    sender.send(json.loads(notification.payload), notification.dedup_key),
+                    self.timeout
+                )
+                return None
+            except Exception as e:
+                return e
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, with jitter so retries don't stampede"""
+        delay = min(
+            settings.NOTIFICATION_BACKOFF_MAX_SECONDS,
+            settings.NOTIFICATION_BACKOFF_SECONDS * 2 ** (attempts - 1)
+        )
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record(self, notification: ClaimedNotification, error: Optional[Exception], now: datetime) -> str:
+        attempts = notification.attempts + 1
+        if error is None:
+            values = {"status": SENT, "sent_at": now, "last_error": None}
+        elif isinstance(error, PermanentFailure) or attempts >= self.max_attempts:
+            values = {"status": FAILED, "last_error": repr(error)}
+        else:
+            values = {
+                "status": PENDING,
+                "last_error": repr(error),
+                "next_attempt_at": now + timedelta(seconds=self.backoff(attempts))
+            }
+        values["attempts"] = attempts
+
+        self.db.query(NotificationOutbox).filter(
+            NotificationOutbox.id == notification.id
+        ).update(values, synchronize_session=False)
+        return values["status"]
+
+    async def dispatch_batch(self) -> Dict[str, int]:
+        """Claim, send and record one batch; returns counts per outcome"""
+        claimed = self.claim()
+        errors = await asyncio.gather(*(self._deliver(notification) for notification in claimed))
+
+        counts = {"claimed": len(claimed), SENT: 0, PENDING: 0, FAILED: 0}
+        now = datetime.utcnow()
+        for notification, error in zip(claimed, errors):
+            counts[self._record(notification, error, now)] += 1
+        self.db.commit()
+
+        return counts
+
+    async def run(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Dispatch batches until nothing is due (or max_batches is reached)"""
+        totals = {"claimed": 0, SENT: 0, "retrying": 0, FAILED: 0, "batches": 0}
+        try:
+            while max_batches is None or totals["batches"] < max_batches:
+                counts = await self.dispatch_batch()
+                if not counts["claimed"]:
+                    break
+                totals["batches"] += 1
+                totals["claimed"] += counts["claimed"]
+                totals[SENT] += counts[SENT]
+                totals["retrying"] += counts[PENDING]
+                totals[FAILED] += counts[FAILED]
+        finally:
+            for sender in self.senders.values():
+                await sender.aclose()
+
+        return totals
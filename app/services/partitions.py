@@ -0,0 +1,140 @@
+import re
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+PARENT_TABLE = "price_history"
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value: datetime) -> datetime:
+    """Truncate a datetime to the first instant of its month"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month start by a number of months"""
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """Name of the monthly partition holding rows from `month`"""
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Month covered by a partition name, or None for non-monthly partitions"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+class PriceHistoryPartitionManager:
+    """
+    Maintains monthly range partitions of price_history on PostgreSQL.
+    On other backends price_history is a plain table and every operation
+    is a no-op.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def is_partitioned(self) -> bool:
+        """Whether price_history is a partitioned table on this database"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+
+        return bool(self.db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :parent AND c.relnamespace = current_schema()::regnamespace"
+        ), {"parent": PARENT_TABLE}).scalar())
+
+    def list_partitions(self) -> List[str]:
+        """Names of the monthly partitions, oldest first"""
+        if not self.is_partitioned:
+            return []
+
+        rows = self.db.execute(text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :parent"
+        ), {"parent": PARENT_TABLE}).scalars().all()
+
+        return sorted(name for name in rows if partition_month(name))
+
+    def ensure_partitions(
+        self,
+        months_ahead: int = settings.HISTORY_PARTITIONS_AHEAD,
+        now: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Create partitions from the current month through `months_ahead` months
+        ahead. Returns the names of the partitions that were created.
+        """
+        if not self.is_partitioned:
+            return []
+
+        existing = set(self.list_partitions())
+        current = month_start(now or datetime.utcnow())
+        created = []
+
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            name = partition_name(start)
+            if name in existing:
+                continue
+
+            self._create_partition(name, start, add_months(start, 1))
+            created.append(name)
+
+        self.db.commit()
+        return created
+
+    def _create_partition(self, name: str, start: datetime, end: datetime):
+        """
+        Create and attach one monthly partition. Rows that already landed in
+        the DEFAULT partition for that month are moved into it first, otherwise
+        attaching would fail.
+        """
+        params = {"start": start, "end": end}
+        self.db.execute(text(
+            f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        self.db.execute(text(
+            f"WITH moved AS ("
+            f'DELETE FROM {PARENT_TABLE}_default WHERE "timestamp" >= :start AND "timestamp" < :end '
+            f"RETURNING *) "
+            f'INSERT INTO "{name}" SELECT * FROM moved'
+        ), params)
+        self.db.execute(text(
+            f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+
+    def drop_partitions_before(self, cutoff: datetime) -> List[str]:
+        """
+        Drop every partition whose whole month is older than `cutoff`.
+        The partition containing the cutoff itself is kept.
+        """
+        if not self.is_partitioned:
+            return []
+
+        dropped = []
+        for name in self.list_partitions():
+            if add_months(partition_month(name), 1) > cutoff:
+                continue
+
+            self.db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+            self.db.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+
+        self.db.commit()
+        return dropped
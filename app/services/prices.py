@@ -0,0 +1,145 @@
+"""
+Locale-aware price parsing.
+
+parse_price() reads the first amount in a piece of text ("R$ 1.299,90",
+"$1,299.90", "1299.9", "12,50 €") with one tokenizing scan that stops at
+the first number: currency markers before it, the number's digit groups
+and the separators between them, and a currency marker right after it.
+Which separator is the decimal one is then decided from the groups:
+
+- both "." and "," present: the last one is the decimal separator
+- one separator used several times: thousands ("1.299.000")
+- one separator used once: decimal, unless exactly three digits follow it
+  and the integer part looks like a thousands group ("1.299", "1,299");
+  a decimal hint (the site's locale) settles that case the other way
+- spaces (including no-break spaces) only group thousands
+
+Malformed numbers (mixed thousands separators, groups that aren't three
+digits long, too many digits, a separator with no digits before it like
+".99") give None instead of a wrong amount.
+"""
+import re
+from typing import NamedTuple, Optional
+
+# Longest symbol first so "R$" and "US$" win over "$"
+CURRENCY_SYMBOLS = [
+    ("US$", "USD"), ("U$", "USD"), ("R$", "BRL"), ("$", "USD"),
+    ("€", "EUR"), ("£", "GBP"),
+    ("BRL", "BRL"), ("USD", "USD"), ("EUR", "EUR"), ("GBP", "GBP"),
+]
+
+SPACES = {" ", "\u00a0", "\u202f"}
+
+CURRENCY_CODES = {symbol: code for symbol, code in CURRENCY_SYMBOLS}
+
+# Symbols, then codes as whole words ("BRL 10", not "SUBRLX")
+_CURRENCY = "{}|(?<![^\\W\\d_])(?:{})(?![^\\W\\d_])".format(
+    "|".join(re.escape(symbol) for symbol, _ in CURRENCY_SYMBOLS if not symbol.isalpha()),
+    "|".join(symbol for symbol, _ in CURRENCY_SYMBOLS if symbol.isalpha())
+)
+
+# The first number (digit groups joined by single separators: "1.299,90",
+# "1 299", "1299") and the currency marker right before it, in one scan
+TOKENS = re.compile(
+    rf"(?:(?P<currency>{_CURRENCY})[ \u00a0\u202f]*)?(?P<number>\d+(?:[., \u00a0\u202f]\d+)*)", re.ASCII
+)
+TRAILING_CURRENCY = re.compile(rf"[ \u00a0\u202f]*({_CURRENCY})")
+CURRENCY = re.compile(_CURRENCY)
+SEPARATOR = re.compile(r"(\D)")
+SPACE = re.compile("[ \u00a0\u202f]")
+THOUSANDS_ONLY = "_"
+# Thousands groups with one consistent separator ("1.299.000", "12_345")
+GROUPED = re.compile(r"\d{1,3}([.,_])\d{3}(?:\1\d{3})*")
+
+# More significant digits than any real price; also keeps float() finite
+MAX_DIGITS = 15
+
+
+class Price(NamedTuple):
+    amount: float
+    currency: Optional[str]
+
+
+def detect_currency(text: str) -> Optional[str]:
+    """ISO code of the first currency symbol or code in text"""
+    match = CURRENCY.search(text)
+    return CURRENCY_CODES[match.group()] if match else None
+
+
+def _group_spaces(number: str) -> str:
+    """Cut the number at a space not followed by a thousands group ("150 12x")
+    and mark the remaining spaces as thousands separators"""
+    parts = SEPARATOR.split(number)
+    for k in range(1, len(parts), 2):
+        if parts[k] in SPACES:
+            if len(parts[k + 1]) != 3:
+                parts = parts[:k]
+                break
+            parts[k] = THOUSANDS_ONLY
+    return "".join(parts)
+
+
+def _amount(number: str, decimal: Optional[str]) -> Optional[float]:
+    """Amount from a number token ("1.299,90", "1,299", "1 299")"""
+    if number.isdigit():
+        return float(number) if len(number) <= MAX_DIGITS else None
+    if SPACE.search(number):
+        number = _group_spaces(number)
+
+    integer, fraction = number, "0"
+    last = max(number.rfind("."), number.rfind(","))
+    if last >= 0:
+        sep, head, tail = number[last], number[:last], number[last + 1:]
+        # A repeated separator groups thousands ("1.299.000"); a lone one
+        # followed by three digits too ("1.299"), unless the locale says otherwise
+        if sep not in head and (
+            not head.isdigit() or len(tail) != 3 or len(head) > 3 or head == "0" or sep == decimal
+        ):
+            integer, fraction = head, tail
+
+    if not integer.isdigit():
+        grouped = GROUPED.fullmatch(integer)
+        if grouped is None:
+            return None
+        integer = integer.replace(grouped.group(1), "")
+
+    if len(integer) + len(fraction) > MAX_DIGITS:
+        return None
+    return float(f"{integer}.{fraction}")
+
+
+def parse_price(text: str, decimal: Optional[str] = None) -> Optional[Price]:
+    """
+    First amount in text and its currency, or None if there is no number
+    decimal is the site's decimal separator, used only for "1.299"-like input
+    """
+    token = TOKENS.search(text)
+    if token is None:
+        return None
+    # ".99" or "R$ ,99": the scan starts after the separator and would read 99
+    start = token.start("number")
+    if start and text[start - 1] in ".,":
+        return None
+
+    currency = token.group("currency")
+    if currency is None:
+        # Symbol after the amount ("12,50 €", "299 BRL"), or further before it
+        after = TRAILING_CURRENCY.match(text, token.end())
+        if after:
+            currency = after.group(1)
+        elif token.start():
+            before = CURRENCY.search(text, 0, token.start())
+            currency = before.group() if before else None
+
+    amount = _amount(token.group("number"), decimal)
+    if amount is None:
+        return None
+    return Price(amount, CURRENCY_CODES[currency] if currency else None)
+
+
+def with_cents(price: Price, cents: str) -> Price:
+    """Add the cents a page shows in their own element to a whole amount"""
+    cents = cents.strip()
+    if not (cents.isdigit() and cents.isascii() and len(cents) <= 2) or not price.amount.is_integer():
+        return price
+    return price._replace(amount=float(f"{int(price.amount)}.{cents}"))
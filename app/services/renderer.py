@@ -0,0 +1,205 @@
+"""
+Headless browser rendering for product pages that only show a price after
+JavaScript runs.
+
+The scraper only renders a page when static extraction found no price and
+the page's site is flagged as needing it (an adapter with "needs_js", or a
+domain in RENDER_DOMAINS), so the cost of a browser is paid for those sites
+alone.
+
+BrowserPool starts one headless Chromium per process on first use and keeps
+up to RENDER_CONCURRENCY browser contexts, reused between pages and
+replaced after RENDER_CONTEXT_MAX_USES pages or any error. At most
+RENDER_CONCURRENCY pages render at once; further requests wait their turn
+in order, and once RENDER_QUEUE_MAX are waiting new ones fail fast with
+RenderQueueFull. Images, fonts and media are aborted before they are
+downloaded.
+
+Playwright objects belong to the event loop that created them: code that
+runs the scraper in a short-lived loop (the Celery tasks) closes the pool
+before closing the loop.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.sites import DEFAULT_HEADERS
+
+
+class RenderQueueFull(Exception):
+    """Too many pages are already waiting for a browser"""
+
+
+async def launch_chromium() -> Tuple[object, Callable[[], Awaitable[None]]]:
+    """Start a headless Chromium; returns the browser and a coroutine function stopping it"""
+    # Imported here: only processes that render need Playwright and its browsers
+    from playwright.async_api import async_playwright
+
+    playwright = await async_playwright().start()
+    try:
+        browser = await playwright.chromium.launch(headless=True)
+    except Exception:
+        await playwright.stop()
+        raise
+
+    async def stop():
+        try:
+            await browser.close()
+        finally:
+            await playwright.stop()
+
+    return browser, stop
+
+
+class BrowserPool:
+    """Bounded pool of reusable browser contexts"""
+
+    def __init__(
+        self,
+        size: int = settings.RENDER_CONCURRENCY,
+        max_uses: int = settings.RENDER_CONTEXT_MAX_USES,
+        max_queue: int = settings.RENDER_QUEUE_MAX,
+        timeout: float = settings.RENDER_TIMEOUT_SECONDS,
+        blocked_resources: Optional[List[str]] = None,
+        launcher: Callable[[], Awaitable[Tuple[object, Callable]]] = launch_chromium
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.blocked_resources = set(
+            settings.RENDER_BLOCKED_RESOURCES if blocked_resources is None else blocked_resources
+        )
+        self.launcher = launcher
+
+        self.rendered = 0
+        self.contexts_created = 0
+        self.contexts_recycled = 0
+        self.blocked_requests = 0
+        self._reset(None)
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]):
+        self._loop = loop
+        self._browser = None
+        self._stop = None
+        self._idle: List = []
+        self._uses: Dict[object, int] = {}
+        self._slots = asyncio.Semaphore(self.size)
+        self._start_lock = asyncio.Lock()
+        self.waiting = 0
+        self.in_use = 0
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            if self._browser is not None:
+                print("Render pool used from a new event loop without close(); dropping its browser")
+            self._reset(loop)
+
+    async def render(self, url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        """HTML of a page after its scripts ran"""
+        self._bind_loop()
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            raise RenderQueueFull(f"{self.waiting} pages waiting to render")
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_use += 1
+        try:
+            context = await self._checkout()
+            try:
+                html = await self._render_page(context, url, headers)
+            except BaseException:
+                # A context that failed mid-page may be in any state
+                await self._discard(context)
+                raise
+            await self._checkin(context)
+            self.rendered += 1
+            return html
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+    async def _render_page(self, context, url: str, headers: Optional[Dict[str, str]]) -> str:
+        page = await context.new_page()
+        try:
+            if headers:
+                await page.set_extra_http_headers(headers)
+            await page.goto(url, wait_until="networkidle", timeout=self.timeout * 1000)
+            return await page.content()
+        finally:
+            await page.close()
+
+    async def _checkout(self):
+        if self._idle:
+            return self._idle.pop()
+
+        browser = await self._ensure_browser()
+        context = await browser.new_context(user_agent=DEFAULT_HEADERS["User-Agent"])
+        await context.route("**/*", self._route)
+        self._uses[context] = 0
+        self.contexts_created += 1
+        return context
+
+    async def _checkin(self, context):
+        self._uses[context] += 1
+        if self._uses[context] >= self.max_uses:
+            self.contexts_recycled += 1
+            await self._discard(context)
+        else:
+            self._idle.append(context)
+
+    async def _discard(self, context):
+        self._uses.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            print(f"Error closing browser context: {e}")
+
+    async def _route(self, route):
+        """Abort images, fonts and media; let everything else through"""
+        if route.request.resource_type in self.blocked_resources:
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _ensure_browser(self):
+        async with self._start_lock:
+            if self._browser is None:
+                self._browser, self._stop = await self.launcher()
+            return self._browser
+
+    async def close(self):
+        """Close every context and the browser"""
+        if self._loop is None:
+            return
+        for context in self._idle:
+            await self._discard(context)
+        self._idle = []
+        if self._stop is not None:
+            try:
+                await self._stop()
+            except Exception as e:
+                print(f"Error stopping browser: {e}")
+        self._reset(None)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "idle_contexts": len(self._idle),
+            "rendered": self.rendered,
+            "contexts_created": self.contexts_created,
+            "contexts_recycled": self.contexts_recycled,
+            "blocked_requests": self.blocked_requests
+        }
+
+
+# Shared by every scraper in this process
+render_pool = BrowserPool()
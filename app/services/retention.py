@@ -0,0 +1,201 @@
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import RedisClient
+from app.core.config import settings
+from app.domain import Product, PriceHistory
+from app.services.archive import ColdArchive, move_to_cold
+from app.services.dashboard import invalidate_dashboard
+from app.services.partitions import PriceHistoryPartitionManager
+
+CHECKPOINT_KEY = "retention:price_history:checkpoint"
+CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class HistoryCleanupJob:
+    """
+    Deletes old price history in bounded batches of primary key ranges.
+    Each batch is its own transaction; progress is checkpointed in Redis
+    after every batch so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        cache: Optional[RedisClient] = None,
+        batch_size: int = settings.RETENTION_BATCH_SIZE,
+        pause_seconds: float = settings.RETENTION_PAUSE_SECONDS,
+        max_runtime_seconds: float = settings.RETENTION_MAX_RUNTIME_SECONDS,
+        archive_dir: Optional[str] = settings.RETENTION_ARCHIVE_DIR
+    ):
+        self.db = db
+        self.cache = cache
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.max_runtime_seconds = max_runtime_seconds
+        self.archive_dir = archive_dir
+
+    def run(self, cutoff: datetime) -> dict:
+        """
+        Delete rows older than cutoff. An unfinished run found in the
+        checkpoint is resumed first, with its original cutoff.
+        """
+        checkpoint = self._load_checkpoint()
+        if checkpoint:
+            cutoff = datetime.fromisoformat(checkpoint["cutoff"])
+            next_id = checkpoint["next_id"]
+            last_id = checkpoint["last_id"]
+        else:
+            next_id, last_id = self.db.query(
+                func.min(PriceHistory.id),
+                func.max(PriceHistory.id)
+            ).filter(PriceHistory.timestamp < cutoff).one()
+            if next_id is not None:
+                self._save_checkpoint(cutoff, next_id, last_id)
+
+        started = time.monotonic()
+        deleted_count = 0
+        batches = 0
+
+        while next_id is not None and next_id <= last_id:
+            if time.monotonic() - started >= self.max_runtime_seconds:
+                break
+
+            upper = next_id + self.batch_size
+            deleted_count += self._delete_batch(cutoff, next_id, upper)
+            batches += 1
+            next_id = upper
+            self._save_checkpoint(cutoff, next_id, last_id)
+
+            if self.pause_seconds and next_id <= last_id:
+                time.sleep(self.pause_seconds)
+
+        completed = next_id is None or next_id > last_id
+        if completed:
+            self._clear_checkpoint()
+
+        elapsed = time.monotonic() - started
+        return {
+            "cutoff": cutoff.isoformat(),
+            "deleted_count": deleted_count,
+            "batches": batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(deleted_count / elapsed, 1) if elapsed > 0 else 0.0,
+            "completed": completed,
+            "resumed": checkpoint is not None
+        }
+
+    def _delete_batch(self, cutoff: datetime, lower: int, upper: int) -> int:
+        """Archive (optionally) and delete one id range in its own transaction"""
+        in_range = (
+            PriceHistory.id >= lower,
+            PriceHistory.id < upper,
+            PriceHistory.timestamp < cutoff
+        )
+
+        try:
+            if self.archive_dir:
+                rows = self.db.query(
+                    PriceHistory.id,
+                    PriceHistory.product_id,
+                    PriceHistory.price,
+                    PriceHistory.timestamp
+                ).filter(*in_range).order_by(PriceHistory.id).all()
+                if rows:
+                    self._archive(rows, cutoff, lower, upper)
+
+            deleted = self.db.query(PriceHistory).filter(*in_range).delete(
+                synchronize_session=False
+            )
+            self.db.commit()
+            return deleted
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _archive(self, rows, cutoff: datetime, lower: int, upper: int):
+        """Write rows to a gzip-compressed CSV file and flush it to disk"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(
+            self.archive_dir,
+            f"price_history_{cutoff:%Y%m%d}_{lower}-{upper - 1}.csv.gz"
+        )
+
+        with open(path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                with io.TextIOWrapper(gz, encoding="utf-8", newline="") as text_stream:
+                    writer = csv.writer(text_stream)
+                    writer.writerow(["id", "product_id", "price", "timestamp"])
+                    for row in rows:
+                        writer.writerow([row.id, row.product_id, row.price, row.timestamp.isoformat()])
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        if not self.cache:
+            return None
+        return self.cache.get(CHECKPOINT_KEY)
+
+    def _save_checkpoint(self, cutoff: datetime, next_id: int, last_id: int):
+        if self.cache:
+            self.cache.set(
+                CHECKPOINT_KEY,
+                {"cutoff": cutoff.isoformat(), "next_id": next_id, "last_id": last_id},
+                ttl=CHECKPOINT_TTL_SECONDS
+            )
+
+    def _clear_checkpoint(self):
+        if self.cache:
+            self.cache.delete(CHECKPOINT_KEY)
+
+
+def purge_history_before(
+    db: Session,
+    cutoff: datetime,
+    cache: Optional[RedisClient] = None,
+    cold_archive: Optional[ColdArchive] = None,
+    **job_options
+) -> dict:
+    """
+    Remove price history older than cutoff.
+    With a cold archive, rows past the cutoff are first moved there, so the
+    cold tier keeps what retention takes out of the database even when the
+    retention window is shorter than HOT_HISTORY_DAYS.
+    Whole monthly partitions are dropped where possible; the remaining rows
+    are deleted by HistoryCleanupJob in throttled batches. When archiving,
+    every row goes through the job first so nothing is dropped unarchived.
+    """
+    moved = move_to_cold(db, cold_archive, cutoff)["moved_count"] if cold_archive else 0
+    partitions = PriceHistoryPartitionManager(db)
+    job = HistoryCleanupJob(db, cache, **job_options)
+    
+    if job.archive_dir:
+        result = job.run(cutoff)
+        dropped = partitions.drop_partitions_before(cutoff) if result["completed"] else []
+    else:
+        dropped = partitions.drop_partitions_before(cutoff)
+        result = job.run(cutoff)
+    
+    # History changed under every product: outdate their ETags in one statement
+    if dropped or result["deleted_count"]:
+        db.query(Product).update(
+            {Product.version: Product.version + 1},
+            synchronize_session=False
+        )
+        db.commit()
+        if cache is not None:
+            for (user_id,) in db.query(Product.user_id).distinct():
+                invalidate_dashboard(cache, user_id)
+
+    return {
+        "moved_to_cold": moved,
+        "dropped_partitions": dropped,
+        **result
+    }
@@ -0,0 +1,209 @@
+"""
+Retry policy and per-domain circuit breakers for page fetches.
+
+Only failures that another attempt can fix are retried: network errors,
+429 and 5xx answers. Each retry waits an exponentially growing delay with
+full jitter, or what the server asked for in Retry-After. A parse miss is
+never a reason to download the page again.
+
+Every retailer domain has a circuit breaker. After
+CIRCUIT_FAILURE_THRESHOLD failed fetches in a row it opens and requests to
+that domain fail fast with CircuitOpen for CIRCUIT_RESET_SECONDS. Then a
+single probe is let through: success closes the breaker, failure opens it
+again. A Retry-After longer than SCRAPER_RETRY_AFTER_MAX_SECONDS opens the
+breaker until that time instead of holding a worker.
+"""
+import asyncio
+import random
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The domain's breaker is open; the request was not sent"""
+
+
+class RetriesExhausted(Exception):
+    """Every attempt failed with a retryable status"""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"{response.status_code} from {response.request.url}")
+        self.response = response
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class RetryPolicy:
+    """How many times and how long to wait before fetching again"""
+
+    def __init__(
+        self,
+        max_attempts: int = settings.MAX_RETRIES,
+        backoff_seconds: float = settings.SCRAPER_BACKOFF_SECONDS,
+        backoff_max_seconds: float = settings.SCRAPER_BACKOFF_MAX_SECONDS,
+        retry_after_max_seconds: float = settings.SCRAPER_RETRY_AFTER_MAX_SECONDS,
+        sleep=asyncio.sleep
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retry_after_max_seconds = retry_after_max_seconds
+        self.sleep = sleep
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay after the given (1-based) failed attempt"""
+        ceiling = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before the next attempt, preferring the server's Retry-After"""
+        if retry_after is not None:
+            return retry_after
+        return self.backoff(attempt)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one domain"""
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = settings.CIRCUIT_RESET_SECONDS,
+        clock=time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.state == CLOSED:
+            return True
+        if self.clock() >= self.opened_until:
+            # Let one probe through; another one only if it never reports back
+            self.state = HALF_OPEN
+            self.opened_until = self.clock() + self.reset_seconds
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.open(self.reset_seconds)
+
+    def open(self, seconds: float):
+        self.state = OPEN
+        self.opened_until = max(self.opened_until, self.clock() + seconds)
+
+
+class CircuitBreakers:
+    """Breakers keyed by domain"""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        domain = urlsplit(url).hostname or ""
+        breaker = self._breakers.get(domain)
+        if breaker is None:
+            breaker = self._breakers[domain] = CircuitBreaker(**self.breaker_options)
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        """Current state per domain"""
+        return {domain: breaker.state for domain, breaker in self._breakers.items()}
+
+
+async def fetch_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    policy: Optional[RetryPolicy] = None,
+    breakers: Optional["CircuitBreakers"] = None,
+    stream: bool = False
+) -> httpx.Response:
+    """
+    GET a page, retrying network errors, 429 and 5xx with backoff
+    With stream=True the body is left unread and the caller must close the response
+    Raises CircuitOpen, RetriesExhausted, or the last network error
+    """
+    policy = policy or RetryPolicy()
+    breaker = (breakers if breakers is not None else circuit_breakers).for_url(url)
+    attempts = max(1, policy.max_attempts)
+
+    for attempt in range(1, attempts + 1):
+        if not breaker.allow():
+            raise CircuitOpen(f"circuit open for {urlsplit(url).hostname}")
+
+        try:
+            if stream:
+                request = client.build_request("GET", url, headers=headers)
+                response = await client.send(request, stream=True, follow_redirects=True)
+            else:
+                response = await client.get(url, headers=headers, follow_redirects=True)
+        except httpx.TransportError:
+            breaker.record_failure()
+            if attempt == attempts:
+                raise
+            await policy.sleep(policy.delay(attempt))
+            continue
+
+        if response.status_code not in RETRYABLE_STATUSES:
+            # Any other answer (including 404) means the site is up
+            breaker.record_success()
+            if stream and response.is_error:
+                await response.aclose()
+            response.raise_for_status()
+            return response
+
+        if stream:
+            await response.aclose()
+        breaker.record_failure()
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None and retry_after > policy.retry_after_max_seconds:
+            # Too long to wait in a worker: shed the domain until then
+            breaker.open(retry_after)
+            raise RetriesExhausted(response)
+        if attempt == attempts:
+            raise RetriesExhausted(response)
+        await policy.sleep(policy.delay(attempt, retry_after))
+
+
+# Shared by every scraper in this process
+circuit_breakers = CircuitBreakers()
@@ -1,17 +1,68 @@
-import httpx
-import re
-from typing import Optional, Dict
-from bs4 import BeautifulSoup
+import time
+from typing import Callable, Optional, Dict
 from datetime import datetime
 from app.core.config import settings
+from app.core.metrics import Metrics, metrics as default_metrics
+from app.services.connections import SharedClient, shared_client
+from app.services.renderer import BrowserPool, render_pool
+from app.services.retry import CircuitBreakers, RetryPolicy, circuit_breakers, fetch_with_retry
+from app.services.sites import SiteAdapter, SiteRegistry, site_registry
+from app.services.snapshots import SnapshotStore, get_snapshot_store
+from app.services.streaming import read_page
+
+
+def request_headers(url: str) -> Dict[str, str]:
+    """Headers sent when fetching a product page"""
+    return site_registry.for_url(url).headers
+
+
+def parse_page(url: str, html: str) -> Optional[Dict]:
+    """Extract price data from a fetched page with the adapter for its site"""
+    return site_registry.for_url(url).parse(html)
+
+
+def parse_with_snapshot(
+    url: str,
+    html: str,
+    parse: Callable[[str], Optional[Dict]],
+    store: Optional[SnapshotStore],
+    fetched_at: Optional[datetime] = None
+) -> Optional[Dict]:
+    """Parse a fetched page, keeping a snapshot of it when the store is enabled"""
+    result = None
+    try:
+        result = parse(html)
+        return result
+    finally:
+        if store is not None:
+            try:
+                store.record(url, html.encode(), ok=bool(result), at=fetched_at)
+            except OSError as e:
+                print(f"Snapshot error for {url}: {e}")
 
 
 class ScraperService:
     """Base scraper service for extracting product prices"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        snapshots: Optional[SnapshotStore] = None,
+        breakers: Optional[CircuitBreakers] = None,
+        registry: Optional[SiteRegistry] = None,
+        renderer: Optional[BrowserPool] = None,
+        http: Optional[SharedClient] = None,
+        telemetry: Optional[Metrics] = None
+    ):
         self.timeout = settings.REQUEST_TIMEOUT
         self.max_retries = settings.MAX_RETRIES
+        self.max_bytes = settings.SCRAPER_MAX_BYTES
+        self.snapshots = snapshots if snapshots is not None else get_snapshot_store()
+        self.retry_policy = RetryPolicy(max_attempts=self.max_retries)
+        self.breakers = breakers if breakers is not None else circuit_breakers
+        self.registry = registry or site_registry
+        self.renderer = renderer or render_pool
+        self.http = http or shared_client
+        self.telemetry = telemetry or default_metrics
     
     async def scrape_price(self, url: str) -> Optional[Dict]:
         """
@@ -19,166 +70,66 @@ class ScraperService:
         Returns dict with price, title, and timestamp
         """
         try:
-            # Determine scraper based on URL
-            if "mercadolivre.com" in url or "mercadolibre.com" in url:
-                return await self._scrape_mercadolivre(url)
-            elif "amazon.com" in url or "amazon.com.br" in url:
-                return await self._scrape_amazon(url)
-            else:
-                return await self._scrape_generic(url)
+            return await self.scrape_with(self.registry.for_url(url), url)
         
         except Exception as e:
             print(f"Scraping error for {url}: {e}")
             return None
     
-    async def _scrape_mercadolivre(self, url: str) -> Optional[Dict]:
-        """Scrape Mercado Livre products"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.get(url, headers=headers, follow_redirects=True)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.text, "lxml")
-                    
-                    # Try multiple selectors for price
-                    price_elem = (
-                        soup.find("span", class_="andes-money-amount__fraction") or
-                        soup.find("span", {"class": re.compile("price.*fraction")}) or
-                        soup.find("meta", {"property": "og:price:amount"})
+    async def scrape_with(self, adapter: SiteAdapter, url: str) -> Optional[Dict]:
+        """Fetch a page and parse it with the given adapter, recording the outcome"""
+        started = time.perf_counter()
+        outcome = "failure"
+        rendered = False
+        bytes_read = 0
+        parse_seconds = 0.0
+        try:
+            with self.telemetry.span("scrape", site=adapter.name, url=url):
+                # One client per loop: open connections and resolved hosts carry over between scrapes
+                with self.telemetry.span("scrape.fetch"):
+                    response = await fetch_with_retry(
+                        self.http.get(), url, adapter.headers, self.retry_policy, self.breakers, stream=True
                     )
-                    
-                    if not price_elem:
-                        continue
-                    
-                    # Extract price
-                    if price_elem.name == "meta":
-                        price_text = price_elem.get("content", "")
-                    else:
-                        price_text = price_elem.get_text(strip=True)
-                    
-                    # Clean and convert price
-                    price_text = re.sub(r'[^\d,.]', '', price_text)
-                    price_text = price_text.replace(',', '.')
-                    price = float(price_text)
-                    
-                    # Get title
-                    title_elem = soup.find("h1", class_="ui-pdp-title") or soup.find("h1")
-                    title = title_elem.get_text(strip=True) if title_elem else "Product"
-                    
-                    return {
-                        "price": price,
-                        "title": title,
-                        "timestamp": datetime.utcnow(),
-                        "source": "Mercado Livre"
-                    }
+                self.telemetry.fetch(self.registry.domain_label(url), time.perf_counter() - started)
+                try:
+                    # Stops downloading (and drops the connection) once the price is in
+                    page = await read_page(response, adapter, self.max_bytes)
+                finally:
+                    await response.aclose()
+                bytes_read = page.bytes_read
+                parse_seconds = page.parse_seconds
                 
-                except Exception as e:
-                    if attempt == self.max_retries - 1:
-                        raise
-                    continue
-        
-        return None
+                # A page without a price is not downloaded again: the markup won't change
+                # between attempts (and with snapshots enabled it can be re-parsed later)
+                result = parse_with_snapshot(url, page.html, lambda html: page.result, self.snapshots)
+                if result is None and self.registry.needs_js(url):
+                    # Only flagged sites pay for a browser, and only when the static page had no price
+                    rendered = True
+                    with self.telemetry.span("scrape.render"):
+                        html = await self.renderer.render(url, adapter.headers)
+                    parse_started = time.perf_counter()
+                    result = parse_with_snapshot(url, html, adapter.parse, self.snapshots)
+                    parse_seconds += time.perf_counter() - parse_started
+                outcome = "success" if result else "miss"
+                return result
+        finally:
+            self.telemetry.scrape(adapter.name, outcome, time.perf_counter() - started, parse_seconds, bytes_read, rendered)
+    
+    async def _scrape_mercadolivre(self, url: str) -> Optional[Dict]:
+        """Scrape Mercado Livre products"""
+        return await self.scrape_with(self.registry.get("mercadolivre"), url)
     
     async def _scrape_amazon(self, url: str) -> Optional[Dict]:
         """Scrape Amazon products"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7"
-            }
-            
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.get(url, headers=headers, follow_redirects=True)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.text, "lxml")
-                    
-                    # Try multiple selectors for price
-                    price_elem = (
-                        soup.find("span", class_="a-price-whole") or
-                        soup.find("span", id="priceblock_ourprice") or
-                        soup.find("span", id="priceblock_dealprice")
-                    )
-                    
-                    if not price_elem:
-                        continue
-                    
-                    price_text = price_elem.get_text(strip=True)
-                    price_text = re.sub(r'[^\d,.]', '', price_text)
-                    price_text = price_text.replace(',', '.')
-                    price = float(price_text)
-                    
-                    # Get title
-                    title_elem = soup.find("span", id="productTitle")
-                    title = title_elem.get_text(strip=True) if title_elem else "Product"
-                    
-                    return {
-                        "price": price,
-                        "title": title,
-                        "timestamp": datetime.utcnow(),
-                        "source": "Amazon"
-                    }
-                
-                except Exception as e:
-                    if attempt == self.max_retries - 1:
-                        raise
-                    continue
-        
-        return None
+        return await self.scrape_with(self.registry.get("amazon"), url)
     
     async def _scrape_generic(self, url: str) -> Optional[Dict]:
         """Generic scraper for other sites"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            try:
-                response = await client.get(url, headers=headers, follow_redirects=True)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, "lxml")
-                
-                # Try common price patterns
-                price_patterns = [
-                    r'R\$\s*[\d.,]+',
-                    r'BRL\s*[\d.,]+',
-                    r'[\d.,]+',
-                ]
-                
-                text = soup.get_text()
-                for pattern in price_patterns:
-                    matches = re.findall(pattern, text)
-                    if matches:
-                        price_text = matches[0]
-                        price_text = re.sub(r'[^\d,.]', '', price_text)
-                        price_text = price_text.replace(',', '.')
-                        
-                        try:
-                            price = float(price_text)
-                            if 0 < price < 1000000:  # Sanity check
-                                title_elem = soup.find("h1") or soup.find("title")
-                                title = title_elem.get_text(strip=True) if title_elem else "Product"
-                                
-                                return {
-                                    "price": price,
-                                    "title": title,
-                                    "timestamp": datetime.utcnow(),
-                                    "source": "Generic"
-                                }
-                        except ValueError:
-                            continue
-            
-            except Exception as e:
-                print(f"Generic scraper error: {e}")
-        
-        return None
+        try:
+            return await self.scrape_with(self.registry.generic, url)
+        except Exception as e:
+            print(f"Generic scraper error: {e}")
+            return None
 
 
 # Singleton instance
@@ -0,0 +1,405 @@
+"""
+Site adapters: how to read a price and a title from each retailer's pages.
+
+Adapters are declared as plain data. The built-in ones are below; more can
+be added, or built-in ones overridden by name, with a JSON list in
+SITE_ADAPTERS_FILE, without code changes:
+
+    [{
+        "name": "kabum",
+        "source": "KaBuM!",
+        "domains": ["kabum.com.br"],
+        "headers": {"Accept-Language": "pt-BR"},
+        "price": [{"css": "h4.finalPrice"}, {"css": "meta[itemprop=price]", "attr": "content"}],
+        "title": [{"css": "h1"}]
+    }]
+
+Price and title selectors are tried in order. A selector is either "css"
+(optionally reading "attr" instead of the text) or "tag" plus a
+"class_regex" matched against each class. A price selector can name a
+"cents" CSS selector for pages that show the cents in their own element,
+looked up next to the price. An adapter can also list "price_patterns",
+regexes searched in the page text when no selector matched, "currency"
+selectors for pages whose price text has no currency symbol, and a
+"decimal" separator for its locale (see app.services.prices). Sites whose
+pages only show a price after JavaScript runs set "needs_js": true (or list
+their domains in RENDER_DOMAINS) to be rendered in a headless browser when
+static extraction finds nothing (see app.services.renderer).
+Everything is compiled once when the registry is built.
+
+Dispatch is one dict lookup on the URL's registered domain
+(www.mercadolivre.com.br -> mercadolivre.com.br); unknown domains get the
+generic adapter.
+"""
+import json
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import soupsieve
+from bs4 import BeautifulSoup
+from prometheus_client import CollectorRegistry
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.services.prices import Price, detect_currency, parse_price, with_cents
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+BUILTIN_SITES = [
+    {
+        "name": "mercadolivre",
+        "source": "Mercado Livre",
+        "domains": [
+            "mercadolivre.com.br", "mercadolivre.com", "mercadolibre.com",
+            "mercadolibre.com.ar", "mercadolibre.com.mx", "mercadolibre.com.co", "mercadolibre.cl"
+        ],
+        "price": [
+            {"css": "span.andes-money-amount__fraction", "cents": "span.andes-money-amount__cents"},
+            {"tag": "span", "class_regex": "price.*fraction", "cents": "span[class*=cents]"},
+            {"css": "meta[property='og:price:amount']", "attr": "content"}
+        ],
+        "currency": [
+            {"css": "meta[itemprop=priceCurrency]", "attr": "content"},
+            {"css": "meta[property='og:price:currency']", "attr": "content"},
+            {"css": "span.andes-money-amount__currency-symbol"}
+        ],
+        "title": [{"css": "h1.ui-pdp-title"}, {"css": "h1"}]
+    },
+    {
+        "name": "amazon",
+        "source": "Amazon",
+        "domains": ["amazon.com", "amazon.com.br"],
+        "headers": {"Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7"},
+        "price": [
+            {"css": "span.a-price-whole", "cents": "span.a-price-fraction"},
+            {"css": "span#priceblock_ourprice"},
+            {"css": "span#priceblock_dealprice"}
+        ],
+        "currency": [{"css": "span.a-price-symbol"}],
+        "title": [{"css": "span#productTitle"}]
+    },
+]
+
+GENERIC_SITE = {
+    "name": "generic",
+    "source": "Generic",
+    "domains": [],
+    # Amounts with a currency first; a bare number only when it has cents
+    "price_patterns": [
+        r"(?:R\$|BRL)\s*\d[\d.,]*",
+        r"(?:US\$|USD|\$)\s*\d[\d.,]*",
+        r"(?<![\d.,])\d{1,3}(?:[.,]\d{3})*[.,]\d{2}(?![\d.,])"
+    ],
+    "title": [{"css": "h1"}, {"css": "title"}]
+}
+
+# Public suffixes with two labels used by the retailers we monitor
+TWO_LABEL_SUFFIXES = {
+    "com.br", "net.br", "org.br", "com.ar", "com.mx", "com.co", "com.pe", "com.uy",
+    "com.ve", "com.ec", "co.uk", "com.au", "co.jp", "com.cn", "co.in"
+}
+
+# Class names, ids and attribute values in a CSS selector
+CSS_TOKENS = re.compile(r"[.#][\w-]+|=\s*['\"]?[^'\"\]]+")
+
+OUTCOMES = ("success", "miss", "failure")
+
+
+@lru_cache(maxsize=4096)
+def registered_domain(hostname: str) -> str:
+    """Domain a hostname was registered under (shop.example.com.br -> example.com.br)"""
+    labels = hostname.lower().rstrip(".").split(".")
+    size = 3 if ".".join(labels[-2:]) in TWO_LABEL_SUFFIXES else 2
+    return ".".join(labels[-size:])
+
+
+class Selector:
+    """One compiled price or title selector"""
+
+    def __init__(self, spec: dict):
+        self.attr = spec.get("attr")
+        if "css" in spec:
+            self._css = soupsieve.compile(spec["css"])
+            self._tag = self._class = None
+        else:
+            self._css = None
+            self._tag = spec.get("tag")
+            self._class = re.compile(spec["class_regex"])
+        self._cents = soupsieve.compile(spec["cents"]) if "cents" in spec else None
+        self.marker = self._marker(spec)
+
+    @staticmethod
+    def _marker(spec: dict) -> "re.Pattern[bytes]":
+        """Bytes that show up in the raw HTML where this selector matches"""
+        if "css" not in spec:
+            return re.compile(spec["class_regex"].encode())
+        tokens = [token.lstrip(".#=").strip(" '\"") for token in CSS_TOKENS.findall(spec["css"])]
+        if tokens:
+            return re.compile(re.escape(max(tokens, key=len).encode()))
+        return re.compile(b"<" + re.escape(spec["css"].split()[-1].encode()), re.IGNORECASE)
+
+    def find(self, soup: BeautifulSoup):
+        if self._css is not None:
+            return self._css.select_one(soup)
+        return soup.find(self._tag, class_=self._class)
+
+    def text(self, element) -> str:
+        if self.attr:
+            return element.get(self.attr, "")
+        return element.get_text(strip=True)
+
+    def cents(self, element) -> Optional[str]:
+        """Cents shown beside the price element, if the selector has them"""
+        if self._cents is None or element.parent is None:
+            return None
+        cents = self._cents.select_one(element.parent)
+        return cents.get_text(strip=True) if cents is not None else None
+
+    def complete(self, element) -> bool:
+        """Whether the element (with its cents) was fully received in a partial page"""
+        return _followed(element.parent if self._cents is not None else element)
+
+
+def _followed(node) -> bool:
+    """Whether anything comes after the node, i.e. it wasn't cut off by the end of the input"""
+    while node is not None:
+        if node.next_sibling is not None:
+            return True
+        node = node.parent
+    return False
+
+
+class SiteAdapter:
+    """Extracts price data from one retailer's pages"""
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.source = spec.get("source", self.name)
+        self.domains = [registered_domain(domain) for domain in spec.get("domains", [])]
+        self.headers = {**DEFAULT_HEADERS, **spec.get("headers", {})}
+        self.price_selectors = [Selector(selector) for selector in spec.get("price", [])]
+        self.title_selectors = [Selector(selector) for selector in spec.get("title", [])]
+        self.price_patterns = [re.compile(pattern) for pattern in spec.get("price_patterns", [])]
+        self.currency_selectors = [Selector(selector) for selector in spec.get("currency", [])]
+        self.decimal = spec.get("decimal")
+        self.needs_js = spec.get("needs_js", False)
+
+        # Raw bytes announcing the top-priority price, to know when a partial
+        # page is worth parsing (see app.services.streaming)
+        if self.price_selectors:
+            self.price_marker = self.price_selectors[0].marker
+        elif self.price_patterns:
+            self.price_marker = re.compile(self.price_patterns[0].pattern.encode())
+        else:
+            self.price_marker = None
+
+    def parse(self, html: str) -> Optional[Dict]:
+        """Price, title and source from a page, or None if it has no price"""
+        return self._parse(html, prefix=False)
+
+    def parse_prefix(self, html: str) -> Optional[Dict]:
+        """
+        What parse() would give for the whole page, from its first part
+        None while the rest of the page could still change the result
+        """
+        return self._parse(html, prefix=True)
+
+    def _parse(self, html: str, prefix: bool) -> Optional[Dict]:
+        soup = BeautifulSoup(html, "lxml")
+
+        # A partial page is only trusted for the first selector: a later one
+        # matching early doesn't mean the first won't match further down
+        price_selectors = self.price_selectors[:1] if prefix else self.price_selectors
+        price = self._price_from_selectors(soup, price_selectors, prefix)
+        if price is None and not (prefix and self.price_selectors):
+            price = self._price_from_text(soup, self.price_patterns[:1] if prefix else self.price_patterns, prefix)
+        if price is None:
+            return None
+
+        title = self._title(soup, self.title_selectors[:1] if prefix else self.title_selectors, prefix)
+        currency = price.currency or self._currency(soup)
+        if prefix and ((title is None and self.title_selectors) or (currency is None and self.currency_selectors)):
+            return None
+
+        return {
+            "price": price.amount,
+            "currency": currency,
+            "title": title if title is not None else "Product",
+            "timestamp": datetime.utcnow(),
+            "source": self.source
+        }
+
+    def _price_from_selectors(self, soup: BeautifulSoup, selectors: List[Selector], prefix: bool) -> Optional[Price]:
+        for selector in selectors:
+            element = selector.find(soup)
+            if element is None or (prefix and not selector.complete(element)):
+                continue
+            price = parse_price(selector.text(element), self.decimal)
+            if price is None:
+                continue
+            cents = selector.cents(element)
+            return with_cents(price, cents) if cents else price
+        return None
+
+    def _price_from_text(self, soup: BeautifulSoup, patterns: List["re.Pattern"], prefix: bool) -> Optional[Price]:
+        text = soup.get_text()
+        for pattern in patterns:
+            for match in pattern.finditer(text):
+                if prefix and match.end() == len(text):
+                    break  # may go on past the end of what was received
+                price = parse_price(match.group(), self.decimal)
+                if price is not None and 0 < price.amount < 1000000:  # Sanity check
+                    return price
+        return None
+
+    def _currency(self, soup: BeautifulSoup) -> Optional[str]:
+        for selector in self.currency_selectors:
+            element = selector.find(soup)
+            if element is None:
+                continue
+            text = selector.text(element).strip()
+            currency = detect_currency(text) or (text.upper() if len(text) == 3 and text.isalpha() else None)
+            if currency:
+                return currency
+        return None
+
+    def _title(self, soup: BeautifulSoup, selectors: List[Selector], prefix: bool) -> Optional[str]:
+        for selector in selectors:
+            element = selector.find(soup)
+            if element is not None and (not prefix or selector.complete(element)):
+                return selector.text(element)
+        return None
+
+
+class SiteRegistry:
+    """Adapters keyed by registered domain"""
+
+    def __init__(self, sites: List[dict], generic: dict = GENERIC_SITE, render_domains: Optional[List[str]] = None):
+        self.generic = SiteAdapter(generic)
+        self.render_domains = {registered_domain(domain) for domain in render_domains or []}
+        self.adapters: Dict[str, SiteAdapter] = {}
+        self._by_domain: Dict[str, SiteAdapter] = {}
+        for spec in sites:
+            self.register(SiteAdapter(spec))
+
+    def register(self, adapter: SiteAdapter):
+        """Add an adapter, replacing any with the same name"""
+        previous = self.adapters.get(adapter.name)
+        if previous is not None:
+            for domain in previous.domains:
+                self._by_domain.pop(domain, None)
+        self.adapters[adapter.name] = adapter
+        for domain in adapter.domains:
+            self._by_domain[domain] = adapter
+
+    def get(self, name: str) -> SiteAdapter:
+        return self.generic if name == self.generic.name else self.adapters[name]
+
+    def for_url(self, url: str) -> SiteAdapter:
+        """Adapter for a product URL"""
+        hostname = urlsplit(url).hostname
+        if not hostname:
+            return self.generic
+        return self._by_domain.get(registered_domain(hostname), self.generic)
+
+    def domain_label(self, url: str) -> str:
+        """Domain to report a fetch under; "other" for sites without an adapter"""
+        hostname = urlsplit(url).hostname
+        domain = registered_domain(hostname) if hostname else None
+        return domain if domain in self._by_domain else "other"
+
+    def needs_js(self, url: str) -> bool:
+        """Whether pages at this URL may need a browser to show their price"""
+        hostname = urlsplit(url).hostname
+        if not hostname:
+            return False
+        return self.for_url(url).needs_js or registered_domain(hostname) in self.render_domains
+
+    def all(self) -> List[SiteAdapter]:
+        return [*self.adapters.values(), self.generic]
+
+
+def load_sites(path: Optional[str] = None) -> List[dict]:
+    """Built-in site specs plus those from a JSON file"""
+    sites = list(BUILTIN_SITES)
+    if path:
+        with open(path) as f:
+            sites.extend(json.load(f))
+    return sites
+
+
+class AdapterMetrics:
+    """
+    Per-adapter outcomes and latency, read from the scraper's Prometheus metrics
+    (every process on the host in multiprocess mode, else this one)
+    """
+
+    def __init__(self, registry: Optional[CollectorRegistry] = None):
+        self.registry = registry or metrics_registry()
+
+    def summaries(self, adapters: List[SiteAdapter]) -> List[dict]:
+        """One summary per adapter, from a single read of the registry"""
+        sites = defaultdict(lambda: {
+            "outcomes": Counter(), "buckets": Counter(), "seconds": 0.0, "bytes": 0, "rendered": 0
+        })
+        for family in self.registry.collect():
+            for sample in family.samples:
+                site = sample.labels.get("site")
+                if site is None:
+                    continue
+                stats = sites[site]
+                if sample.name == "scrape_results_total":
+                    stats["outcomes"][sample.labels["outcome"]] += sample.value
+                elif sample.name == "scrape_duration_seconds_bucket":
+                    stats["buckets"][float(sample.labels["le"])] += sample.value
+                elif sample.name == "scrape_duration_seconds_sum":
+                    stats["seconds"] += sample.value
+                elif sample.name == "scrape_downloaded_bytes_total":
+                    stats["bytes"] += sample.value
+                elif sample.name == "scrape_rendered_total":
+                    stats["rendered"] += sample.value
+
+        return [self._summary(adapter, sites[adapter.name]) for adapter in adapters]
+
+    def summary(self, adapter: SiteAdapter) -> dict:
+        return self.summaries([adapter])[0]
+
+    def _summary(self, adapter: SiteAdapter, stats: dict) -> dict:
+        counts = {outcome: int(stats["outcomes"][outcome]) for outcome in OUTCOMES}
+        requests = sum(counts.values())
+        # Bucket counts are cumulative: the +Inf bucket holds every observation
+        buckets = sorted(stats["buckets"].items())
+
+        return {
+            "name": adapter.name,
+            "source": adapter.source,
+            "domains": adapter.domains,
+            "requests": requests,
+            **counts,
+            "rendered": int(stats["rendered"]),
+            "success_rate": counts["success"] / requests if requests else None,
+            "avg_latency_ms": stats["seconds"] * 1000 / requests if requests else None,
+            "p50_latency_ms": self._percentile(buckets, 0.50),
+            "p95_latency_ms": self._percentile(buckets, 0.95),
+            "avg_bytes": int(stats["bytes"]) // requests if requests else None
+        }
+
+    @staticmethod
+    def _percentile(buckets, quantile: float) -> Optional[float]:
+        """Upper bound in ms of the bucket holding the quantile (None above the last bucket)"""
+        total = buckets[-1][1] if buckets else 0
+        if not total:
+            return None
+        for bound, count in buckets:
+            if count >= quantile * total:
+                return bound * 1000 if bound != float("inf") else None
+        return None
+
+
+site_registry = SiteRegistry(load_sites(settings.SITE_ADAPTERS_FILE), render_domains=settings.RENDER_DOMAINS)
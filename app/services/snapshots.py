@@ -0,0 +1,352 @@
+"""
+Content-addressed store of fetched product pages.
+
+Every page the scraper downloads is kept, zlib-compressed, under the SHA-256
+of its content:
+
+    objects/ab/ab12...ef.z      one file per distinct page
+    index/cd/cd34...01.jsonl    per URL: one line per fetch {at, hash, ok}
+
+Identical pages (a product that didn't change between checks) are stored
+once; later fetches only add an index line and refresh the object's mtime.
+When the objects outgrow SNAPSHOT_MAX_BYTES the least recently fetched ones
+are evicted, together with their index lines. Each process keeps a running
+total of its own writes and re-reads the directory before evicting and after
+writing RESCAN_RATIO of the limit, so workers sharing a directory overshoot
+the limit by at most that share each.
+
+`ok` records whether the parser found a price. After a retailer changes its
+markup and the selectors are fixed, `reparse` runs the current parsers over
+the stored pages that failed and backfills the price history for that window
+without downloading anything again:
+
+    python -m app.services.snapshots reparse --since 2026-10-01
+    python -m app.services.snapshots stats
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.domain import PriceHistory, Product, ProductDailyPrice, ProductPriceAggregate
+
+EVICT_TO_RATIO = 0.9  # eviction frees space down to this share of the limit
+RESCAN_RATIO = 0.05  # re-read the size from disk after writing this share of the limit
+
+
+class Snapshot(NamedTuple):
+    url: str
+    at: datetime
+    hash: str
+    ok: bool
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class SnapshotStore:
+    """Compressed, deduplicated page snapshots under a local directory"""
+
+    def __init__(self, root: str, max_bytes: int = settings.SNAPSHOT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._written = 0  # bytes this process wrote since it last read the size
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.z")
+
+    def index_path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.root, "index", key[:2], f"{key}.jsonl")
+
+    def put(self, content: bytes) -> str:
+        """Store a page once; returns its hash"""
+        digest = content_hash(content)
+        path = self.object_path(digest)
+
+        if os.path.exists(path):
+            # Dedup hit: only mark it as recently used
+            os.utime(path)
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob = zlib.compress(content, 6)
+        # Write then rename so readers never see a partial object
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(blob)
+        os.replace(temp, path)
+
+        if self._size is not None:
+            self._size += len(blob)
+        self._written += len(blob)
+        # Other processes write here too: our total only counts our own writes
+        if self.size() > self.max_bytes or self._written >= self.max_bytes * RESCAN_RATIO:
+            self._size = None
+            self._written = 0
+            if self.size() > self.max_bytes:
+                self.evict()
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Page content by hash, or None if it was evicted"""
+        try:
+            with open(self.object_path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def record(self, url: str, content: bytes, ok: bool, at: Optional[datetime] = None) -> str:
+        """Store a fetched page and log the fetch for its URL"""
+        digest = self.put(content)
+        line = json.dumps({
+            "url": url,
+            "at": (at or datetime.utcnow()).isoformat(),
+            "hash": digest,
+            "ok": ok
+        })
+
+        path = self.index_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line + "\n")
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return digest
+
+    def history(self, url: str) -> List[Snapshot]:
+        """Fetches logged for a URL, oldest first"""
+        try:
+            with open(self.index_path(url)) as f:
+                return [self._snapshot(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def snapshots(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[Snapshot]:
+        """Every logged fetch in [since, until)"""
+        for path in self._index_files():
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    snapshot = self._snapshot(line)
+                    if since and snapshot.at < since:
+                        continue
+                    if until and snapshot.at >= until:
+                        continue
+                    yield snapshot
+
+    def mark_parsed(self, url: str, fetched: Dict[datetime, bool]):
+        """Update the ok flag of some of a URL's fetches, keyed by fetch time"""
+        self._rewrite_index(self.index_path(url), lambda entry: {
+            **entry, "ok": fetched.get(datetime.fromisoformat(entry["at"]), entry["ok"])
+        })
+
+    def size(self) -> int:
+        """Total bytes used by stored objects"""
+        if self._size is None:
+            self._size = sum(os.path.getsize(path) for path in self._object_files())
+        return self._size
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """Drop least recently used objects until under `target` bytes; returns how many"""
+        target = int(self.max_bytes * EVICT_TO_RATIO) if target is None else target
+        objects = sorted(
+            ((os.stat(path), path) for path in self._object_files()),
+            key=lambda item: item[0].st_mtime
+        )
+        size = sum(stat.st_size for stat, _ in objects)
+
+        evicted = set()
+        for stat, path in objects:
+            if size <= target:
+                break
+            os.remove(path)
+            size -= stat.st_size
+            evicted.add(os.path.basename(path)[:-2])
+        self._size = size
+        self._written = 0
+
+        if evicted:
+            # Forget the fetches whose page is gone
+            for path in self._index_files():
+                self._rewrite_index(path, lambda entry: None if entry["hash"] in evicted else entry)
+
+        return len(evicted)
+
+    def _object_files(self) -> Iterator[str]:
+        yield from self._files("objects", ".z")
+
+    def _index_files(self) -> Iterator[str]:
+        yield from self._files("index", ".jsonl")
+
+    def _files(self, kind: str, suffix: str) -> Iterator[str]:
+        base = os.path.join(self.root, kind)
+        if not os.path.isdir(base):
+            return
+        for prefix in sorted(os.listdir(base)):
+            directory = os.path.join(base, prefix)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(suffix):
+                    yield os.path.join(directory, name)
+
+    @staticmethod
+    def _snapshot(line: str) -> Snapshot:
+        entry = json.loads(line)
+        return Snapshot(entry["url"], datetime.fromisoformat(entry["at"]), entry["hash"], entry["ok"])
+
+    def _rewrite_index(self, path: str, update: Callable[[dict], Optional[dict]]):
+        """Apply `update` to each entry of an index file; None drops the entry"""
+        try:
+            f = open(path, "r+")
+        except FileNotFoundError:
+            return
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                entries = [json.loads(line) for line in f if line.strip()]
+                updated = [entry for entry in map(update, entries) if entry is not None]
+                if updated == entries:
+                    return
+                f.seek(0)
+                f.truncate()
+                f.writelines(json.dumps(entry) + "\n" for entry in updated)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# Singleton instance (None when snapshots are disabled)
+snapshot_store = SnapshotStore(settings.SNAPSHOT_DIR) if settings.SNAPSHOT_DIR else None
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Dependency for the page snapshot store"""
+    return snapshot_store
+
+
+def reparse_snapshots(
+    db: Session,
+    store: SnapshotStore,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    parse: Optional[Callable[[str, str], Optional[dict]]] = None,
+    cache=None
+) -> dict:
+    """
+    Parse again the stored pages whose price was not found and add the
+    recovered prices to the history of every active product with that URL
+    that already existed when the page was fetched.
+    """
+    from app.core.http_cache import invalidate_product_responses
+    from app.services.dashboard import invalidate_dashboard
+    from app.services.scraper import parse_page
+
+    parse = parse or parse_page
+
+    missed: Dict[str, List[Snapshot]] = {}
+    for snapshot in store.snapshots(since, until):
+        if not snapshot.ok:
+            missed.setdefault(snapshot.url, []).append(snapshot)
+
+    recovered = 0
+    failed = 0
+    touched = set()
+    owners = set()
+    for url, snapshots in missed.items():
+        products = db.query(Product).filter(Product.url == url, Product.is_active == True).all()
+        parsed = {}
+        for snapshot in snapshots:
+            content = store.get(snapshot.hash)
+            try:
+                result = parse(url, content.decode()) if content is not None else None
+            except Exception:
+                result = None
+            if not result:
+                failed += 1
+                continue
+
+            parsed[snapshot.at] = True
+            recovered += 1
+            for product in products:
+                if product.created_at and snapshot.at < product.created_at:
+                    continue
+                db.add(PriceHistory(product_id=product.id, price=result["price"], timestamp=snapshot.at))
+                if product.last_checked is None or snapshot.at > product.last_checked:
+                    product.current_price = result["price"]
+                    product.last_checked = snapshot.at
+                touched.add(product.id)
+                owners.add(product.user_id)
+
+        if parsed:
+            db.commit()
+            store.mark_parsed(url, parsed)
+
+    if touched:
+        # Backfilled history changes past windows: rebuild aggregates on the next observation
+        db.query(ProductDailyPrice).filter(ProductDailyPrice.product_id.in_(touched)).delete(synchronize_session=False)
+        db.query(ProductPriceAggregate).filter(
+            ProductPriceAggregate.product_id.in_(touched)
+        ).delete(synchronize_session=False)
+        db.query(Product).filter(Product.id.in_(touched)).update(
+            {Product.version: Product.version + 1}, synchronize_session=False
+        )
+        db.commit()
+        if cache is not None:
+            for product_id in touched:
+                invalidate_product_responses(cache, product_id)
+            for user_id in owners:
+                invalidate_dashboard(cache, user_id)
+
+    return {"recovered": recovered, "failed": failed, "products": len(touched)}
+
+
+def main():
+    from app.core.cache import redis_client
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Stored product page snapshots")
+    parser.add_argument("--dir", default=settings.SNAPSHOT_DIR, help="Snapshot directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reparse = commands.add_parser("reparse", help="Re-parse pages whose price was not found")
+    reparse.add_argument("--since", type=datetime.fromisoformat)
+    reparse.add_argument("--until", type=datetime.fromisoformat)
+
+    commands.add_parser("stats", help="Show store size")
+    commands.add_parser("evict", help="Evict down to the size limit now")
+
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("set SNAPSHOT_DIR or pass --dir")
+
+    store = SnapshotStore(args.dir)
+    if args.command == "stats":
+        print({"bytes": store.size(), "max_bytes": store.max_bytes})
+    elif args.command == "evict":
+        print({"evicted": store.evict()})
+    else:
+        db = SessionLocal()
+        try:
+            print(reparse_snapshots(db, store, args.since, args.until, cache=redis_client))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Streaming page reads.
+
+Product pages can be megabytes long while the price and title usually sit
+in the first part of the document. read_page() downloads the body chunk by
+chunk and searches the raw bytes for the adapter's price marker (the class,
+id or pattern of its first price selector). Once it shows up, the part
+received so far is parsed with SiteAdapter.parse_prefix(), which only
+answers when the rest of the page can't change the result; the download
+then stops and the connection is closed. If the prefix isn't enough yet,
+the next attempt waits until twice as much has arrived, so a page is never
+parsed more than about twice in total.
+
+No more than SCRAPER_MAX_BYTES (after decompression) is ever kept: past
+that the download stops and whatever arrived is parsed.
+"""
+import time
+from typing import Dict, NamedTuple, Optional
+
+import httpx
+
+from app.services.sites import SiteAdapter
+
+# Where to look again for a marker that may straddle two chunks
+MARKER_OVERLAP = 256
+# First parse attempt for adapters without a marker
+NO_MARKER_ATTEMPT_BYTES = 64 * 1024
+
+
+class PageRead(NamedTuple):
+    html: str
+    result: Optional[Dict]
+    bytes_read: int  # as downloaded, before decompression
+    complete: bool  # the whole body was read
+    truncated: bool  # stopped at max_bytes
+    parse_seconds: float  # spent in the adapter, over every attempt
+
+
+async def read_page(response: httpx.Response, adapter: SiteAdapter, max_bytes: int) -> PageRead:
+    """Read a streamed response until the adapter has the price, the body ends or max_bytes"""
+    encoding = response.charset_encoding or "utf-8"
+    marker = adapter.price_marker
+    buffer = bytearray()
+    scanned = 0
+    next_attempt = None if marker is not None else NO_MARKER_ATTEMPT_BYTES
+    truncated = False
+    parse_seconds = 0.0
+
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            del buffer[max_bytes:]
+            truncated = True
+            break
+
+        if next_attempt is None:
+            match = marker.search(buffer, max(0, scanned - MARKER_OVERLAP))
+            scanned = len(buffer)
+            if match:
+                next_attempt = match.end()
+
+        if next_attempt is not None and len(buffer) > next_attempt:
+            started = time.perf_counter()
+            html = buffer.decode(encoding, errors="replace")
+            result = adapter.parse_prefix(html)
+            parse_seconds += time.perf_counter() - started
+            if result is not None:
+                return PageRead(html, result, response.num_bytes_downloaded, False, False, parse_seconds)
+            next_attempt = 2 * len(buffer)
+
+    started = time.perf_counter()
+    html = buffer.decode(encoding, errors="replace")
+    result = adapter.parse(html)
+    parse_seconds += time.perf_counter() - started
+    return PageRead(html, result, response.num_bytes_downloaded, not truncated, truncated, parse_seconds)
@@ -1,10 +1,19 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown
+from prometheus_client import multiprocess, start_http_server
+from urllib.parse import urlsplit
 from app.core.config import settings
+from app.core.metrics import metrics, metrics_registry
+from app.core.profiling import profiled_if
 from app.core.database import SessionLocal
 from app.core.cache import redis_client
+from app.services.connections import dns_cache, shared_client, warm_up_origin
 from app.services.monitor import PriceMonitorService
+from app.services.renderer import render_pool
 import asyncio
+import os
+import time
 
 # Initialize Celery
 celery_app = Celery(
@@ -32,12 +41,81 @@ celery_app.conf.beat_schedule = {
         "task": "app.workers.celery_worker.check_all_products_task",
         "schedule": crontab(minute=0),  # Every hour
     },
+    "dispatch-notifications": {
+        "task": "app.workers.celery_worker.dispatch_notifications_task",
+        "schedule": 30.0,  # Every 30 seconds
+    },
+    "maintain-history-partitions-daily": {
+        "task": "app.workers.celery_worker.maintain_history_partitions_task",
+        "schedule": crontab(minute=30, hour=0),  # Every day at 00:30
+    },
 }
 
+if settings.PIPELINE_ENABLED:
+    # The sweep only queues fetch jobs; pipeline workers do the checking
+    celery_app.conf.beat_schedule["check-all-products-hourly"]["task"] = (
+        "app.workers.celery_worker.enqueue_pipeline_sweep_task"
+    )
+
+if settings.COLD_ARCHIVE_DIR:
+    celery_app.conf.beat_schedule["archive-cold-history-daily"] = {
+        "task": "app.workers.celery_worker.archive_cold_history_task",
+        "schedule": crontab(minute=0, hour=2),  # Every day at 02:00
+    }
+
+
+@worker_init.connect
+@worker_process_init.connect
+def warm_up_dns(**kwargs):
+    """Resolve the busiest retailer hosts before the first task needs them"""
+    # Prefork children inherit the parent's entries, so their own pass is a cache hit
+    hosts = [urlsplit(warm_up_origin(domain)).hostname for domain in settings.SCRAPER_WARM_DOMAINS]
+    if hosts:
+        asyncio.run(dns_cache.warm(hosts))
+
+
+@worker_init.connect
+def serve_metrics(**kwargs):
+    """Expose task and scrape metrics when METRICS_WORKER_PORT is set"""
+    if settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=metrics_registry())
+
+
+@worker_process_shutdown.connect
+def forget_process_metrics(pid=None, **kwargs):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+# Start times of the tasks running in this process, by task id
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, retval=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    # Tasks catch their errors and report them in the result
+    status = retval.get("status") if isinstance(retval, dict) and "status" in retval else state
+    metrics.task(task.name, str(status).lower(), time.perf_counter() - started)
+
+
+def _profile_fields(taken) -> dict:
+    """profile_id for the task result when a profile was saved"""
+    if taken is None or taken.id is None:
+        return {}
+    return {"profile_id": taken.id}
+
 
 @celery_app.task(name="app.workers.celery_worker.check_product_task")
-def check_product_task(product_id: int):
-    """Background task to check a single product price"""
+def check_product_task(product_id: int, profile: bool = False):
+    """Background task to check a single product price; profile=True saves a stack profile of the check"""
     db = SessionLocal()
     try:
         monitor = PriceMonitorService(db, redis_client)
@@ -45,13 +123,20 @@ def check_product_task(product_id: int):
         # Run async function in sync context
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(monitor.check_product_price(product_id))
-        loop.close()
+        with profiled_if(profile, "check_product") as taken:
+            try:
+                result = loop.run_until_complete(monitor.check_product_price(product_id))
+            finally:
+                # Browsers and connections opened by the scraper belong to this loop
+                loop.run_until_complete(render_pool.close())
+                loop.run_until_complete(shared_client.close())
+                loop.close()
         
         return {
             "status": "success",
             "product_id": product_id,
-            "result": result
+            "result": result,
+            **_profile_fields(taken)
         }
     except Exception as e:
         return {
@@ -64,8 +149,8 @@ def check_product_task(product_id: int):
 
 
 @celery_app.task(name="app.workers.celery_worker.check_all_products_task")
-def check_all_products_task():
-    """Background task to check all active products"""
+def check_all_products_task(profile: bool = False):
+    """Background task to check all active products; profile=True saves a stack profile of the sweep"""
     db = SessionLocal()
     try:
         monitor = PriceMonitorService(db, redis_client)
@@ -73,15 +158,70 @@ def check_all_products_task():
         # Run async function in sync context
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(monitor.check_all_products())
-        loop.close()
+        with profiled_if(profile, "check_all_products") as taken:
+            try:
+                # Connect to the busiest hosts up front instead of on their first product
+                loop.run_until_complete(shared_client.warm_up(settings.SCRAPER_WARM_DOMAINS))
+                results = loop.run_until_complete(monitor.check_all_products())
+            finally:
+                # Browsers and connections opened by the scraper belong to this loop
+                loop.run_until_complete(render_pool.close())
+                loop.run_until_complete(shared_client.close())
+                loop.close()
         
         return {
             "status": "success",
             "checked_count": len(results),
-            "results": results
+            "results": results,
+            **_profile_fields(taken)
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.workers.celery_worker.enqueue_pipeline_sweep_task")
+def enqueue_pipeline_sweep_task():
+    """Queue every active product on the ingestion pipeline"""
+    from app.workers.pipeline import enqueue_sweep
+    
+    try:
+        return {
+            "status": "success",
+            "queued": enqueue_sweep(redis_client.redis)
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+
+
+@celery_app.task(name="app.workers.celery_worker.dispatch_notifications_task")
+def dispatch_notifications_task(max_batches: int = 50):
+    """Send queued alert notifications from the outbox"""
+    from app.services.notifications import NotificationDispatcher
+    
+    db = SessionLocal()
+    try:
+        dispatcher = NotificationDispatcher(db)
+        
+        # Run async function in sync context
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        result = loop.run_until_complete(dispatcher.run(max_batches=max_batches))
+        loop.close()
+        
+        return {
+            "status": "success",
+            **result
         }
     except Exception as e:
+        db.rollback()
         return {
             "status": "error",
             "error": str(e)
@@ -92,22 +232,74 @@ def check_all_products_task():
 
 @celery_app.task(name="app.workers.celery_worker.cleanup_old_history_task")
 def cleanup_old_history_task(days: int = 90):
-    """Clean up price history older than specified days"""
+    """Clean up price history older than specified days (moved to the cold archive first, if any)"""
     from datetime import datetime, timedelta
-    from app.domain import PriceHistory
+    from app.services.archive import get_cold_archive
+    from app.services.retention import purge_history_before
     
     db = SessionLocal()
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        deleted_count = db.query(PriceHistory).filter(
-            PriceHistory.timestamp < cutoff_date
-        ).delete()
+        result = purge_history_before(db, cutoff_date, cache=redis_client, cold_archive=get_cold_archive())
+        
+        return {
+            "status": "success",
+            **result
+        }
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.workers.celery_worker.maintain_history_partitions_task")
+def maintain_history_partitions_task():
+    """Create upcoming monthly price history partitions ahead of time"""
+    from app.services.partitions import PriceHistoryPartitionManager
+    
+    db = SessionLocal()
+    try:
+        created = PriceHistoryPartitionManager(db).ensure_partitions()
         
-        db.commit()
+        return {
+            "status": "success",
+            "created_partitions": created
+        }
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.workers.celery_worker.archive_cold_history_task")
+def archive_cold_history_task(days: int = settings.HOT_HISTORY_DAYS):
+    """Move price history older than specified days to the cold archive"""
+    from datetime import datetime, timedelta
+    from app.services.archive import get_cold_archive, move_to_cold
+    
+    archive = get_cold_archive()
+    if archive is None:
+        return {
+            "status": "skipped",
+            "reason": "COLD_ARCHIVE_DIR is not set"
+        }
+    
+    db = SessionLocal()
+    try:
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        result = move_to_cold(db, archive, cutoff_date)
         
         return {
             "status": "success",
-            "deleted_count": deleted_count
+            **result
         }
     except Exception as e:
         db.rollback()
@@ -0,0 +1,429 @@
+"""
+Staged price ingestion on Redis Streams.
+
+    pipeline:fetch --FetchStage--> pipeline:raw --ParseStage--> pipeline:parsed --PersistStage--> database
+
+Each stage is a consumer group on its input stream, so any number of
+processes can run one stage and Redis spreads the entries between them:
+
+    python -m app.workers.pipeline fetch      # I/O bound, many requests in flight
+    python -m app.workers.pipeline parse      # CPU bound, HTML parsed in a process pool
+    python -m app.workers.pipeline persist    # batched DB writes and alert evaluation
+    python -m app.workers.pipeline all        # every stage in one process
+    python -m app.workers.pipeline enqueue    # add a fetch job for every active product
+
+An entry is acknowledged and deleted in the same MULTI as the XADD of its
+result downstream, so it is never lost between stages. Entries a crashed
+consumer left pending are taken over with XAUTOCLAIM after
+PIPELINE_CLAIM_IDLE_MS. Entries that can't be processed (request failed, no
+price on the page, bad data) go to pipeline:dead with the reason.
+
+Because finished entries are deleted, a stream's length is its backlog: a
+stage stops reading while its output stream holds PIPELINE_MAX_BACKLOG
+entries, so a slow stage pushes back on the ones before it instead of
+letting Redis grow without bound.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import httpx
+import redis
+from prometheus_client import start_http_server
+from redis import asyncio as aioredis
+from sqlalchemy.exc import OperationalError
+
+from app.core.cache import RedisClient, redis_client
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics, metrics_registry
+from app.domain import Product
+from app.services.connections import CachingTransport, warm_up
+from app.services.monitor import PriceMonitorService
+from app.services.retry import CircuitOpen, RetriesExhausted, RetryPolicy, fetch_with_retry
+from app.services.scraper import parse_page, parse_with_snapshot, request_headers
+from app.services.sites import site_registry
+from app.services.snapshots import get_snapshot_store
+
+FETCH_STREAM = "pipeline:fetch"
+RAW_STREAM = "pipeline:raw"
+PARSED_STREAM = "pipeline:parsed"
+DEAD_LETTER_STREAM = "pipeline:dead"
+
+IDLE_SLEEP_SECONDS = 0.05  # between polls when reads don't block
+BACKPRESSURE_SLEEP_SECONDS = 0.5
+ERROR_SLEEP_SECONDS = 1.0
+
+Entry = Tuple[bytes, Dict[bytes, bytes]]
+
+
+class DeadLetter(NamedTuple):
+    reason: str
+
+
+Outcome = Union[Dict, DeadLetter, None]
+
+
+def consumer_name() -> str:
+    """Unique consumer name for this process"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def active_products(db) -> List[Tuple[int, str]]:
+    """(id, url) of every product that should be checked"""
+    return db.query(Product.id, Product.url).filter(Product.is_active == True).order_by(Product.id).all()
+
+
+def enqueue_products(client: redis.Redis, products: List[Tuple[int, str]]) -> int:
+    """Add a fetch job per product; returns how many were added"""
+    pipe = client.pipeline(transaction=False)
+    for product_id, url in products:
+        pipe.xadd(FETCH_STREAM, {"product_id": product_id, "url": url})
+    pipe.execute()
+    return len(products)
+
+
+def parse_raw(url: str, body: bytes, encoding: str, fetched_at: Optional[datetime] = None) -> Optional[Dict]:
+    """Decompress and parse a fetched page (runs in a worker process)"""
+    html = zlib.decompress(body).decode(encoding, errors="replace")
+    return parse_with_snapshot(url, html, partial(parse_page, url), get_snapshot_store(), fetched_at)
+
+
+class Stage:
+    """Consumer of one stream in its consumer group"""
+
+    stream: str
+    group: str
+    downstream: Optional[str] = None
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        consumer: Optional[str] = None,
+        batch_size: int = settings.PIPELINE_BATCH_SIZE,
+        block_ms: int = settings.PIPELINE_BLOCK_MS,
+        max_backlog: int = settings.PIPELINE_MAX_BACKLOG,
+        claim_idle_ms: int = settings.PIPELINE_CLAIM_IDLE_MS
+    ):
+        self.redis = client
+        self.consumer = consumer or consumer_name()
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.max_backlog = max_backlog
+        self.claim_idle_ms = claim_idle_ms
+        self.processed = 0
+        self.dead = 0
+        self._claim_cursor = "0-0"
+        self._next_claim = 0.0
+
+    async def ensure_group(self):
+        """Create the consumer group (and stream), reading from the start"""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def wait_for_room(self):
+        """Hold off while the next stage is behind"""
+        if self.downstream is None:
+            return
+        while await self.redis.xlen(self.downstream) >= self.max_backlog:
+            await asyncio.sleep(BACKPRESSURE_SLEEP_SECONDS)
+
+    async def _claim_stale(self) -> List[Entry]:
+        """Take over entries left pending by consumers that stopped"""
+        self._next_claim = time.monotonic() + self.claim_idle_ms / 1000
+        cursor, claimed, *_ = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms,
+            start_id=self._claim_cursor, count=self.batch_size
+        )
+        self._claim_cursor = cursor
+        # Entries deleted while pending come back without fields
+        return [(entry_id, fields) for entry_id, fields in claimed if fields]
+
+    async def read(self) -> List[Entry]:
+        """Next batch: stale entries first, then new ones"""
+        if time.monotonic() >= self._next_claim:
+            entries = await self._claim_stale()
+            if entries:
+                return entries
+
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"},
+            count=self.batch_size, block=self.block_ms or None
+        )
+        return response[0][1] if response else []
+
+    async def process(self, entries: List[Entry]) -> List[Outcome]:
+        """Result per entry: fields for the next stream, a DeadLetter, or None when done"""
+        raise NotImplementedError
+
+    async def finish(self, entries: List[Entry], outcomes: List[Outcome]):
+        """Forward results, dead-letter failures and drop the entries, atomically"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for (entry_id, fields), outcome in zip(entries, outcomes):
+                if isinstance(outcome, DeadLetter):
+                    self.dead += 1
+                    pipe.xadd(
+                        DEAD_LETTER_STREAM,
+                        {**fields, "stage": self.group, "reason": outcome.reason},
+                        maxlen=settings.PIPELINE_DEAD_LETTER_MAXLEN,
+                        approximate=True
+                    )
+                elif outcome is not None and self.downstream is not None:
+                    pipe.xadd(self.downstream, outcome)
+
+            entry_ids = [entry_id for entry_id, _ in entries]
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            await pipe.execute()
+
+        self.processed += len(entries)
+
+    async def run_once(self) -> int:
+        """Process one batch; returns the number of entries handled"""
+        await self.wait_for_room()
+        entries = await self.read()
+        if not entries:
+            return 0
+
+        outcomes = await self.process(entries)
+        await self.finish(entries, outcomes)
+        return len(entries)
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Process batches until `stop` is set"""
+        await self.ensure_group()
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    handled = await self.run_once()
+                except (redis.RedisError, OperationalError) as e:
+                    # Unfinished entries stay pending and are claimed again later
+                    print(f"Pipeline {self.group} error: {e}")
+                    await asyncio.sleep(ERROR_SLEEP_SECONDS)
+                    continue
+
+                if not handled and not self.block_ms:
+                    await asyncio.sleep(IDLE_SLEEP_SECONDS)
+        finally:
+            await self.close()
+
+    async def close(self):
+        pass
+
+
+class FetchStage(Stage):
+    """Downloads product pages and queues the compressed body"""
+
+    stream = FETCH_STREAM
+    group = "fetchers"
+    downstream = RAW_STREAM
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        concurrency: int = settings.PIPELINE_FETCH_CONCURRENCY,
+        timeout: float = settings.REQUEST_TIMEOUT,
+        **kwargs
+    ):
+        super().__init__(client, **kwargs)
+        self.http = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            transport=CachingTransport(
+                limits=httpx.Limits(max_connections=concurrency, keepalive_expiry=settings.SCRAPER_KEEPALIVE_SECONDS)
+            )
+        )
+        self._limit = asyncio.Semaphore(concurrency)
+        self.retry_policy = RetryPolicy()
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        # The first entries shouldn't wait for lookups and handshakes to the busiest hosts
+        await warm_up(self.http, settings.SCRAPER_WARM_DOMAINS)
+        await super().run(stop)
+
+    async def fetch(self, fields: Dict[bytes, bytes]) -> Outcome:
+        url = fields[b"url"].decode()
+        async with self._limit:
+            started = time.perf_counter()
+            try:
+                response = await fetch_with_retry(self.http, url, request_headers(url), self.retry_policy)
+            except (httpx.HTTPError, CircuitOpen, RetriesExhausted) as e:
+                return DeadLetter(f"fetch failed: {e!r}")
+            metrics.fetch(site_registry.domain_label(url), time.perf_counter() - started)
+
+        return {
+            "product_id": fields[b"product_id"],
+            "url": url,
+            "fetched_at": datetime.utcnow().isoformat(),
+            "encoding": response.encoding or "utf-8",
+            "body": zlib.compress(response.content)
+        }
+
+    async def process(self, entries: List[Entry]) -> List[Outcome]:
+        return await asyncio.gather(*(self.fetch(fields) for _, fields in entries))
+
+    async def close(self):
+        await self.http.aclose()
+
+
+class ParseStage(Stage):
+    """Extracts prices from fetched pages in a process pool"""
+
+    stream = RAW_STREAM
+    group = "parsers"
+    downstream = PARSED_STREAM
+
+    def __init__(self, client: aioredis.Redis, executor: Optional[Executor] = None, **kwargs):
+        super().__init__(client, **kwargs)
+        self._owns_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(settings.PIPELINE_PARSE_PROCESSES)
+
+    async def parse(self, fields: Dict[bytes, bytes]) -> Outcome:
+        url = fields[b"url"].decode()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.executor, parse_raw, url, fields[b"body"], fields[b"encoding"].decode(),
+                datetime.fromisoformat(fields[b"fetched_at"].decode())
+            )
+        except Exception as e:
+            return DeadLetter(f"parse failed: {e!r}")
+
+        if not result:
+            return DeadLetter("no price found")
+
+        return {
+            "product_id": fields[b"product_id"],
+            "price": repr(result["price"]),
+            "title": result["title"],
+            "source": result["source"],
+            "fetched_at": fields[b"fetched_at"]
+        }
+
+    async def process(self, entries: List[Entry]) -> List[Outcome]:
+        return await asyncio.gather(*(self.parse(fields) for _, fields in entries))
+
+    async def close(self):
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PersistStage(Stage):
+    """Records parsed prices a batch per transaction and evaluates alerts"""
+
+    stream = PARSED_STREAM
+    group = "persisters"
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        session_factory=SessionLocal,
+        cache: RedisClient = redis_client,
+        **kwargs
+    ):
+        super().__init__(client, **kwargs)
+        self.session_factory = session_factory
+        self.cache = cache
+
+    @staticmethod
+    def observation(fields: Dict[bytes, bytes]) -> dict:
+        timestamp = datetime.fromisoformat(fields[b"fetched_at"].decode())
+        return {
+            "product_id": int(fields[b"product_id"]),
+            "price": float(fields[b"price"]),
+            "title": fields[b"title"].decode(),
+            "source": fields[b"source"].decode(),
+            "timestamp": timestamp
+        }
+
+    def persist(self, entries: List[Entry]) -> List[Outcome]:
+        """Write the batch in one transaction, or entry by entry if that fails"""
+        outcomes: List[Outcome] = [None] * len(entries)
+        observations = []
+        for index, (_, fields) in enumerate(entries):
+            try:
+                observations.append((index, self.observation(fields)))
+            except (KeyError, ValueError) as e:
+                outcomes[index] = DeadLetter(f"invalid entry: {e!r}")
+
+        db = self.session_factory()
+        try:
+            monitor = PriceMonitorService(db, self.cache)
+            try:
+                monitor.record_prices([observation for _, observation in observations])
+                return outcomes
+            except OperationalError:
+                # Database unavailable: leave the batch pending
+                raise
+            except Exception:
+                db.rollback()
+
+            # Isolate the entry that made the batch fail
+            for index, observation in observations:
+                try:
+                    monitor.record_prices([observation])
+                except OperationalError:
+                    raise
+                except Exception as e:
+                    db.rollback()
+                    outcomes[index] = DeadLetter(f"persist failed: {e!r}")
+            return outcomes
+        finally:
+            db.close()
+
+    async def process(self, entries: List[Entry]) -> List[Outcome]:
+        # Blocking DB work runs off the event loop
+        return await asyncio.to_thread(self.persist, entries)
+
+
+STAGES = {"fetch": FetchStage, "parse": ParseStage, "persist": PersistStage}
+
+
+async def run_stages(names: List[str], client: Optional[aioredis.Redis] = None, stop: Optional[asyncio.Event] = None):
+    """Run the named stages side by side in this process"""
+    client = client or aioredis.Redis.from_url(settings.REDIS_URL)
+    stages = [STAGES[name](client) for name in names]
+    try:
+        await asyncio.gather(*(stage.run(stop) for stage in stages))
+    finally:
+        await client.aclose()
+
+
+def enqueue_sweep(client: Optional[redis.Redis] = None) -> int:
+    """Queue a fetch job for every active product"""
+    db = SessionLocal()
+    try:
+        products = active_products(db)
+    finally:
+        db.close()
+    return enqueue_products(client or redis.Redis.from_url(settings.REDIS_URL), products)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Price ingestion pipeline")
+    parser.add_argument("command", choices=[*STAGES, "all", "enqueue"])
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        print(f"Queued {enqueue_sweep()} products")
+        return
+
+    if settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=metrics_registry())
+
+    names = list(STAGES) if args.command == "all" else [args.command]
+    asyncio.run(run_stages(names))
+
+
+if __name__ == "__main__":
+    main()
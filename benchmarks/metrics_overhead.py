@@ -0,0 +1,212 @@
+"""
+Instrumentation overhead benchmark.
+
+Runs the two hot paths with metrics enabled and disabled, switching on
+every call so drift (CPU frequency, other processes) hits both sides alike,
+with the garbage collector paused inside rounds. Reports how much slower
+the instrumented side is, next to what the metric calls one operation makes
+cost on their own:
+
+    api     GET /api/v1/products/ for a user with 50 products (TestClient, SQLite)
+    scrape  ScraperService on a 30 KB product page served from memory
+
+The target is an overhead under 1%. On a busy machine the end-to-end
+difference is noisier than that; recording_pct is the stable figure.
+
+Usage:
+    python -m benchmarks.metrics_overhead
+    python -m benchmarks.metrics_overhead --rounds 30 --requests 100
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+import fakeredis
+import httpx
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import RedisClient, get_redis
+from app.core.database import build_engine, get_db
+from app.core.metrics import metrics
+from app.core.security import create_access_token
+from app.domain.models import Base, Product, User
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.services.sites import site_registry
+from main import app
+
+PAGE = (
+    '<html><head><title>Fritadeira</title></head><body>'
+    '<h1 class="ui-pdp-title">Fritadeira Elétrica 4L</h1>'
+    '<div class="andes-money-amount"><span class="andes-money-amount__currency-symbol">R$</span>'
+    '<span class="andes-money-amount__fraction">349</span>'
+    '<span class="andes-money-amount__cents">90</span></div>'
+    + "<div class='review'>Chegou rápido, funciona muito bem.</div>" * 500
+    + "</body></html>"
+).encode()
+
+
+class MemoryHTTP:
+    """Scraper client answering every request with PAGE, without sockets"""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(
+                200, headers={"Content-Type": "text/html; charset=utf-8"}, stream=httpx.ByteStream(PAGE)
+            )
+        ))
+
+    def get(self) -> httpx.AsyncClient:
+        return self.client
+
+
+def recording_cost(record: Callable[[], None], repeat: int = 20000) -> float:
+    """Seconds the metric calls made by one operation take on their own"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        record()
+    return (time.perf_counter() - started) / repeat
+
+
+def compare(operation: Callable[[], None], record: Callable[[], None], rounds: int, requests: int) -> Dict:
+    """Time an operation with metrics on and off, switching on every call"""
+    totals = {True: 0.0, False: 0.0}
+    try:
+        for _ in range(rounds):
+            # Collections would land on whichever call happens to cross the threshold
+            gc.collect()
+            gc.disable()
+            try:
+                for i in range(requests):
+                    # Neighbouring calls see the same machine, so drift hits both sides alike
+                    for enabled in ((True, False) if i % 2 == 0 else (False, True)):
+                        metrics.enabled = enabled
+                        started = time.perf_counter()
+                        operation()
+                        totals[enabled] += time.perf_counter() - started
+            finally:
+                gc.enable()
+    finally:
+        metrics.enabled = True
+
+    calls = rounds * requests
+    instrumented = totals[True] / calls
+    plain = totals[False] / calls
+    recording = recording_cost(record)
+    return {
+        "plain_us": round(plain * 1e6, 1),
+        "instrumented_us": round(instrumented * 1e6, 1),
+        "overhead_pct": round((instrumented / plain - 1) * 100, 2),
+        "recording_us": round(recording * 1e6, 2),
+        "recording_pct": round(recording / plain * 100, 3),
+    }
+
+
+def queries_per_request(client: TestClient, headers: Dict[str, str]) -> int:
+    labels = {"route": "/api/v1/products/"}
+    before = REGISTRY.get_sample_value("http_request_db_queries_sum", labels) or 0
+    client.get("/api/v1/products/", headers=headers)
+    return int(REGISTRY.get_sample_value("http_request_db_queries_sum", labels) - before)
+
+
+def bench_api(rounds: int, requests: int) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = SessionFactory()
+        user = User(email="bench@example.com", username="bench", hashed_password="x", is_active=True)
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Product(user_id=user.id, name=f"Produto {i}", url=f"https://example.com/p/{i}", current_price=99.9)
+            for i in range(50)
+        )
+        db.commit()
+        db.close()
+
+        def override_get_db():
+            session = SessionFactory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        cache = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_redis] = lambda: cache
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+        try:
+            with TestClient(app) as client:
+                def list_products():
+                    client.get("/api/v1/products/", headers=headers)
+
+                for _ in range(20):  # warm-up
+                    list_products()
+                queries = queries_per_request(client, headers)
+
+                def record():
+                    metrics.request("GET", "/api/v1/products/", 200, 0.004, queries)
+                    for _ in range(queries):
+                        metrics.query("select", 0.0001)
+
+                return compare(list_products, record, rounds, requests)
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+def bench_scrape(rounds: int, requests: int) -> Dict:
+    scraper = ScraperService(
+        snapshots=None,
+        breakers=CircuitBreakers(),
+        http=MemoryHTTP()
+    )
+    adapter = site_registry.get("mercadolivre")
+    url = "https://produto.mercadolivre.com.br/MLB-1"
+
+    loop = asyncio.new_event_loop()
+
+    def scrape():
+        loop.run_until_complete(scraper.scrape_with(adapter, url))
+
+    try:
+        for _ in range(20):  # warm-up
+            scrape()
+        def record():
+            metrics.fetch("mercadolivre.com.br", 0.1)
+            metrics.scrape("mercadolivre", "success", 0.1, 0.01, len(PAGE))
+
+        return compare(scrape, record, rounds, requests)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def run_benchmark(rounds: int = 15, requests: int = 50) -> Dict:
+    """Time both hot paths with and without instrumentation"""
+    return {
+        "api": bench_api(rounds, requests),
+        "scrape": bench_scrape(rounds, requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark instrumentation overhead")
+    parser.add_argument("--rounds", type=int, default=15, help="Rounds (garbage collected in between)")
+    parser.add_argument("--requests", type=int, default=50, help="Calls per round and side")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.rounds, args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Price parsing micro-benchmark.
+
+Compares the single-pass parser in app.services.prices with the regex
+cleanup it replaced (strip everything but digits and separators, turn ","
+into ".", float()) on a corpus of real-world price strings. Reports
+throughput and how many strings each one reads correctly.
+
+Usage:
+    python -m benchmarks.price_parsing
+    python -m benchmarks.price_parsing --repeat 20000
+"""
+import argparse
+import json
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.prices import parse_price
+
+NOT_PRICE_CHARS = re.compile(r"[^\d,.]")
+
+CORPUS: List[Tuple[str, float]] = [
+    ("R$ 1.299,90", 1299.90),
+    ("R$ 150,50", 150.50),
+    ("R$ 12.345.678,99", 12345678.99),
+    ("R$ 99", 99.0),
+    ("Por: R$ 1.299,90 à vista", 1299.90),
+    ("$1,299.90", 1299.90),
+    ("US$ 49.99", 49.99),
+    ("$12,345,678.99", 12345678.99),
+    ("12,50 €", 12.50),
+    ("1.299", 1299.0),
+    ("1299.9", 1299.9),
+    ("349", 349.0),
+    ("19.90", 19.90),
+    ("1.299,", 1299.0),
+    ("0,99", 0.99),
+]
+
+
+def legacy_parse(text: str) -> Optional[float]:
+    """The previous approach: regex cleanup then float()"""
+    try:
+        return float(NOT_PRICE_CHARS.sub("", text).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def tokenizer_parse(text: str) -> Optional[float]:
+    price = parse_price(text)
+    return price.amount if price else None
+
+
+def measure(parse: Callable[[str], Optional[float]], repeat: int) -> Dict:
+    correct = sum(1 for text, expected in CORPUS if parse(text) is not None and abs(parse(text) - expected) < 1e-9)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text, _ in CORPUS:
+            parse(text)
+    elapsed = time.perf_counter() - started
+    calls = repeat * len(CORPUS)
+
+    return {
+        "correct": correct,
+        "total": len(CORPUS),
+        "calls": calls,
+        "ns_per_call": round(elapsed / calls * 1e9, 1),
+        "calls_per_sec": round(calls / elapsed),
+    }
+
+
+def run_benchmark(repeat: int = 5000) -> Dict:
+    """Time both parsers over the corpus"""
+    legacy = measure(legacy_parse, repeat)
+    tokenizer = measure(tokenizer_parse, repeat)
+    return {
+        "legacy_regex": legacy,
+        "tokenizer": tokenizer,
+        "slowdown": round(tokenizer["ns_per_call"] / legacy["ns_per_call"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price parsing")
+    parser.add_argument("--repeat", type=int, default=5000, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Local retailer stub for benchmarks and load tests.
+
+Serves the recorded product pages in benchmarks/pages over HTTP/1.1 with
+keep-alive, picking the page from the Host header:
+
+    *mercadolivre*  mercadolivre.html  (Mercado Livre adapter)
+    *amazon*        amazon.html        (Amazon adapter)
+    anything else   generic.html       (generic price patterns)
+
+The pages are trimmed captures; --pad-kb adds inline CSS and page state back
+so they weigh what the real ones do. Each product path has its own price,
+which moves on a --price-change-rate share of requests so sweeps record new
+history and evaluate alerts. Responses wait --latency-ms (plus up to
+--jitter-ms) and an --error-rate share of them are 503s, like a retailer
+shedding load.
+
+Product URLs keep the retailer's host name
+(http://produto.mercadolivre.com.br:8900/MLB-1) so the right adapter parses
+them; a scraper whose DNS cache uses resolve_to_stub connects to the stub
+for every host.
+
+Usage:
+    python -m benchmarks.retailer_stub --port 8900
+    python -m benchmarks.retailer_stub --port 8900 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+SITES = ("mercadolivre", "amazon", "generic")
+
+RETAILER_HOSTS = {
+    "mercadolivre": "produto.mercadolivre.com.br",
+    "amazon": "www.amazon.com.br",
+    "generic": "loja-exemplo.com.br"
+}
+
+TITLES = [
+    "Fritadeira Elétrica Air Fryer 4L",
+    "Smartphone Galaxy A54 128GB",
+    "Cafeteira Expresso 15 Bar",
+    "Fone de Ouvido Bluetooth",
+    "Monitor Gamer 27 Polegadas 165Hz",
+    "Aspirador Robô Inteligente",
+    "Liquidificador 1200W 3L",
+    "Teclado Mecânico RGB"
+]
+
+
+def product_path(site: str, number: int) -> str:
+    if site == "mercadolivre":
+        return f"/MLB-{number}"
+    if site == "amazon":
+        return f"/dp/B0{number:08d}"
+    return f"/produto/{number}"
+
+
+def product_url(site: str, number: int, port: int) -> str:
+    """URL of a stub product under its retailer's host name"""
+    return f"http://{RETAILER_HOSTS[site]}:{port}{product_path(site, number)}"
+
+
+def site_for_host(host: str) -> str:
+    for site in ("mercadolivre", "amazon"):
+        if site in host:
+            return site
+    return "generic"
+
+
+def base_price(path: str) -> float:
+    """Starting price of a product, the same in every run"""
+    checksum = zlib.crc32(path.encode())
+    return round(30 + checksum % 4000 + (checksum >> 12) % 100 / 100, 2)
+
+
+def format_brl(price: float) -> str:
+    """1299.9 -> 1.299,90"""
+    return f"{price:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def load_pages() -> Dict[str, str]:
+    pages = {}
+    for site in SITES:
+        with open(os.path.join(PAGES_DIR, f"{site}.html"), encoding="utf-8") as f:
+            pages[site] = f.read()
+    return pages
+
+
+def padding(pad_kb: int) -> Tuple[str, str]:
+    """Inline CSS for the head and page state for the end of the body"""
+    rules, state = [], []
+    size, i = 0, 0
+    while size < pad_kb * 256:
+        rules.append(f".ui-c{i}{{margin:0 {i % 16}px;color:#{i * 2654435761 % 0xFFFFFF:06x}}}")
+        size += len(rules[-1])
+        i += 1
+    size, i = 0, 0
+    while size < pad_kb * 768:
+        state.append(json.dumps({"id": f"MLB{i}", "permalink": f"/p/MLB{i}", "thumbnail_id": f"{i:012d}-F", "rank": i}))
+        size += len(state[-1]) + 1
+        i += 1
+    return "".join(rules), "[" + ",".join(state) + "]"
+
+
+class RetailerStub:
+    """Threaded HTTP server answering as Mercado Livre, Amazon and a generic shop"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 20,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        price_change_rate: float = 0.1,
+        pad_kb: int = 100,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.price_change_rate = price_change_rate
+        self.pages = load_pages()
+        self.padding = padding(pad_kb)
+        self.requests = 0
+        self.errors = 0
+        self._prices: Dict[str, float] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                # Connection warm-up
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                status, body = stub.respond(self.headers.get("Host", ""), self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "RetailerStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="retailer-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors}
+
+    def respond(self, host: str, path: str) -> Tuple[int, bytes]:
+        """Status and body for a product request, after the configured latency"""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            if failed:
+                self.errors += 1
+            else:
+                price = self._price(path)
+        time.sleep(delay / 1000)
+
+        if failed:
+            return 503, b"<html><body><h1>Service Unavailable</h1></body></html>"
+        return 200, self.render(site_for_host(host), path, price).encode()
+
+    def render(self, site: str, path: str, price: float) -> str:
+        title = TITLES[zlib.crc32(path.encode()) % len(TITLES)]
+        formatted = format_brl(price)
+        whole, cents = formatted.split(",")
+        head, body = self.padding
+        values = {
+            "title": title,
+            "price": formatted,
+            "price_raw": f"{price:.2f}",
+            "price_int": whole,
+            "price_cents": cents,
+            "price_words": f"{whole} reais com {cents} centavos",
+            "price_installment": format_brl(price / 10),
+            "padding_head": head,
+            "padding_body": body
+        }
+        page = self.pages[site]
+        for name, value in values.items():
+            page = page.replace("{{" + name + "}}", value)
+        return page
+
+    def _price(self, path: str) -> float:
+        price = self._prices.get(path)
+        if price is None:
+            price = base_price(path)
+        elif self._random.random() < self.price_change_rate:
+            price = round(max(1.0, price * self._random.uniform(0.9, 1.08)), 2)
+        self._prices[path] = price
+        return price
+
+
+async def resolve_to_stub(host: str):
+    """DNSCache resolver sending every host to a stub on this machine"""
+    return ["127.0.0.1"], None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded retailer pages locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--price-change-rate", type=float, default=0.1, help="Share of requests that move the price")
+    parser.add_argument("--pad-kb", type=int, default=100, help="Extra inline CSS and state per page")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = RetailerStub(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+        args.price_change_rate, args.pad_kb, args.seed
+    )
+    for site in SITES:
+        print(f"{site:>12}  {product_url(site, 1, stub.port)}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        print(json.dumps(stub.stats()))
+
+
+if __name__ == "__main__":
+    main()
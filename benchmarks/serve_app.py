@@ -0,0 +1,40 @@
+"""
+main:app under uvicorn, set up for load tests.
+
+Every retailer host resolves to the retailer stub on this machine (see
+benchmarks.retailer_stub), so manual checks scrape the stub. With
+--fake-redis the shared Redis client is replaced by an in-process fakeredis,
+for machines without Redis. Everything else, DATABASE_URL included, comes
+from the environment as usual.
+
+Usage:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.serve_app --port 8800 --fake-redis
+"""
+import argparse
+
+import uvicorn
+
+from app.core.cache import redis_client
+from app.services.connections import dns_cache
+from benchmarks.retailer_stub import resolve_to_stub
+from main import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--fake-redis", action="store_true", help="Use an in-process fakeredis instead of REDIS_HOST")
+    args = parser.parse_args()
+
+    dns_cache.resolver = resolve_to_stub
+    if args.fake_redis:
+        import fakeredis
+
+        redis_client.redis = fakeredis.FakeRedis(decode_responses=True)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
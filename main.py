@@ -4,7 +4,10 @@ from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import init_db
-from app.api import auth, products, alerts, monitor
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.api import auth, products, alerts, monitor, dashboard, events, metrics, profiles
+from app.services.events import event_broker
 
 
 @asynccontextmanager
@@ -16,6 +19,7 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await event_broker.close()
 
 
 app = FastAPI(
@@ -33,11 +37,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timings and SQL statement counts for /metrics
+app.add_middleware(MetricsMiddleware)
+
+if settings.PROFILING_ENABLED:
+    # Not installed at all otherwise, so it costs nothing when off
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(products.router, prefix=settings.API_V1_STR)
 app.include_router(alerts.router, prefix=settings.API_V1_STR)
 app.include_router(monitor.router, prefix=settings.API_V1_STR)
+app.include_router(dashboard.router, prefix=settings.API_V1_STR)
+app.include_router(events.router, prefix=settings.API_V1_STR)
+app.include_router(profiles.router, prefix=settings.API_V1_STR)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -0,0 +1,50 @@
+"""composite and partial indexes for hot queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_products_user_id_is_active",
+        "products",
+        ["user_id", "is_active"],
+    )
+    op.create_index(
+        "ix_price_history_product_id_timestamp",
+        "price_history",
+        ["product_id", "timestamp"],
+    )
+    op.create_index(
+        "ix_price_alerts_product_id_active",
+        "price_alerts",
+        ["product_id"],
+        postgresql_where=sa.text("is_active = true"),
+        sqlite_where=sa.text("is_active = 1"),
+    )
+    op.create_index(
+        "ix_price_alerts_user_id_is_active",
+        "price_alerts",
+        ["user_id", "is_active"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_price_alerts_user_id_is_active", table_name="price_alerts")
+    op.drop_index("ix_price_alerts_product_id_active", table_name="price_alerts")
+    op.drop_index("ix_price_history_product_id_timestamp", table_name="price_history")
+    op.drop_index("ix_products_user_id_is_active", table_name="products")
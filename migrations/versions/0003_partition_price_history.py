@@ -0,0 +1,138 @@
+"""partition price_history by month (PostgreSQL only)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:00:00.000000
+
+Rebuilds price_history as a table partitioned by RANGE ("timestamp") with one
+partition per month plus a DEFAULT partition, so retention can drop whole
+months instead of deleting rows. Existing rows are copied, which rewrites the
+table once; plan a maintenance window on large databases. Other backends keep
+the plain table; everywhere the timestamp column becomes NOT NULL since it is
+the partition key.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index("ix_price_history_id", "price_history", ["id"])
+    op.create_index("ix_price_history_timestamp", "price_history", ["timestamp"])
+    op.create_index(
+        "ix_price_history_product_id_timestamp",
+        "price_history",
+        ["product_id", "timestamp"],
+    )
+
+
+def _drop_indexes(table: str) -> None:
+    op.drop_index("ix_price_history_product_id_timestamp", table_name=table)
+    op.drop_index("ix_price_history_timestamp", table_name=table)
+    op.drop_index("ix_price_history_id", table_name=table)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        # No partitioning elsewhere, but the timestamp becomes mandatory everywhere
+        op.execute(
+            'UPDATE price_history SET "timestamp" = CURRENT_TIMESTAMP WHERE "timestamp" IS NULL'
+        )
+        with op.batch_alter_table("price_history") as batch_op:
+            batch_op.alter_column("timestamp", existing_type=sa.DateTime(), nullable=False)
+        return
+
+    op.rename_table("price_history", "price_history_unpartitioned")
+    _drop_indexes("price_history_unpartitioned")
+    op.execute(
+        "ALTER TABLE price_history_unpartitioned "
+        "RENAME CONSTRAINT price_history_pkey TO price_history_unpartitioned_pkey"
+    )
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY NONE")
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE price_history (
+            id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'),
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            price DOUBLE PRECISION NOT NULL,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT price_history_pkey PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id")
+    op.execute("CREATE TABLE price_history_default PARTITION OF price_history DEFAULT")
+
+    oldest = bind.execute(sa.text(
+        'SELECT min("timestamp") FROM price_history_unpartitioned'
+    )).scalar()
+    now = datetime.utcnow()
+    month = datetime((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f'CREATE TABLE price_history_p{month.year:04d}_{month.month:02d} '
+            f"PARTITION OF price_history "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        month = following
+
+    op.execute("""
+        INSERT INTO price_history (id, product_id, price, "timestamp")
+        SELECT id, product_id, price, COALESCE("timestamp", now() AT TIME ZONE 'utc')
+        FROM price_history_unpartitioned
+    """)
+    op.drop_table("price_history_unpartitioned")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table("price_history") as batch_op:
+            batch_op.alter_column("timestamp", existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.rename_table("price_history", "price_history_partitioned")
+    _drop_indexes("price_history_partitioned")
+    op.execute(
+        "ALTER TABLE price_history_partitioned "
+        "RENAME CONSTRAINT price_history_pkey TO price_history_partitioned_pkey"
+    )
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE price_history (
+            id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'),
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            price DOUBLE PRECISION NOT NULL,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT price_history_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id")
+    op.execute("""
+        INSERT INTO price_history (id, product_id, price, "timestamp")
+        SELECT id, product_id, price, "timestamp" FROM price_history_partitioned
+    """)
+    op.drop_table("price_history_partitioned")
+    _create_indexes()
@@ -0,0 +1,73 @@
+"""alert rule types and rolling price aggregates
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:00:00.000000
+
+Aggregates start empty; each product's row is built from its history the
+first time a new price is recorded for it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("price_alerts") as batch_op:
+        batch_op.add_column(
+            sa.Column("rule_type", sa.String(), nullable=False, server_default="below_price")
+        )
+        batch_op.add_column(sa.Column("threshold", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("window_days", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("group_id", sa.String(), nullable=True))
+        batch_op.alter_column("target_price", existing_type=sa.Float(), nullable=True)
+        batch_op.create_index("ix_price_alerts_group_id", ["group_id"])
+
+    op.create_table(
+        "product_price_aggregates",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("observations", sa.Integer(), nullable=False),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.Column("last_observed_at", sa.DateTime(), nullable=True),
+        sa.Column("all_time_low", sa.Float(), nullable=True),
+        sa.Column("all_time_high", sa.Float(), nullable=True),
+        sa.Column("window_day", sa.Date(), nullable=True),
+        sa.Column("sum_7d", sa.Float(), nullable=False),
+        sa.Column("count_7d", sa.Integer(), nullable=False),
+        sa.Column("sum_30d", sa.Float(), nullable=False),
+        sa.Column("count_30d", sa.Integer(), nullable=False),
+        sa.Column("sum_90d", sa.Float(), nullable=False),
+        sa.Column("count_90d", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    op.create_table(
+        "product_daily_prices",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id", "day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("product_daily_prices")
+    op.drop_table("product_price_aggregates")
+
+    with op.batch_alter_table("price_alerts") as batch_op:
+        batch_op.drop_index("ix_price_alerts_group_id")
+        batch_op.alter_column("target_price", existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column("group_id")
+        batch_op.drop_column("window_days")
+        batch_op.drop_column("threshold")
+        batch_op.drop_column("rule_type")
@@ -1,3 +1,4 @@
+import fakeredis
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -5,9 +6,12 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
+from app.core.cache import RedisClient, get_redis
 from app.core.database import get_db
+from app.core.metrics import instrument_engine
 from app.core.security import get_password_hash
 from app.domain.models import Base, User, Product
+from tests.query_counter import count_queries
 
 # Create test database (in-memory SQLite)
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -17,6 +21,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+instrument_engine(engine)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -33,8 +38,23 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def no_n_plus_one(request):
+    """Fail tests whose code lazily loads one relationship more than once"""
+    with count_queries() as queries:
+        yield queries
+    if not request.node.get_closest_marker("allow_lazy_loads"):
+        queries.assert_no_n_plus_one()
+
+
+@pytest.fixture
+def cache():
+    """Redis client backed by an in-process fake server"""
+    return RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+
+
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, cache):
     """Create a test client with database session"""
     def override_get_db():
         try:
@@ -43,6 +63,7 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_redis] = lambda: cache
     
     with TestClient(app) as test_client:
         yield test_client
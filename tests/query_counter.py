@@ -0,0 +1,71 @@
+"""
+SQL statement counting and N+1 detection for tests.
+
+    with count_queries() as queries:
+        client.get("/api/v1/dashboard/", headers=auth_headers)
+    queries.assert_at_most(4)
+
+count_queries() records every statement run on any engine, and every
+lazy relationship load made by any session: reading product.alerts or
+alert.product from an object loaded without it. assert_at_most() fails with
+the statements listed. assert_no_n_plus_one() fails when one relationship
+was lazily loaded more than once, which is what a loop over rows touching a
+relationship looks like; load it with selectinload()/joinedload() or query
+the related rows in one go instead.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+class QueryCounter:
+    """Statements and lazy loads seen while counting"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.lazy_loads: Counter = Counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements:"]
+        lines += [f"  {i}. {' '.join(statement.split())}" for i, statement in enumerate(self.statements, 1)]
+        if self.lazy_loads:
+            lines.append("Lazy relationship loads:")
+            lines += [f"  {relationship} x{count}" for relationship, count in self.lazy_loads.most_common()]
+        return "\n".join(lines)
+
+    def assert_at_most(self, budget: int):
+        assert self.count <= budget, f"Query budget of {budget} exceeded\n{self.report()}"
+
+    def assert_no_n_plus_one(self):
+        repeated = {relationship: count for relationship, count in self.lazy_loads.items() if count > 1}
+        assert not repeated, f"N+1 lazy loads: {repeated}\n{self.report()}"
+
+
+@contextmanager
+def count_queries(engine: Union[Engine, type] = Engine) -> Iterator[QueryCounter]:
+    """Count the statements run on engine (every engine by default) and the lazy loads of every session"""
+    counter = QueryCounter()
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    def on_orm_execute(orm_execute_state):
+        # Set for lazy loads only, not for selectinload and other eager loads
+        if orm_execute_state.is_select and orm_execute_state.lazy_loaded_from is not None:
+            counter.lazy_loads[str(orm_execute_state.loader_strategy_path[-1])] += 1
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(Session, "do_orm_execute", on_orm_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+        event.remove(Session, "do_orm_execute", on_orm_execute)
@@ -0,0 +1,262 @@
+import random
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.domain.models import NotificationOutbox, PriceAlert, PriceHistory, Product, ProductDailyPrice, ProductPriceAggregate
+from app.services.alert_rules import WINDOWS, AlertRuleEngine, PriceAggregateStore, rule_matches
+from app.services.monitor import PriceMonitorService
+from tests.conftest import engine
+
+
+def scraped(price: float) -> dict:
+    return {"price": price, "title": "Test", "timestamp": datetime.utcnow(), "source": "Generic"}
+
+
+async def record_price(db_session, cache, product_id: int, price: float):
+    with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped(price))):
+        await PriceMonitorService(db_session, cache).check_product_price(product_id)
+    cache.flush_all()
+
+
+def brute_force(observations, today, window):
+    """Count and sum of observations in the window ending on `today`"""
+    inside = [price for at, price in observations if at.date() > today - timedelta(days=window)]
+    return len(inside), sum(inside)
+
+
+@pytest.fixture
+def product_with_history(db_session, test_product):
+    """Test product observed at 100 every day for the last 40 days"""
+    now = datetime.utcnow()
+    db_session.add_all([
+        PriceHistory(product_id=test_product.id, price=100.0, timestamp=now - timedelta(days=day))
+        for day in range(1, 41)
+    ])
+    db_session.commit()
+    return test_product
+
+
+class TestRuleMatching:
+    """Tests for single rule evaluation against aggregates"""
+    
+    def aggregate(self, **values):
+        defaults = {f"{kind}_{days}d": 0 for days in WINDOWS for kind in ("sum", "count")}
+        return ProductPriceAggregate(**{**defaults, **values})
+    
+    def test_below_price(self):
+        """Test the classic target price rule"""
+        alert = PriceAlert(rule_type="below_price", target_price=50.0)
+        
+        assert rule_matches(alert, self.aggregate(), 50.0)
+        assert not rule_matches(alert, self.aggregate(), 50.01)
+    
+    def test_percent_drop(self):
+        """Test a drop measured against the window average"""
+        alert = PriceAlert(rule_type="percent_drop", threshold=15, window_days=30)
+        aggregate = self.aggregate(sum_30d=1000.0, count_30d=10)
+        
+        assert rule_matches(alert, aggregate, 85.0)
+        assert not rule_matches(alert, aggregate, 85.5)
+        assert not rule_matches(alert, self.aggregate(), 1.0)
+    
+    def test_all_time_low(self):
+        """Test only strictly lower prices are new lows"""
+        alert = PriceAlert(rule_type="all_time_low")
+        
+        assert rule_matches(alert, self.aggregate(all_time_low=10.0), 9.99)
+        assert not rule_matches(alert, self.aggregate(all_time_low=10.0), 10.0)
+        assert not rule_matches(alert, self.aggregate(), 5.0)
+
+
+class TestPriceAggregates:
+    """Tests for incrementally maintained rolling aggregates"""
+    
+    def test_rolling_windows_match_brute_force(self, db_session, test_product):
+        """Test window sums stay exact as days pass, with gaps"""
+        rng = random.Random(7)
+        store = PriceAggregateStore(db_session)
+        at = datetime(2026, 1, 1, 12)
+        observations = []
+        
+        for _ in range(150):
+            at += timedelta(days=rng.choice([0, 0, 1, 1, 2, 5, 40]), minutes=7)
+            price = round(rng.uniform(50, 150), 2)
+            aggregate = store.load(test_product.id, at)
+            store.observe(aggregate, price, at)
+            db_session.flush()
+            observations.append((at, price))
+            
+            for window in WINDOWS:
+                count, total = brute_force(observations, at.date(), window)
+                assert getattr(aggregate, f"count_{window}d") == count
+                assert getattr(aggregate, f"sum_{window}d") == pytest.approx(total)
+        
+        assert aggregate.all_time_low == min(price for _, price in observations)
+        assert aggregate.observations == len(observations)
+    
+    def test_same_day_batch(self, db_session, cache, test_product):
+        """Test one batch with two observations of a product on the same day shares its bucket"""
+        at = datetime(2026, 3, 1, 9)
+        observations = [
+            {**scraped(price), "product_id": test_product.id, "timestamp": at + timedelta(hours=hour)}
+            for hour, price in enumerate([100.0, 90.0])
+        ]
+        
+        assert PriceMonitorService(db_session, cache).record_prices(observations) == 2
+        
+        bucket = db_session.query(ProductDailyPrice).one()
+        assert (bucket.day, bucket.count, bucket.total) == (at.date(), 2, 190.0)
+        assert db_session.query(ProductPriceAggregate).one().count_7d == 2
+    
+    def test_bootstrap_from_history(self, db_session, product_with_history):
+        """Test the first observation builds aggregates from existing history"""
+        aggregate = PriceAggregateStore(db_session).load(product_with_history.id, datetime.utcnow())
+        
+        assert aggregate.observations == 40
+        assert aggregate.count_7d == 6
+        assert aggregate.count_30d == 29
+        assert aggregate.sum_30d == pytest.approx(2900.0)
+        assert aggregate.all_time_low == 100.0
+
+
+class TestAlertRuleEngine:
+    """Tests for rules fired by new observations"""
+    
+    async def test_percent_drop_fires(self, db_session, cache, test_user, product_with_history):
+        """Test a 15% drop from the 30-day average"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=product_with_history.id,
+                                  rule_type="percent_drop", threshold=15, window_days=30))
+        db_session.commit()
+        
+        await record_price(db_session, cache, product_with_history.id, 90.0)
+        assert db_session.query(PriceAlert).one().is_active
+        
+        await record_price(db_session, cache, product_with_history.id, 84.0)
+        assert not db_session.query(PriceAlert).one().is_active
+    
+    async def test_all_time_low_fires(self, db_session, cache, test_user, product_with_history):
+        """Test a new all-time low"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=product_with_history.id, rule_type="all_time_low"))
+        db_session.commit()
+        
+        await record_price(db_session, cache, product_with_history.id, 100.0)
+        assert db_session.query(PriceAlert).one().is_active
+        
+        await record_price(db_session, cache, product_with_history.id, 99.0)
+        assert db_session.query(PriceAlert).one().triggered_at is not None
+    
+    async def test_group_fires_once(self, db_session, cache, test_user, test_product):
+        """Test the first matching product closes an any-of rule"""
+        other = Product(user_id=test_user.id, name="Other", url="https://example.com/other")
+        db_session.add(other)
+        db_session.commit()
+        db_session.add_all([
+            PriceAlert(user_id=test_user.id, product_id=product_id, target_price=50.0, group_id="g1")
+            for product_id in (test_product.id, other.id)
+        ])
+        db_session.commit()
+        
+        await record_price(db_session, cache, other.id, 45.0)
+        
+        alerts = {alert.product_id: alert for alert in db_session.query(PriceAlert)}
+        assert alerts[other.id].triggered_at is not None
+        assert not alerts[test_product.id].is_active
+        assert alerts[test_product.id].triggered_at is None
+    
+    def test_fires_once_per_batch(self, db_session, cache, test_user, test_product):
+        """Test an alert matched by several observations in one batch fires once"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=test_product.id, target_price=50.0))
+        db_session.commit()
+        now = datetime.utcnow()
+        observations = [
+            {**scraped(price), "product_id": test_product.id, "timestamp": now + timedelta(minutes=minute)}
+            for minute, price in enumerate([45.0, 40.0])
+        ]
+        
+        with patch("app.services.monitor.publish_alert_triggered") as publish:
+            PriceMonitorService(db_session, cache).record_prices(observations)
+        
+        assert publish.call_count == 1
+        outbox = db_session.query(NotificationOutbox).all()
+        assert len(outbox) == len({row.channel for row in outbox}) > 0
+    
+    async def test_no_history_reads(self, db_session, cache, test_user, product_with_history):
+        """Test rules are evaluated without reading price history once aggregates exist"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=product_with_history.id,
+                                  rule_type="percent_drop", threshold=15, window_days=30))
+        db_session.commit()
+        await record_price(db_session, cache, product_with_history.id, 99.0)
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            AlertRuleEngine(db_session).process(product_with_history.id, 98.0, datetime.utcnow())
+            db_session.flush()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        db_session.rollback()
+        
+        assert not [sql for sql in statements if "FROM price_history" in sql]
+
+
+class TestAlertRuleEndpoints:
+    """Tests for creating rule alerts through the API"""
+    
+    def test_create_percent_drop(self, client, auth_headers, test_product):
+        """Test window defaults to 30 days"""
+        response = client.post(
+            "/api/v1/alerts/",
+            headers=auth_headers,
+            json={"product_id": test_product.id, "rule_type": "percent_drop", "threshold": 15}
+        )
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["rule_type"] == "percent_drop"
+        assert data["window_days"] == 30
+        assert data["target_price"] is None
+    
+    @pytest.mark.parametrize("body", [
+        {"rule_type": "below_price"},
+        {"rule_type": "percent_drop"},
+        {"rule_type": "percent_drop", "threshold": 15, "window_days": 12},
+    ])
+    def test_invalid_rules(self, client, auth_headers, test_product, body):
+        """Test rules missing their parameters are rejected"""
+        response = client.post("/api/v1/alerts/", headers=auth_headers, json={"product_id": test_product.id, **body})
+        
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_create_group(self, client, auth_headers, db_session, test_user, test_product):
+        """Test an any-of rule creates one alert per product with a shared group"""
+        other = Product(user_id=test_user.id, name="Other", url="https://example.com/other")
+        db_session.add(other)
+        db_session.commit()
+        
+        response = client.post(
+            "/api/v1/alerts/group",
+            headers=auth_headers,
+            json={"product_ids": [test_product.id, other.id], "target_price": 50.0}
+        )
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert [alert["product_id"] for alert in data] == [test_product.id, other.id]
+        assert data[0]["group_id"] and data[0]["group_id"] == data[1]["group_id"]
+    
+    def test_group_foreign_product(self, client, auth_headers, test_product):
+        """Test a group can only cover the user's own products"""
+        response = client.post(
+            "/api/v1/alerts/group",
+            headers=auth_headers,
+            json={"product_ids": [test_product.id, 999], "target_price": 50.0}
+        )
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -100,6 +100,34 @@ class TestAlerts:
         
         assert response.status_code == status.HTTP_204_NO_CONTENT
     
+    def test_delete_triggered_alert(self, client, auth_headers, db_session, test_product):
+        """Test deleting an alert that queued notifications keeps the notifications"""
+        from datetime import datetime
+        from unittest.mock import AsyncMock, patch
+        from app.domain.models import NotificationOutbox
+        
+        alert_id = client.post(
+            "/api/v1/alerts/",
+            headers=auth_headers,
+            json={"product_id": test_product.id, "target_price": 90.0}
+        ).json()["id"]
+        scraped = {"price": 80.0, "title": "Test", "timestamp": datetime.utcnow(), "source": "Generic"}
+        with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped)):
+            client.post(f"/api/v1/monitor/check/{test_product.id}", headers=auth_headers)
+        assert db_session.query(NotificationOutbox).filter(NotificationOutbox.alert_id == alert_id).count() > 0
+        
+        # Enforce foreign keys like PostgreSQL does
+        db_session.connection().exec_driver_sql("PRAGMA foreign_keys=ON")
+        try:
+            response = client.delete(f"/api/v1/alerts/{alert_id}", headers=auth_headers)
+        finally:
+            db_session.rollback()
+            db_session.connection().exec_driver_sql("PRAGMA foreign_keys=OFF")
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        rows = db_session.query(NotificationOutbox).all()
+        assert rows and all(row.alert_id is None for row in rows)
+    
     def test_delete_nonexistent_alert(self, client, auth_headers):
         """Test deleting non-existent alert"""
         response = client.delete("/api/v1/alerts/99999", headers=auth_headers)
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi import status
+
+from app.domain.models import Product, PriceHistory
+from app.services.analytics import PriceSeries, compute_metrics, load_series
+
+
+def _series(data: dict, start: datetime = datetime(2026, 1, 1)) -> PriceSeries:
+    """Daily observations per product from {product_id: [prices]}"""
+    rows = [
+        (product_id, start + timedelta(days=day), price)
+        for product_id, prices in data.items()
+        for day, price in enumerate(prices)
+    ]
+    ids, timestamps, prices = zip(*rows)
+    return PriceSeries(
+        np.array(ids, dtype=np.int64),
+        np.array(timestamps, dtype="datetime64[us]"),
+        np.array(prices, dtype=np.float64)
+    )
+
+
+class TestComputeMetrics:
+    """Tests for vectorized per-product metrics"""
+    
+    def test_matches_per_product_reference(self):
+        """Test batch results equal metrics computed product by product"""
+        rng = np.random.default_rng(42)
+        data = {pid: list(np.round(rng.uniform(50, 500, size=rng.integers(2, 60)), 2)) for pid in range(1, 40)}
+        
+        metrics = compute_metrics(_series(data))
+        
+        for product_id, prices in data.items():
+            prices = np.array(prices)
+            result = metrics[product_id]
+            peaks = np.maximum.accumulate(prices)
+            assert result["observations"] == len(prices)
+            assert result["min_price"] == prices.min()
+            assert result["avg_price"] == pytest.approx(prices.mean())
+            assert result["percentiles"]["p25"] == pytest.approx(np.percentile(prices, 25))
+            assert result["percentiles"]["p90"] == pytest.approx(np.percentile(prices, 90))
+            if len(prices) > 2:
+                assert result["volatility"] == pytest.approx(np.std(np.diff(np.log(prices)), ddof=1))
+            assert result["max_drawdown"] == pytest.approx((prices / peaks - 1).min())
+            assert result["drawdown_from_peak"] == pytest.approx(prices[-1] / prices.max() - 1)
+            assert result["moving_averages"]["7d"] == pytest.approx(prices[-8:].mean())
+    
+    def test_lowest_in_days(self):
+        """Test the latest price is compared against the trailing window only"""
+        # Product 1: 40 days at 10, then 35 days at 12, latest 11
+        # Product 2: steadily falling
+        metrics = compute_metrics(_series({
+            1: [10.0] * 40 + [12.0] * 35 + [11.0],
+            2: [float(p) for p in range(100, 0, -1)],
+        }))
+        
+        assert metrics[1]["lowest_in_days"] == {"30d": True, "90d": False}
+        assert metrics[2]["lowest_in_days"] == {"30d": True, "90d": True}
+    
+    def test_single_observation(self):
+        """Test a product with one observation has zero volatility"""
+        result = compute_metrics(_series({5: [19.9]}))[5]
+        
+        assert result["volatility"] == 0.0
+        assert result["max_drawdown"] == 0.0
+        assert result["percentiles"]["p50"] == 19.9
+    
+    def test_empty(self):
+        """Test no history yields no metrics"""
+        assert compute_metrics(_series({1: [1.0]})._replace(
+            product_ids=np.empty(0, np.int64),
+            timestamps=np.empty(0, "datetime64[us]"),
+            prices=np.empty(0)
+        )) == {}
+
+
+class TestStatsEndpoints:
+    """Tests for the statistics API"""
+    
+    @pytest.fixture
+    def products_with_history(self, db_session, test_user):
+        now = datetime.utcnow()
+        products = []
+        for n in range(3):
+            product = Product(user_id=test_user.id, name=f"P{n}", url=f"https://example.com/{n}", current_price=10.0 + n)
+            db_session.add(product)
+            db_session.flush()
+            db_session.add_all([
+                PriceHistory(product_id=product.id, price=10.0 + n + day, timestamp=now - timedelta(days=day))
+                for day in range(5)
+            ])
+            products.append(product)
+        db_session.commit()
+        return products
+    
+    def test_load_series_is_sorted(self, db_session, products_with_history):
+        """Test series come back grouped by product, oldest first"""
+        series = load_series(db_session, [p.id for p in products_with_history])
+        
+        assert len(series.prices) == 15
+        assert np.all(np.diff(series.product_ids) >= 0)
+        same = series.product_ids[1:] == series.product_ids[:-1]
+        assert np.all(np.diff(series.timestamps)[same] > np.timedelta64(0))
+    
+    def test_single_product_stats(self, client, auth_headers, products_with_history):
+        """Test /monitor/stats/{id} keeps its fields and adds new metrics"""
+        product = products_with_history[0]
+        
+        response = client.get(f"/api/v1/monitor/stats/{product.id}", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["min_price"] == 10.0
+        assert data["max_price"] == 14.0
+        assert data["avg_price"] == 12.0
+        assert data["price_changes"] == 5
+        assert data["current_price"] == 10.0
+        assert set(data["percentiles"]) == {"p10", "p25", "p50", "p75", "p90"}
+        assert data["lowest_in_days"]["30d"] is True
+    
+    def test_multi_product_stats(self, client, auth_headers, products_with_history):
+        """Test statistics for several products in one request"""
+        ids = [p.id for p in products_with_history[:2]]
+        
+        response = client.get(
+            "/api/v1/monitor/stats",
+            headers=auth_headers,
+            params={"product_ids": ids}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["count"] == 2
+        assert [s["product_id"] for s in data["stats"]] == ids
+    
+    def test_multi_product_stats_defaults_to_all(self, client, auth_headers, products_with_history):
+        """Test omitting product_ids returns every product of the user"""
+        response = client.get("/api/v1/monitor/stats", headers=auth_headers)
+        
+        assert response.json()["count"] == 3
@@ -0,0 +1,155 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+
+from main import app
+from app.domain.models import PriceHistory
+from app.services.archive import ColdArchive, ColdRow, get_cold_archive, move_to_cold, restore_to_hot
+from app.services.history import PriceHistoryReader
+from app.services.monitor import PriceMonitorService
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ColdArchive(str(tmp_path / "cold"))
+
+
+@pytest.fixture
+def tiered_history(db_session, test_product):
+    """100 hourly observations, the oldest 60 older than the returned cutoff"""
+    start = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    db_session.add_all([
+        PriceHistory(product_id=test_product.id, price=round(100 + i * 0.37, 2), timestamp=start + timedelta(hours=i))
+        for i in range(100)
+    ])
+    db_session.commit()
+    return start + timedelta(hours=60)
+
+
+class TestColdArchive:
+    """Tests for the columnar cold history archive"""
+    
+    def test_round_trip(self, archive):
+        """Test ids, timestamps and prices survive encoding exactly"""
+        start = datetime(2025, 5, 1, 8, 30, 15, 250000)
+        rows = [
+            ColdRow(1000 + i * 3, 7, round(1999.9 - i * 0.5, 2), start + timedelta(minutes=37 * i))
+            for i in range(500)
+        ]
+        
+        archive.append(7, rows)
+        
+        assert archive.read(7) == rows
+        # Delta-encoded, compressed columns: far less than 24 raw bytes per row
+        assert os.path.getsize(archive.path_for(7)) < len(rows) * 8
+    
+    def test_read_time_range_across_segments(self, archive):
+        """Test range reads span several appended segments"""
+        start = datetime(2025, 1, 1)
+        rows = [ColdRow(i, 3, 10.0 + i, start + timedelta(days=i)) for i in range(30)]
+        archive.append(3, rows[:10])
+        archive.append(3, rows[10:])
+        
+        result = archive.read(3, since=start + timedelta(days=5), until=start + timedelta(days=15))
+        
+        assert [row.id for row in result] == list(range(5, 15))
+    
+    def test_incomplete_trailing_segment_is_ignored(self, archive):
+        """Test a partially written segment does not break readers"""
+        rows = [ColdRow(i, 4, 1.0, datetime(2025, 1, 1) + timedelta(hours=i)) for i in range(5)]
+        archive.append(4, rows)
+        with open(archive.path_for(4), "ab") as f:
+            f.write(b"PHC1\x01\x00")
+        
+        assert archive.read(4) == rows
+
+
+class TestHistoryTiers:
+    """Tests for moving history between tiers and reading it transparently"""
+    
+    def test_move_to_cold(self, db_session, archive, test_product, tiered_history):
+        """Test old rows move to the archive and leave the database"""
+        result = move_to_cold(db_session, archive, tiered_history, batch_size=25)
+        
+        assert result == {"products": 1, "moved_count": 60}
+        assert db_session.query(PriceHistory).count() == 40
+        assert len(archive.read(test_product.id)) == 60
+    
+    def test_move_after_crash_is_not_duplicated(self, db_session, archive, test_product, tiered_history):
+        """Test rows archived by a run that died before deleting them are archived once"""
+        old = db_session.query(
+            PriceHistory.id, PriceHistory.product_id, PriceHistory.price, PriceHistory.timestamp
+        ).filter(PriceHistory.timestamp < tiered_history).all()
+        archive.append(test_product.id, [ColdRow(*row) for row in old[:25]])
+        
+        result = move_to_cold(db_session, archive, tiered_history, batch_size=25)
+        
+        assert result["moved_count"] == 60
+        assert db_session.query(PriceHistory).count() == 40
+        assert sorted(row.id for row in archive.read(test_product.id)) == sorted(row.id for row in old)
+    
+    def test_page_continues_into_cold_tier(self, db_session, archive, test_product, tiered_history):
+        """Test newest-first pages read across hot and cold rows"""
+        expected = [
+            (h.id, h.price, h.timestamp) for h in db_session.query(PriceHistory).order_by(
+                PriceHistory.timestamp.desc()
+            )
+        ]
+        move_to_cold(db_session, archive, tiered_history)
+        reader = PriceHistoryReader(db_session, archive)
+        
+        pages = [reader.page(test_product.id, skip=skip, limit=30) for skip in (0, 30, 60, 90)]
+        
+        combined = [(row.id, row.price, row.timestamp) for page in pages for row in page]
+        assert combined == expected
+    
+    def test_stats_include_cold_rows(self, db_session, cache, archive, test_product, tiered_history):
+        """Test price statistics cover archived history"""
+        before = PriceMonitorService(db_session, cache, archive).get_price_stats(test_product.id)
+        move_to_cold(db_session, archive, tiered_history)
+        
+        after = PriceMonitorService(db_session, cache, archive).get_price_stats(test_product.id)
+        
+        assert after["price_changes"] == before["price_changes"] == 100
+        assert after["min_price"] == before["min_price"]
+        assert after["avg_price"] == pytest.approx(before["avg_price"])
+    
+    def test_history_endpoint_reads_cold_tier(
+        self, client, auth_headers, db_session, archive, test_product, tiered_history
+    ):
+        """Test the history API returns archived rows"""
+        move_to_cold(db_session, archive, tiered_history)
+        app.dependency_overrides[get_cold_archive] = lambda: archive
+        
+        response = client.get(
+            f"/api/v1/products/{test_product.id}/history",
+            headers=auth_headers,
+            params={"skip": 30, "limit": 20}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 20
+    
+    def test_delete_product_removes_archive(
+        self, client, auth_headers, db_session, archive, test_product, tiered_history
+    ):
+        """Test a deleted product's archive goes with it"""
+        move_to_cold(db_session, archive, tiered_history)
+        app.dependency_overrides[get_cold_archive] = lambda: archive
+        
+        response = client.delete(f"/api/v1/products/{test_product.id}", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not archive.has(test_product.id)
+    
+    def test_restore_to_hot(self, db_session, archive, test_product, tiered_history):
+        """Test archived rows can be loaded back into the database"""
+        move_to_cold(db_session, archive, tiered_history)
+        
+        result = restore_to_hot(db_session, archive, test_product.id)
+        
+        assert result["restored_count"] == 60
+        assert db_session.query(PriceHistory).count() == 100
+        assert not archive.has(test_product.id)
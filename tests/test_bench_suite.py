@@ -0,0 +1,134 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import build_engine
+from app.domain.models import PriceAlert, PriceHistory, Product, User
+from app.services.sites import site_registry
+from benchmarks.load_test import run_load_test, saturation_point
+from benchmarks.retailer_stub import SITES, RetailerStub, product_path, product_url
+from benchmarks.seed import seed_database
+from benchmarks.suite import compare, latency_summary, run_suite
+
+
+@pytest.fixture
+def stub():
+    retailer_stub = RetailerStub(latency_ms=0, pad_kb=4).start()
+    yield retailer_stub
+    retailer_stub.close()
+
+
+class TestRetailerStub:
+    """Tests for the benchmark retailer stub"""
+    
+    @pytest.mark.parametrize("site", SITES)
+    def test_pages_parse_with_their_adapter(self, stub, site):
+        """Test each recorded page is read by the adapter its URL selects"""
+        url = product_url(site, 7, stub.port)
+        adapter = site_registry.for_url(url)
+        host = url.split("/")[2].split(":")[0]
+        
+        status, body = stub.respond(host, product_path(site, 7))
+        
+        assert status == 200
+        assert adapter.name == site
+        assert adapter.parse(body.decode())["price"] > 0
+    
+    def test_error_rate(self):
+        """Test the configured share of requests fail"""
+        failing = RetailerStub(latency_ms=0, error_rate=1.0, pad_kb=1)
+        try:
+            status, _ = failing.respond("www.amazon.com.br", "/dp/B000000001")
+        finally:
+            failing.server.server_close()
+        
+        assert status == 503
+        assert failing.stats() == {"requests": 1, "errors": 1}
+
+
+class TestSeed:
+    """Tests for the benchmark data generator"""
+    
+    def test_counts_and_history(self, tmp_path):
+        """Test users, products, alerts and daily history are created as asked"""
+        engine = build_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+        try:
+            counts = seed_database(engine, users=2, products_per_user=3, alerts_per_product=2, history_years=0.1)
+            with Session(engine) as db:
+                assert db.query(User).count() == 2
+                assert db.query(Product).count() == counts["products"] == 6
+                assert db.query(PriceAlert).count() == counts["alerts"] == 12
+                assert db.query(PriceHistory).count() == counts["history_rows"] == 6 * 36
+                
+                product = db.query(Product).first()
+                last = db.query(PriceHistory.price).filter(
+                    PriceHistory.product_id == product.id
+                ).order_by(PriceHistory.timestamp.desc()).first()
+                assert last.price == product.current_price
+                assert db.query(func.count(func.distinct(Product.url))).scalar() == 6
+        finally:
+            engine.dispose()
+
+
+class TestSuite:
+    """Tests for the end-to-end benchmark runner"""
+    
+    def test_small_run(self):
+        """Test a tiny run sweeps every product and times every route"""
+        results = run_suite(users=1, products=3, years=0.05, requests=2, latency_ms=0)
+        
+        assert results["sweep"]["checked"] == results["sweep"]["products"] == 3
+        assert results["sweep"]["history_rows_written"] == 3
+        assert all(summary["requests"] >= 2 for summary in results["api"].values())
+        assert set(results["memory"]) == {"seed", "sweep", "api"}
+    
+    def test_latency_summary(self):
+        """Test percentiles are taken from the sorted durations"""
+        summary = latency_summary([i / 1000 for i in range(1, 101)])
+        
+        assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (51.0, 96.0, 100.0)
+    
+    def test_compare(self):
+        """Test measurements present in both runs are compared"""
+        before = {"sweep": {"seconds": 2.0}, "api": {"GET /": {"p50_ms": 10}}}
+        after = {"sweep": {"seconds": 1.0}, "api": {"GET /": {"p50_ms": 10}, "GET /new": {"p50_ms": 5}}}
+        
+        assert compare(before, after) == [
+            {"metric": "api.GET /.p50_ms", "before": 10, "after": 10, "change_pct": 0.0},
+            {"metric": "sweep.seconds", "before": 2.0, "after": 1.0, "change_pct": -50.0}
+        ]
+
+
+def stage(users: int, throughput: float, p99: float = 50.0, error_rate: float = 0.0) -> dict:
+    return {"users": users, "throughput_rps": throughput, "error_rate": error_rate, "latency": {"p99_ms": p99}}
+
+
+class TestLoadTest:
+    """Tests for the API load test"""
+    
+    def test_saturation_when_throughput_stops_growing(self):
+        """Test the last stage that still added throughput is the saturation point"""
+        point = saturation_point([stage(1, 50), stage(2, 95), stage(4, 170), stage(8, 180), stage(16, 175)])
+        
+        assert (point["reached"], point["users"], point["throughput_rps"]) == (True, 4, 170)
+    
+    def test_saturation_on_errors_or_slo(self):
+        """Test failing requests or a p99 above the SLO end the scaling"""
+        assert saturation_point([stage(1, 50), stage(2, 95, error_rate=0.2)])["users"] == 1
+        assert saturation_point([stage(1, 50), stage(2, 95, p99=900)], p99_slo_ms=500)["users"] == 1
+    
+    def test_not_reached(self):
+        """Test a load that scaled all the way is reported as such"""
+        point = saturation_point([stage(1, 50), stage(2, 100)])
+        
+        assert point == {"reached": False, "users": 2, "throughput_rps": 100}
+    
+    def test_small_run(self):
+        """Test a short run against a real uvicorn reports every stage"""
+        results = run_load_test(
+            users=[1, 2], stage_seconds=1, warmup_seconds=0.2, seeded_users=2, products=3, years=0.05, latency_ms=0
+        )
+        
+        assert [s["users"] for s in results["stages"]] == [1, 2]
+        assert all(s["requests"] > 0 and s["errors"] == 0 for s in results["stages"])
+        assert "GET /api/v1/dashboard/" in results["stages"][1]["endpoints"]
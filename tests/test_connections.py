@@ -0,0 +1,297 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpcore
+import httpx
+import pytest
+
+from app.services.connections import (
+    CachingTransport, DNSCache, DNSLookupError, SharedClient, httpx_errors, warm_up
+)
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.services.sites import SiteRegistry
+
+PRODUCT = b'<html><body><h1 class="title">Cafeteira</h1><span class="price">R$ 349,90</span></body></html>'
+
+SHOP = {
+    "name": "shop",
+    "domains": ["shop.test"],
+    "price": [{"css": "span.price"}],
+    "title": [{"css": "h1.title"}]
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class FakeResolver:
+    """Answers from a table of addresses and TTLs, counting lookups per host"""
+    
+    def __init__(self, records):
+        self.records = records
+        self.lookups = []
+        self.delay = 0
+    
+    async def __call__(self, host):
+        self.lookups.append(host)
+        await asyncio.sleep(self.delay)
+        if host not in self.records:
+            raise DNSLookupError(f"Cannot resolve {host}")
+        return self.records[host]
+
+
+class KeepAliveServer:
+    """Local HTTP/1.1 server counting the connections it accepted"""
+    
+    def __init__(self):
+        self.connections = 0
+        self.requests = []
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def setup(self):
+                server.connections += 1
+                super().setup()
+            
+            def do_HEAD(self):
+                server.requests.append(("HEAD", self.path))
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            def do_GET(self):
+                server.requests.append(("GET", self.path))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(PRODUCT)))
+                self.end_headers()
+                self.wfile.write(PRODUCT)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    keep_alive_server = KeepAliveServer()
+    yield keep_alive_server
+    keep_alive_server.close()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class TestDNSCache:
+    """Tests for the in-process DNS cache"""
+    
+    async def test_answers_are_kept_for_their_ttl(self, clock):
+        """Test a host is looked up once while its TTL lasts and again after"""
+        resolver = FakeResolver({"shop.test": (["10.0.0.1"], 60)})
+        cache = DNSCache(resolver, clock=clock)
+        
+        assert await cache.resolve("shop.test") == ["10.0.0.1"]
+        clock.now += 59
+        assert await cache.resolve("shop.test") == ["10.0.0.1"]
+        assert resolver.lookups == ["shop.test"]
+        
+        resolver.records["shop.test"] = (["10.0.0.2"], 60)
+        clock.now += 2
+        assert await cache.resolve("shop.test") == ["10.0.0.2"]
+        assert resolver.lookups == ["shop.test", "shop.test"]
+        assert cache.stats() == {"hosts": 1, "hits": 1, "misses": 2}
+    
+    async def test_ttl_bounds_and_default(self, clock):
+        """Test very short and very long TTLs are clamped and unknown ones get the default"""
+        resolver = FakeResolver({
+            "short.test": (["10.0.0.1"], 1),
+            "long.test": (["10.0.0.2"], 86400),
+            "hosts-file": (["10.0.0.3"], None)
+        })
+        cache = DNSCache(resolver, min_ttl=5, max_ttl=3600, default_ttl=300, clock=clock)
+        
+        for host in resolver.records:
+            await cache.resolve(host)
+        
+        clock.now += 4
+        assert cache.stats()["hosts"] == 3
+        clock.now += 2
+        assert cache.stats()["hosts"] == 2
+        clock.now += 300
+        assert cache.stats()["hosts"] == 1
+        clock.now += 3600
+        assert cache.stats()["hosts"] == 0
+    
+    async def test_concurrent_lookups_share_one_query(self, clock):
+        """Test a burst of requests to a cold host sends a single query"""
+        resolver = FakeResolver({"shop.test": (["10.0.0.1"], 60)})
+        resolver.delay = 0.01
+        cache = DNSCache(resolver, clock=clock)
+        
+        answers = await asyncio.gather(*(cache.resolve("shop.test") for _ in range(20)))
+        
+        assert answers == [["10.0.0.1"]] * 20
+        assert resolver.lookups == ["shop.test"]
+    
+    async def test_failures_are_not_cached(self, clock):
+        """Test a failed lookup is retried on the next request"""
+        resolver = FakeResolver({})
+        cache = DNSCache(resolver, clock=clock)
+        
+        with pytest.raises(DNSLookupError):
+            await cache.resolve("shop.test")
+        resolver.records["shop.test"] = (["10.0.0.1"], 60)
+        
+        assert await cache.resolve("shop.test") == ["10.0.0.1"]
+    
+    async def test_ip_addresses_skip_the_cache(self, clock):
+        """Test literal addresses are used as they are"""
+        resolver = FakeResolver({})
+        cache = DNSCache(resolver, clock=clock)
+        
+        assert await cache.resolve("127.0.0.1") == ["127.0.0.1"]
+        assert await cache.resolve("::1") == ["::1"]
+        assert resolver.lookups == []
+    
+    async def test_warm(self, clock):
+        """Test warming resolves every host and reports the ones that failed"""
+        resolver = FakeResolver({"a.test": (["10.0.0.1"], 60), "b.test": (["10.0.0.2"], 60)})
+        cache = DNSCache(resolver, clock=clock)
+        
+        assert await cache.warm(["a.test", "b.test", "c.test", "a.test"]) == {
+            "a.test": True, "b.test": True, "c.test": False
+        }
+        assert cache.stats()["hosts"] == 2
+
+
+class TestCachingTransport:
+    """Tests for connecting through the DNS cache"""
+    
+    async def test_connects_to_cached_address(self, server, clock):
+        """Test a made-up host name reaches the address the cache holds for it"""
+        resolver = FakeResolver({"shop.test": (["127.0.0.1"], 60)})
+        cache = DNSCache(resolver, clock=clock)
+        
+        async with httpx.AsyncClient(transport=CachingTransport(cache)) as client:
+            for _ in range(3):
+                response = await client.get(f"http://shop.test:{server.port}/p/1")
+                assert response.status_code == 200
+        
+        assert resolver.lookups == ["shop.test"]
+        assert server.connections == 1
+    
+    async def test_falls_through_dead_addresses(self, server, clock):
+        """Test the next address is tried when one refuses the connection"""
+        resolver = FakeResolver({"shop.test": (["127.0.0.2", "127.0.0.1"], 60)})
+        
+        async with httpx.AsyncClient(transport=CachingTransport(DNSCache(resolver, clock=clock))) as client:
+            response = await client.get(f"http://shop.test:{server.port}/p/1")
+        
+        assert response.status_code == 200
+    
+    async def test_unreachable_host_is_resolved_again(self, server, clock):
+        """Test an entry whose addresses all fail is dropped"""
+        resolver = FakeResolver({"shop.test": (["127.0.0.2"], 60)})
+        cache = DNSCache(resolver, clock=clock)
+        
+        async with httpx.AsyncClient(transport=CachingTransport(cache)) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.get(f"http://shop.test:{server.port}/p/1")
+            resolver.records["shop.test"] = (["127.0.0.1"], 60)
+            response = await client.get(f"http://shop.test:{server.port}/p/1")
+        
+        assert response.status_code == 200
+        assert resolver.lookups == ["shop.test", "shop.test"]
+    
+    async def test_lookup_failure_is_a_connect_error(self, clock):
+        """Test unknown hosts fail like any other connection so retries treat them alike"""
+        cache = DNSCache(FakeResolver({}), clock=clock)
+        
+        async with httpx.AsyncClient(transport=CachingTransport(cache)) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.get("http://nowhere.test/")
+    
+    @pytest.mark.parametrize("error, expected", [
+        (httpcore.ReadTimeout("slow"), httpx.ReadTimeout),
+        (httpcore.RemoteProtocolError("bad"), httpx.RemoteProtocolError),
+        (httpcore.PoolTimeout("busy"), httpx.PoolTimeout),
+    ])
+    def test_pool_errors_are_httpx_errors(self, error, expected):
+        """Test httpcore errors reach callers as the httpx errors retries look for"""
+        with pytest.raises(expected):
+            with httpx_errors():
+                raise error
+
+
+class TestWarmUp:
+    """Tests for pre-connecting to the busiest hosts"""
+    
+    async def test_warm_connection_is_reused_by_the_sweep(self, server, clock, cache):
+        """Test the first scrape after a warm-up needs no lookup and no new connection"""
+        resolver = FakeResolver({"shop.test": (["127.0.0.1"], 60)})
+        http = SharedClient(cache=DNSCache(resolver, clock=clock))
+        scraper = ScraperService(
+            snapshots=None,
+            breakers=CircuitBreakers(),
+            registry=SiteRegistry([SHOP]),
+            http=http
+        )
+        origin = f"http://shop.test:{server.port}"
+        try:
+            assert await http.warm_up([origin]) == {origin: True}
+            assert (server.connections, resolver.lookups) == (1, ["shop.test"])
+            
+            for i in range(3):
+                result = await scraper.scrape_price(f"{origin}/p/{i}")
+                assert result["price"] == 349.90
+        finally:
+            await http.close()
+        
+        assert server.requests == [("HEAD", "/"), ("GET", "/p/0"), ("GET", "/p/1"), ("GET", "/p/2")]
+        assert server.connections == 1
+        assert resolver.lookups == ["shop.test"]
+    
+    async def test_unreachable_domain_does_not_stop_the_others(self, server, clock):
+        """Test warm-up reports failed domains and still connects to the rest"""
+        resolver = FakeResolver({"shop.test": (["127.0.0.1"], 60)})
+        origin = f"http://shop.test:{server.port}"
+        
+        async with httpx.AsyncClient(transport=CachingTransport(DNSCache(resolver, clock=clock))) as client:
+            assert await warm_up(client, [origin, "http://gone.test"]) == {origin: True, "http://gone.test": False}
+        
+        assert server.connections == 1
+    
+    def test_one_client_per_loop(self):
+        """Test scrapes in a loop share a client and a new loop gets its own"""
+        http = SharedClient()
+        
+        async def clients():
+            try:
+                return http.get(), http.get()
+            finally:
+                await http.close()
+        
+        first = asyncio.run(clients())
+        second = asyncio.run(clients())
+        
+        assert first[0] is first[1]
+        assert second[0] is not first[0]
+        assert http.clients_created == 2
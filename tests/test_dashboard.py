@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.domain.models import Product, PriceHistory
+from app.services.dashboard import dashboard_cache_key
+from app.services.monitor import PriceMonitorService
+from tests.conftest import engine
+
+
+@pytest.fixture
+def dashboard_products(db_session, test_user):
+    """Four products with 200 observations each, one without history"""
+    now = datetime.utcnow()
+    products = []
+    for n in range(4):
+        product = Product(user_id=test_user.id, name=f"P{n}", url=f"https://example.com/{n}", current_price=100.0 + n)
+        db_session.add(product)
+        db_session.flush()
+        db_session.add_all([
+            PriceHistory(product_id=product.id, price=100.0 + n + (i % 7), timestamp=now - timedelta(hours=6 * i))
+            for i in range(200)
+        ])
+        products.append(product)
+    empty = Product(user_id=test_user.id, name="New", url="https://example.com/new")
+    db_session.add(empty)
+    db_session.commit()
+    return products + [empty]
+
+
+class TestDashboard:
+    """Tests for the single round-trip dashboard endpoint"""
+    
+    def test_dashboard_contents(self, client, auth_headers, dashboard_products):
+        """Test every product has price, change, stats and a sparkline"""
+        response = client.get("/api/v1/dashboard/", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["product_count"] == 5
+        first = data["products"][0]
+        assert first["current_price"] == 100.0
+        assert first["latest_change"]["price"] == 100.0
+        assert first["latest_change"]["previous_price"] == 101.0
+        assert first["stats"]["observations"] == 200
+        assert 0 < len(first["sparkline"]["prices"]) <= 30
+        assert len(first["sparkline"]["timestamps"]) == len(first["sparkline"]["prices"])
+        empty = data["products"][-1]
+        assert empty["stats"] is None
+        assert empty["latest_change"] is None
+        assert empty["sparkline"]["prices"] == []
+    
+    def test_change_skips_repeated_prices(self, client, auth_headers, db_session, test_user):
+        """Test the change is against the last different price, and products that never moved have none"""
+        now = datetime.utcnow()
+        moved = Product(user_id=test_user.id, name="Moved", url="https://example.com/moved")
+        flat = Product(user_id=test_user.id, name="Flat", url="https://example.com/flat")
+        db_session.add_all([moved, flat])
+        db_session.flush()
+        db_session.add_all(
+            [PriceHistory(product_id=moved.id, price=price, timestamp=now - timedelta(hours=hours))
+             for price, hours in ((120.0, 4), (110.0, 3), (110.0, 2), (110.0, 1))]
+            + [PriceHistory(product_id=flat.id, price=50.0, timestamp=now - timedelta(hours=hours)) for hours in (2, 1)]
+        )
+        db_session.commit()
+        
+        products = {p["name"]: p for p in client.get("/api/v1/dashboard/", headers=auth_headers).json()["products"]}
+        
+        change = products["Moved"]["latest_change"]
+        assert (change["price"], change["previous_price"], change["change"]) == (110.0, 120.0, -10.0)
+        assert change["timestamp"].startswith((now - timedelta(hours=3)).isoformat()[:16])
+        assert products["Flat"]["latest_change"] is None
+    
+    def test_fixed_query_count(self, client, auth_headers, dashboard_products, cache):
+        """Test the dashboard needs the same number of queries for any product count"""
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            client.get("/api/v1/dashboard/", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        
+        # user lookup + products + history
+        assert len(statements) == 3
+    
+    def test_cached_per_user(self, client, auth_headers, dashboard_products, cache, test_user):
+        """Test the dashboard is served from cache until invalidated"""
+        client.get("/api/v1/dashboard/", headers=auth_headers)
+        
+        assert cache.exists(dashboard_cache_key(test_user.id))
+    
+    @pytest.mark.asyncio
+    async def test_new_observation_invalidates(self, db_session, cache, dashboard_products, test_user):
+        """Test recording a price drops the owner's cached dashboard"""
+        cache.set(dashboard_cache_key(test_user.id), {"stale": True})
+        scraped = {"price": 90.0, "title": "P0", "timestamp": datetime.utcnow(), "source": "Generic"}
+        
+        with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped)):
+            await PriceMonitorService(db_session, cache).check_product_price(dashboard_products[0].id)
+        
+        assert not cache.exists(dashboard_cache_key(test_user.id))
+    
+    def test_product_update_invalidates(self, client, auth_headers, dashboard_products, cache, test_user):
+        """Test editing a product drops the cached dashboard"""
+        client.get("/api/v1/dashboard/", headers=auth_headers)
+        
+        client.patch(
+            f"/api/v1/products/{dashboard_products[0].id}",
+            headers=auth_headers,
+            json={"name": "Renamed"}
+        )
+        
+        assert not cache.exists(dashboard_cache_key(test_user.id))
+        assert client.get("/api/v1/dashboard/", headers=auth_headers).json()["products"][0]["name"] == "Renamed"
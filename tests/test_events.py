@@ -0,0 +1,196 @@
+import asyncio
+import json
+import tracemalloc
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+from fastapi import status
+
+from app.core.cache import RedisClient
+from app.domain.models import PriceAlert
+from app.services.events import (
+    HEARTBEAT, EventBroker, Subscriber, SubscriberLimitReached, publish_alert_triggered, publish_event,
+    user_channel
+)
+from app.services.monitor import PriceMonitorService
+
+
+@pytest.fixture
+def redis_server():
+    """Fake Redis server shared by sync publishers and the async broker"""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def publisher(redis_server):
+    """Sync Redis client writers use to publish"""
+    return RedisClient(client=fakeredis.FakeRedis(server=redis_server, decode_responses=True))
+
+
+@pytest.fixture
+async def broker(redis_server):
+    event_broker = EventBroker(client=fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True))
+    yield event_broker
+    await event_broker.close()
+
+
+async def next_frame(subscriber: Subscriber, heartbeat: float = 5.0, timeout: float = 5.0) -> bytes:
+    frames = subscriber.frames_until_closed(heartbeat_seconds=heartbeat)
+    try:
+        return await asyncio.wait_for(frames.__anext__(), timeout)
+    finally:
+        await frames.aclose()
+
+
+def parse_frame(frame: bytes) -> tuple:
+    event_line, data_line = frame.decode().strip().split("\n")
+    return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+
+class TestSubscriber:
+    """Tests for a single connection's buffer"""
+    
+    async def test_heartbeat_when_idle(self):
+        """Test an idle stream emits keepalive comments"""
+        assert await next_frame(Subscriber(1), heartbeat=0.05) == HEARTBEAT
+    
+    async def test_slow_client_drops_oldest(self):
+        """Test the buffer is bounded and keeps the newest events"""
+        subscriber = Subscriber(1, queue_size=2)
+        for n in range(3):
+            subscriber.push(f"{n}".encode())
+        
+        frames = subscriber.frames_until_closed(heartbeat_seconds=1)
+        assert [await frames.__anext__(), await frames.__anext__()] == [b"1", b"2"]
+        await frames.aclose()
+    
+    async def test_idle_subscriber_is_small(self, broker):
+        """Test thousands of idle subscribers fit in little memory"""
+        await broker.subscribe(0)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            subscribers = [await broker.subscribe(n % 100) for n in range(5000)]
+            per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / len(subscribers)
+        finally:
+            tracemalloc.stop()
+        
+        assert per_subscriber < 512
+
+
+class TestEventBroker:
+    """Tests for Redis pub/sub fan-out"""
+    
+    async def test_fan_out_per_user(self, broker, publisher):
+        """Test events reach the user's subscribers only"""
+        mine = await broker.subscribe(1)
+        also_mine = await broker.subscribe(1)
+        other = await broker.subscribe(2)
+        
+        publish_event(publisher, 1, "price_update", 7, {"price": 9.5})
+        
+        for subscriber in (mine, also_mine):
+            assert parse_frame(await next_frame(subscriber)) == ("price_update", {"price": 9.5})
+        assert not other.frames
+    
+    async def test_product_filter(self, broker, publisher):
+        """Test a subscriber can listen to some products only"""
+        subscriber = await broker.subscribe(1, product_ids=[8])
+        
+        publish_event(publisher, 1, "price_update", 7, {"product_id": 7})
+        publish_event(publisher, 1, "price_update", 8, {"product_id": 8})
+        
+        assert parse_frame(await next_frame(subscriber))[1] == {"product_id": 8}
+    
+    async def test_unsubscribe_releases_channel(self, broker, publisher):
+        """Test the channel is dropped with the user's last subscriber"""
+        first = await broker.subscribe(1)
+        second = await broker.subscribe(1)
+        
+        await broker.unsubscribe(first)
+        assert broker.subscriber_count == 1
+        await broker.unsubscribe(second)
+        
+        assert broker.subscriber_count == 0
+        assert publisher.redis.pubsub_numsub(user_channel(1)) == [(user_channel(1), 0)]
+    
+    async def test_subscriber_limit(self, redis_server):
+        """Test a process refuses subscribers beyond its limit"""
+        limited = EventBroker(
+            client=fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True),
+            max_subscribers=1
+        )
+        await limited.subscribe(1)
+        
+        with pytest.raises(SubscriberLimitReached):
+            await limited.subscribe(1)
+        await limited.close()
+    
+    async def test_limit_holds_for_concurrent_subscribers(self, redis_server):
+        """Test clients subscribing at the same time can't exceed the limit"""
+        limited = EventBroker(
+            client=fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True),
+            max_subscribers=2
+        )
+        
+        results = await asyncio.gather(*(limited.subscribe(user_id) for user_id in range(5)), return_exceptions=True)
+        
+        assert sum(isinstance(result, SubscriberLimitReached) for result in results) == 3
+        assert limited.subscriber_count == 2
+        await limited.close()
+
+
+class TestPublishing:
+    """Tests for events published by the monitor"""
+    
+    async def test_price_check_publishes(self, db_session, publisher, test_user, test_product):
+        """Test a recorded price and a triggered alert are both published"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=test_product.id, target_price=90.0))
+        db_session.commit()
+        pubsub = publisher.redis.pubsub()
+        pubsub.subscribe(user_channel(test_user.id))
+        pubsub.get_message(timeout=1)  # subscribe confirmation
+        scraped = {"price": 80.0, "title": "Test", "timestamp": datetime.utcnow(), "source": "Generic"}
+        
+        with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped)):
+            await PriceMonitorService(db_session, publisher).check_product_price(test_product.id)
+        
+        messages = [json.loads(pubsub.get_message(timeout=1)["data"]) for _ in range(2)]
+        assert messages[0]["type"] == "price_update"
+        assert messages[0]["data"]["price"] == 80.0
+        assert messages[0]["data"]["previous_price"] == 99.99
+        assert messages[1]["type"] == "alert_triggered"
+        assert messages[1]["data"]["rule_type"] == "below_price"
+        assert messages[1]["data"]["target_price"] == 90.0
+    
+    def test_alert_event_describes_the_rule(self, publisher, test_user, test_product):
+        """Test rules without a target price say which rule fired"""
+        alert = PriceAlert(id=7, user_id=test_user.id, product_id=test_product.id, rule_type="percent_drop",
+                           threshold=15.0, window_days=30, triggered_at=datetime.utcnow())
+        pubsub = publisher.redis.pubsub()
+        pubsub.subscribe(user_channel(test_user.id))
+        pubsub.get_message(timeout=1)  # subscribe confirmation
+        
+        publish_alert_triggered(publisher, alert, 80.0)
+        
+        data = json.loads(pubsub.get_message(timeout=1)["data"])["data"]
+        assert data["rule_type"] == "percent_drop"
+        assert (data["threshold"], data["window_days"], data["target_price"]) == (15.0, 30, None)
+
+
+class TestStreamEndpoint:
+    """Tests for GET /events/stream"""
+    
+    def test_requires_auth(self, client):
+        """Test the stream needs a token"""
+        response = client.get("/api/v1/events/stream")
+        
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_foreign_product(self, client, auth_headers):
+        """Test subscribing to someone else's product is refused"""
+        response = client.get("/api/v1/events/stream", params={"product_ids": [999]}, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
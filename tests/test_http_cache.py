@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import status
+
+from app.core.http_cache import etag_matches, response_cache_key
+from app.domain.models import Product, PriceHistory
+from app.services.monitor import PriceMonitorService
+from app.services.retention import purge_history_before
+
+
+@pytest.fixture
+def product_with_history(db_session, test_product):
+    """Test product with a few observations"""
+    now = datetime.utcnow()
+    db_session.add_all([
+        PriceHistory(product_id=test_product.id, price=100.0 - i, timestamp=now - timedelta(days=i))
+        for i in range(5)
+    ])
+    db_session.commit()
+    return test_product
+
+
+class TestEtagMatching:
+    """Tests for If-None-Match parsing"""
+    
+    def test_matches(self):
+        """Test exact, listed, weak and wildcard validators"""
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+    
+    def test_no_match(self):
+        """Test missing or different validators"""
+        assert not etag_matches(None, '"abc"')
+        assert not etag_matches('"abd"', '"abc"')
+
+
+class TestConditionalGets:
+    """Tests for ETag/304 on product reads"""
+    
+    @pytest.mark.parametrize("path", [
+        "/api/v1/products/{id}",
+        "/api/v1/products/{id}/history",
+        "/api/v1/monitor/stats/{id}",
+    ])
+    def test_not_modified(self, client, auth_headers, product_with_history, path):
+        """Test a repeated request with the ETag gets an empty 304"""
+        url = path.format(id=product_with_history.id)
+        first = client.get(url, headers=auth_headers)
+        etag = first.headers["etag"]
+        
+        second = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["cache-control"] == "private, no-cache"
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert second.headers["etag"] == etag
+        assert second.content == b""
+    
+    def test_query_changes_etag(self, client, auth_headers, product_with_history):
+        """Test different history pages have different ETags"""
+        url = f"/api/v1/products/{product_with_history.id}/history"
+        
+        full = client.get(url, headers=auth_headers)
+        page = client.get(url, params={"limit": 2}, headers=auth_headers)
+        
+        assert full.headers["etag"] != page.headers["etag"]
+        assert len(page.json()) == 2
+    
+    def test_update_changes_etag(self, client, auth_headers, product_with_history):
+        """Test editing a product makes the old ETag stale"""
+        url = f"/api/v1/products/{product_with_history.id}"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        
+        client.patch(url, headers=auth_headers, json={"name": "Renamed"})
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["name"] == "Renamed"
+        assert response.headers["etag"] != etag
+    
+    @pytest.mark.asyncio
+    async def test_price_check_changes_version(self, db_session, cache, product_with_history):
+        """Test recording a price bumps the version and drops cached responses"""
+        cache.set_field(response_cache_key(product_with_history.id), '"old"', "[]")
+        scraped = {"price": 80.0, "title": "Test", "timestamp": datetime.utcnow(), "source": "Generic"}
+        
+        with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped)):
+            await PriceMonitorService(db_session, cache).check_product_price(product_with_history.id)
+        
+        db_session.refresh(product_with_history)
+        assert product_with_history.version == 2
+        assert not cache.exists(response_cache_key(product_with_history.id))
+    
+    def test_retention_changes_version(self, db_session, product_with_history):
+        """Test deleting old history bumps product versions"""
+        purge_history_before(db_session, datetime.utcnow() - timedelta(days=2), pause_seconds=0)
+        
+        db_session.refresh(product_with_history)
+        assert product_with_history.version == 2
+
+
+class TestResponseCache:
+    """Tests for the server-side response cache"""
+    
+    def test_served_from_cache(self, client, auth_headers, db_session, product_with_history):
+        """Test an unchanged version is answered from Redis without rebuilding"""
+        url = f"/api/v1/products/{product_with_history.id}"
+        first = client.get(url, headers=auth_headers)
+        
+        # Changed behind the API's back, without a version bump
+        db_session.query(Product).update({Product.name: "Sneaky"})
+        db_session.commit()
+        second = client.get(url, headers=auth_headers)
+        
+        assert second.content == first.content
+        assert second.json()["name"] == "Test Product"
+    
+    def test_delete_invalidates(self, client, auth_headers, cache, test_product):
+        """Test deleting a product drops its cached responses"""
+        url = f"/api/v1/products/{test_product.id}"
+        client.get(url, headers=auth_headers)
+        assert cache.exists(response_cache_key(test_product.id))
+        
+        client.delete(url, headers=auth_headers)
+        
+        assert not cache.exists(response_cache_key(test_product.id))
+        assert client.get(url, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
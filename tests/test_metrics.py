@@ -0,0 +1,185 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.cache import RedisClient
+from app.core.metrics import Metrics, metrics, statement_kind
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.workers.celery_worker import record_task_duration, start_task_timer
+
+PRODUCT_ROUTE = "/api/v1/products/{product_id}"
+
+ML_PAGE = """
+<html>
+    <h1 class="ui-pdp-title">Air Fryer</h1>
+    <span class="andes-money-amount__fraction">499</span>
+</html>
+"""
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def serve(html: str) -> AsyncMock:
+    """AsyncClient.send replacement streaming the page for every request"""
+    return AsyncMock(side_effect=lambda request, **kwargs: httpx.Response(
+        200, headers={"Content-Type": "text/html; charset=utf-8"}, stream=httpx.ByteStream(html.encode()), request=request
+    ))
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("Redis is down")
+
+
+@pytest.fixture
+def disabled():
+    metrics.enabled = False
+    yield
+    metrics.enabled = True
+
+
+class TestRequestMetrics:
+    """Tests for API request timings and the /metrics endpoint"""
+    
+    def test_requests_are_timed_by_route(self, client, auth_headers, test_product):
+        """Test requests are labelled with the route template, not the product id"""
+        labels = {"method": "GET", "route": PRODUCT_ROUTE, "status": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        
+        client.get(f"/api/v1/products/{test_product.id}", headers=auth_headers)
+        
+        assert sample("http_request_duration_seconds_count", **labels) == before + 1
+        body = client.get("/metrics").text
+        assert f'route="{PRODUCT_ROUTE}"' in body
+        assert "scrape_fetch_duration_seconds" in body
+    
+    def test_sql_statements_per_request(self, client, auth_headers, test_product):
+        """Test the statements a request runs are counted for its route"""
+        queries_before = sample("http_request_db_queries_sum", route=PRODUCT_ROUTE)
+        selects_before = sample("db_query_duration_seconds_count", statement="select")
+        
+        client.get(f"/api/v1/products/{test_product.id}", headers=auth_headers)
+        
+        queries = sample("http_request_db_queries_sum", route=PRODUCT_ROUTE) - queries_before
+        assert queries >= 2  # the user behind the token and the product
+        assert sample("db_query_duration_seconds_count", statement="select") - selects_before >= queries
+    
+    def test_unmatched_paths_share_a_label(self, client):
+        """Test unknown paths don't add a label each"""
+        labels = {"method": "GET", "route": "unmatched", "status": "404"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        
+        client.get("/no/such/page/123")
+        
+        assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    
+    def test_disabled(self, client, disabled):
+        """Test nothing is recorded with metrics disabled"""
+        labels = {"method": "GET", "route": "/health", "status": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        
+        assert client.get("/health").status_code == 200
+        
+        assert sample("http_request_duration_seconds_count", **labels) == before
+
+
+class TestCacheMetrics:
+    """Tests for cache hit ratio counters"""
+    
+    def test_hits_misses_and_errors(self, cache):
+        """Test each read is counted by its result"""
+        before = {result: sample("cache_requests_total", operation="get", result=result) for result in ("hit", "miss", "error")}
+        
+        cache.get("missing")
+        cache.set("present", {"price": 10})
+        cache.get("present")
+        cache.get("present")
+        RedisClient(client=BrokenRedis()).get("any")
+        
+        assert sample("cache_requests_total", operation="get", result="hit") - before["hit"] == 2
+        assert sample("cache_requests_total", operation="get", result="miss") - before["miss"] == 1
+        assert sample("cache_requests_total", operation="get", result="error") - before["error"] == 1
+
+
+class TestScrapeMetrics:
+    """Tests for fetch, parse and download metrics"""
+    
+    async def test_scrape_is_measured(self):
+        """Test a scrape records fetch latency for its domain, parse time, bytes and outcome"""
+        fetches = sample("scrape_fetch_duration_seconds_count", domain="mercadolivre.com.br")
+        parses = sample("scrape_parse_duration_seconds_count", site="mercadolivre")
+        downloaded = sample("scrape_downloaded_bytes_total", site="mercadolivre")
+        successes = sample("scrape_results_total", site="mercadolivre", outcome="success")
+        
+        with patch("httpx.AsyncClient.send", serve(ML_PAGE)):
+            result = await ScraperService(breakers=CircuitBreakers()).scrape_price("https://produto.mercadolivre.com.br/MLB-1")
+        
+        assert result["price"] == 499.0
+        assert sample("scrape_fetch_duration_seconds_count", domain="mercadolivre.com.br") == fetches + 1
+        assert sample("scrape_parse_duration_seconds_count", site="mercadolivre") == parses + 1
+        assert sample("scrape_downloaded_bytes_total", site="mercadolivre") - downloaded == len(ML_PAGE.encode())
+        assert sample("scrape_results_total", site="mercadolivre", outcome="success") == successes + 1
+    
+    async def test_sites_without_adapter_are_other(self):
+        """Test user-added domains are not used as labels"""
+        before = sample("scrape_fetch_duration_seconds_count", domain="other")
+        
+        with patch("httpx.AsyncClient.send", serve("<html><h1>X</h1><p>R$ 10,00</p></html>")):
+            await ScraperService(breakers=CircuitBreakers()).scrape_price("https://loja-qualquer.com.br/p/1")
+        
+        assert sample("scrape_fetch_duration_seconds_count", domain="other") == before + 1
+        assert REGISTRY.get_sample_value("scrape_fetch_duration_seconds_count", {"domain": "loja-qualquer.com.br"}) is None
+
+
+class TestTaskMetrics:
+    """Tests for Celery task durations"""
+    
+    def test_status_comes_from_the_result(self):
+        """Test tasks that caught their error are recorded as errors"""
+        task = SimpleNamespace(name="app.workers.celery_worker.check_product_task")
+        labels = {"task": task.name, "status": "error"}
+        before = sample("celery_task_duration_seconds_count", **labels)
+        
+        start_task_timer(task_id="t1", task=task)
+        record_task_duration(task_id="t1", task=task, retval={"status": "error"}, state="SUCCESS")
+        
+        assert sample("celery_task_duration_seconds_count", **labels) == before + 1
+    
+    def test_unknown_task_is_ignored(self):
+        """Test a postrun without a matching prerun records nothing"""
+        record_task_duration(task_id="never-started", task=SimpleNamespace(name="x"), retval=None, state="SUCCESS")
+        
+        assert REGISTRY.get_sample_value("celery_task_duration_seconds_count", {"task": "x", "status": "success"}) is None
+
+
+class TestInstruments:
+    """Tests for the Metrics recorder"""
+    
+    def test_statement_kind(self):
+        """Test statements are labelled by their verb"""
+        assert statement_kind("  SELECT products.id FROM products") == "select"
+        assert statement_kind("INSERT INTO price_history VALUES (?)") == "insert"
+        assert statement_kind("PRAGMA journal_mode=WAL") == "other"
+    
+    def test_disabled_recorder_records_nothing(self):
+        """Test a disabled recorder leaves the metrics untouched"""
+        before = sample("scrape_fetch_duration_seconds_count", domain="disabled.test")
+        
+        Metrics(enabled=False).fetch("disabled.test", 0.5)
+        
+        assert sample("scrape_fetch_duration_seconds_count", domain="disabled.test") == before
+    
+    def test_tracing_without_opentelemetry(self):
+        """Test spans are no-ops when tracing is off or OpenTelemetry is missing"""
+        with patch.dict("sys.modules", {"opentelemetry": None}):
+            recorder = Metrics(tracing=True)
+        
+        assert recorder.tracer is None
+        with recorder.span("scrape", site="x"):
+            pass
@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.domain.models import NotificationOutbox, PriceAlert
+from app.services.monitor import PriceMonitorService
+from app.services.notifications import (
+    FAILED, PENDING, SENDING, SENT, LogSender, NotificationDispatcher, WebhookSender, enqueue_alert_notifications
+)
+
+
+class StubWebhook:
+    """Local webhook receiver: answers with queued status codes (default 200)"""
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.statuses = []
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append((dict(self.headers), json.loads(body)))
+                    status_code = stub.statuses.pop(0) if stub.statuses else 200
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.in_flight -= 1
+                self.send_response(status_code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    """Stub webhook server answering 200 unless told otherwise"""
+    stub = StubWebhook()
+    yield stub
+    stub.close()
+
+
+def add_notifications(db_session, user, count: int, channel: str = "webhook"):
+    """Insert due outbox rows"""
+    rows = [
+        NotificationOutbox(
+            user_id=user.id,
+            channel=channel,
+            payload=json.dumps({"n": n}),
+            dedup_key=f"test:{n}:{channel}",
+            status=PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow() - timedelta(seconds=1)
+        )
+        for n in range(count)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def statuses(db_session):
+    db_session.expire_all()
+    return [row.status for row in db_session.query(NotificationOutbox).order_by(NotificationOutbox.id)]
+
+
+class TestOutbox:
+    """Tests for queueing notifications with the alert"""
+    
+    async def test_trigger_only_enqueues(self, db_session, cache, test_user, test_product):
+        """Test a triggered alert queues notifications without contacting providers"""
+        slow = StubWebhook(delay=2.0)
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=test_product.id, target_price=90.0))
+        db_session.commit()
+        scraped = {"price": 80.0, "title": "Test", "timestamp": datetime.utcnow(), "source": "Generic"}
+        
+        try:
+            with patch.object(settings, "NOTIFICATION_WEBHOOK_URL", slow.url), \
+                    patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped)):
+                started = time.monotonic()
+                await PriceMonitorService(db_session, cache).check_product_price(test_product.id)
+                elapsed = time.monotonic() - started
+        finally:
+            slow.close()
+        
+        rows = db_session.query(NotificationOutbox).order_by(NotificationOutbox.channel).all()
+        assert [row.channel for row in rows] == ["log", "webhook"]
+        assert all(row.status == PENDING for row in rows)
+        assert json.loads(rows[1].payload)["price"] == 80.0
+        assert slow.requests == []
+        assert elapsed < 1.0
+
+
+class TestDispatcher:
+    """Tests for sending outbox rows"""
+    
+    async def test_sends_batch(self, db_session, test_user, webhook):
+        """Test due rows are delivered with their idempotency key"""
+        add_notifications(db_session, test_user, 3)
+        
+        result = await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}).run()
+        
+        assert result["sent"] == 3
+        assert statuses(db_session) == [SENT] * 3
+        assert sorted(headers["Idempotency-Key"] for headers, _ in webhook.requests) == [
+            "test:0:webhook", "test:1:webhook", "test:2:webhook"
+        ]
+    
+    async def test_retry_with_backoff(self, db_session, test_user, webhook):
+        """Test a server error is retried later and then succeeds"""
+        add_notifications(db_session, test_user, 1)
+        webhook.statuses = [503]
+        
+        first = await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}).run()
+        row = db_session.query(NotificationOutbox).one()
+        db_session.refresh(row)
+        
+        assert first["retrying"] == 1
+        assert row.status == PENDING
+        assert row.attempts == 1
+        assert row.next_attempt_at > datetime.utcnow()
+        
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}).run()
+        
+        assert statuses(db_session) == [SENT]
+    
+    async def test_client_error_is_permanent(self, db_session, test_user, webhook):
+        """Test a rejected request is not retried"""
+        add_notifications(db_session, test_user, 1)
+        webhook.statuses = [400]
+        
+        await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}).run()
+        
+        assert statuses(db_session) == [FAILED]
+    
+    async def test_gives_up_after_max_attempts(self, db_session, test_user, webhook):
+        """Test a row fails for good once it runs out of attempts"""
+        add_notifications(db_session, test_user, 1)
+        webhook.statuses = [500]
+        
+        await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}, max_attempts=1).run()
+        
+        assert statuses(db_session) == [FAILED]
+    
+    async def test_per_channel_concurrency(self, db_session, test_user):
+        """Test a slow provider never sees more than its concurrency limit"""
+        slow = StubWebhook(delay=0.2)
+        add_notifications(db_session, test_user, 6)
+        add_notifications(db_session, test_user, 3, channel="log")
+        
+        try:
+            senders = {"webhook": WebhookSender(slow.url, concurrency=2), "log": LogSender()}
+            with patch.object(LogSender, "send", AsyncMock()):
+                result = await NotificationDispatcher(db_session, senders).run()
+        finally:
+            slow.close()
+        
+        assert result["sent"] == 9
+        assert slow.max_in_flight == 2
+    
+    async def test_expired_lease_is_reclaimed(self, db_session, test_user, webhook):
+        """Test rows stuck in sending by a dead dispatcher are sent again"""
+        rows = add_notifications(db_session, test_user, 2)
+        rows[0].status = SENDING
+        rows[1].status = SENDING
+        rows[1].next_attempt_at = datetime.utcnow() + timedelta(minutes=5)
+        db_session.commit()
+        
+        await NotificationDispatcher(db_session, {"webhook": WebhookSender(webhook.url)}).run()
+        
+        assert statuses(db_session) == [SENT, SENDING]
+    
+    @pytest.mark.parametrize("rule,message", [
+        ({"rule_type": "below_price", "target_price": 90.0}, "reached target price"),
+        ({"rule_type": "percent_drop", "threshold": 15.0, "window_days": 30}, "dropped 15% below its 30-day average"),
+        ({"rule_type": "all_time_low"}, "hit an all-time low"),
+    ])
+    async def test_log_every_rule_type(self, db_session, test_user, test_product, capsys, rule, message):
+        """Test each rule type is logged, with or without a target price"""
+        alert = PriceAlert(user_id=test_user.id, product_id=test_product.id, triggered_at=datetime.utcnow(), **rule)
+        db_session.add(alert)
+        db_session.flush()
+        with patch.object(settings, "NOTIFICATION_CHANNELS", ["log"]):
+            enqueue_alert_notifications(db_session, alert, test_product)
+        db_session.commit()
+        
+        result = await NotificationDispatcher(db_session, {"log": LogSender()}).run()
+        
+        assert result["sent"] == 1
+        assert statuses(db_session) == [SENT]
+        assert message in capsys.readouterr().out
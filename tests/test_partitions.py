@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from app.domain.models import PriceHistory
+from app.services.partitions import (
+    PriceHistoryPartitionManager,
+    add_months,
+    month_start,
+    partition_month,
+    partition_name,
+)
+from app.services.retention import purge_history_before
+
+
+class TestPartitionHelpers:
+    """Tests for monthly partition naming and bounds"""
+    
+    def test_month_start(self):
+        """Test truncating to the first instant of the month"""
+        assert month_start(datetime(2026, 10, 19, 13, 45)) == datetime(2026, 10, 1)
+    
+    def test_add_months_across_year(self):
+        """Test month arithmetic wraps years in both directions"""
+        assert add_months(datetime(2026, 11, 1), 3) == datetime(2027, 2, 1)
+        assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    
+    def test_partition_name_round_trip(self):
+        """Test partition names map back to their month"""
+        name = partition_name(datetime(2026, 3, 1))
+        
+        assert name == "price_history_p2026_03"
+        assert partition_month(name) == datetime(2026, 3, 1)
+        assert partition_month("price_history_default") is None
+
+
+class TestHistoryRetention:
+    """Tests for price history retention on an unpartitioned table"""
+    
+    def test_sqlite_is_not_partitioned(self, db_session):
+        """Test partition maintenance is a no-op on SQLite"""
+        manager = PriceHistoryPartitionManager(db_session)
+        
+        assert manager.is_partitioned is False
+        assert manager.ensure_partitions() == []
+        assert manager.drop_partitions_before(datetime.utcnow()) == []
+    
+    def test_purge_deletes_rows_before_cutoff(self, db_session, test_product):
+        """Test purge falls back to deleting old rows"""
+        now = datetime.utcnow()
+        db_session.add_all([
+            PriceHistory(product_id=test_product.id, price=10.0, timestamp=now - timedelta(days=200)),
+            PriceHistory(product_id=test_product.id, price=20.0, timestamp=now - timedelta(days=1)),
+        ])
+        db_session.commit()
+        
+        result = purge_history_before(db_session, now - timedelta(days=90))
+        
+        assert result["dropped_partitions"] == []
+        assert result["deleted_count"] == 1
+        remaining = db_session.query(PriceHistory).all()
+        assert [h.price for h in remaining] == [20.0]
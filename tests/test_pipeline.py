@@ -0,0 +1,202 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+
+from app.core.cache import RedisClient
+from app.domain.models import NotificationOutbox, PriceAlert, PriceHistory, Product
+from app.workers.pipeline import (
+    DEAD_LETTER_STREAM, FETCH_STREAM, PARSED_STREAM, RAW_STREAM,
+    FetchStage, ParseStage, PersistStage, active_products, enqueue_products
+)
+from tests.conftest import TestingSessionLocal
+
+PAGES = {
+    "/cheap": "<html><h1>Cheap Widget</h1><div>Price: R$ 80,00</div></html>",
+    "/pricey": "<html><h1>Pricey Widget</h1><div>Price: R$ 120,00</div></html>",
+    "/no-price": "<html><h1>Sold out</h1></html>",
+}
+
+
+class StubRetailer:
+    """Local shop serving fixed product pages"""
+    
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = PAGES.get(self.path)
+                body = page.encode() if page else b""
+                self.send_response(200 if page else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def retailer():
+    stub = StubRetailer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def redis_server():
+    """Fake Redis server shared by the sync producer and the async stages"""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def stream_client(redis_server):
+    return fakeredis.aioredis.FakeRedis(server=redis_server)
+
+
+@pytest.fixture
+def pipeline_cache(redis_server):
+    return RedisClient(client=fakeredis.FakeRedis(server=redis_server, decode_responses=True))
+
+
+def stage_options(**overrides) -> dict:
+    # Non-blocking reads: tests drive each stage batch by batch
+    return {"consumer": "test", "block_ms": 0, "claim_idle_ms": 60000, **overrides}
+
+
+def parsed_entry(product_id: int, price: str = "80.0") -> dict:
+    return {
+        "product_id": product_id,
+        "price": price,
+        "title": "Widget",
+        "source": "Generic",
+        "fetched_at": datetime.utcnow().isoformat()
+    }
+
+
+async def setup_stage(stage):
+    await stage.ensure_group()
+    return stage
+
+
+class TestPipeline:
+    """Tests for the fetch -> parse -> persist stages"""
+    
+    async def test_end_to_end(self, db_session, redis_server, stream_client, pipeline_cache, test_user, retailer):
+        """Test products flow through every stage into the database and alerts"""
+        products = [
+            Product(user_id=test_user.id, name=path, url=retailer.url + path, current_price=100.0)
+            for path in ("/cheap", "/pricey", "/no-price", "/missing")
+        ]
+        db_session.add_all(products)
+        db_session.commit()
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=products[0].id, target_price=90.0))
+        db_session.commit()
+        
+        fetch = await setup_stage(FetchStage(stream_client, **stage_options()))
+        executor = ProcessPoolExecutor(max_workers=1)
+        parse = await setup_stage(ParseStage(stream_client, executor=executor, **stage_options()))
+        persist = await setup_stage(PersistStage(
+            stream_client, session_factory=TestingSessionLocal, cache=pipeline_cache, **stage_options()
+        ))
+        
+        queued = enqueue_products(fakeredis.FakeRedis(server=redis_server), active_products(db_session))
+        try:
+            assert await fetch.run_once() == queued == 4
+            assert await parse.run_once() == 3
+            assert await persist.run_once() == 2
+        finally:
+            await fetch.close()
+            executor.shutdown()
+        
+        db_session.expire_all()
+        prices = {product.name: product.current_price for product in db_session.query(Product)}
+        assert prices == {"/cheap": 80.0, "/pricey": 120.0, "/no-price": 100.0, "/missing": 100.0}
+        assert db_session.query(PriceHistory).count() == 2
+        assert db_session.query(PriceAlert).one().triggered_at is not None
+        assert db_session.query(NotificationOutbox).count() > 0
+        
+        for stream in (FETCH_STREAM, RAW_STREAM, PARSED_STREAM):
+            assert await stream_client.xlen(stream) == 0
+        dead = [fields for _, fields in await stream_client.xrange(DEAD_LETTER_STREAM)]
+        assert sorted(fields[b"stage"] for fields in dead) == [b"fetchers", b"parsers"]
+    
+    async def test_backpressure(self, stream_client):
+        """Test a stage stops reading while the next stream is full"""
+        parse = await setup_stage(ParseStage(stream_client, executor=object(), **stage_options(max_backlog=1)))
+        await stream_client.xadd(RAW_STREAM, {"url": "https://example.com"})
+        await stream_client.xadd(PARSED_STREAM, parsed_entry(1))
+        
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(parse.run_once(), 0.2)
+        
+        assert (await stream_client.xpending(RAW_STREAM, parse.group))["pending"] == 0
+    
+    async def test_reclaims_stale_entries(self, db_session, stream_client, pipeline_cache, test_product):
+        """Test entries left pending by a dead consumer are processed by another"""
+        persist = await setup_stage(PersistStage(
+            stream_client, session_factory=TestingSessionLocal, cache=pipeline_cache,
+            **stage_options(claim_idle_ms=0)
+        ))
+        await stream_client.xadd(PARSED_STREAM, parsed_entry(test_product.id))
+        await stream_client.xreadgroup(persist.group, "crashed", {PARSED_STREAM: ">"})
+        
+        assert await persist.run_once() == 1
+        
+        db_session.refresh(test_product)
+        assert test_product.current_price == 80.0
+        assert (await stream_client.xpending(PARSED_STREAM, persist.group))["pending"] == 0
+    
+    async def test_bad_entry_is_dead_lettered(self, db_session, stream_client, pipeline_cache, test_product):
+        """Test one malformed entry doesn't hold back the rest of its batch"""
+        persist = await setup_stage(PersistStage(
+            stream_client, session_factory=TestingSessionLocal, cache=pipeline_cache, **stage_options()
+        ))
+        await stream_client.xadd(PARSED_STREAM, parsed_entry(test_product.id, price="not a price"))
+        await stream_client.xadd(PARSED_STREAM, parsed_entry(test_product.id, price="75.5"))
+        
+        assert await persist.run_once() == 2
+        
+        db_session.refresh(test_product)
+        assert test_product.current_price == 75.5
+        dead = await stream_client.xrange(DEAD_LETTER_STREAM)
+        assert len(dead) == 1
+        assert dead[0][1][b"reason"].startswith(b"invalid entry")
+    
+    async def test_duplicate_products_share_a_transaction(self, db_session, stream_client, pipeline_cache,
+                                                          test_user, test_product):
+        """Test repeated products in one batch are written in a single commit"""
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=test_product.id, target_price=90.0))
+        db_session.commit()
+        commits = []
+        
+        def session_factory():
+            session = TestingSessionLocal()
+            event.listen(session, "after_commit", commits.append)
+            return session
+        
+        persist = await setup_stage(PersistStage(
+            stream_client, session_factory=session_factory, cache=pipeline_cache, **stage_options()
+        ))
+        for price in ("80.0", "85.0", "70.0"):
+            await stream_client.xadd(PARSED_STREAM, parsed_entry(test_product.id, price=price))
+        
+        assert await persist.run_once() == 3
+        
+        assert len(commits) == 1
+        assert await stream_client.xlen(DEAD_LETTER_STREAM) == 0
+        assert db_session.query(PriceHistory).count() == 3
+        assert db_session.query(PriceAlert).one().triggered_at is not None
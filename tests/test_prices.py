@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+from app.services.prices import Price, detect_currency, parse_price, with_cents
+
+
+CORPUS = [
+    # Brazilian format
+    ("R$ 1.299,90", 1299.90, "BRL"),
+    ("R$1.299,90", 1299.90, "BRL"),
+    ("R$\u00a01.299,90", 1299.90, "BRL"),
+    ("R$ 12.345.678,99", 12345678.99, "BRL"),
+    ("R$ 150,50", 150.50, "BRL"),
+    ("R$ 0,99", 0.99, "BRL"),
+    ("R$ 1.299", 1299.0, "BRL"),
+    ("R$ 99", 99.0, "BRL"),
+    ("BRL 2.500,00", 2500.0, "BRL"),
+    ("2.500,00 BRL", 2500.0, "BRL"),
+    ("Por: R$ 1.299,90 à vista", 1299.90, "BRL"),
+    ("R$ 1.299,90 em 10x de R$ 129,99", 1299.90, "BRL"),
+    ("R$ 150 12x sem juros", 150.0, "BRL"),
+    # US format
+    ("$1,299.90", 1299.90, "USD"),
+    ("$ 1,299.90", 1299.90, "USD"),
+    ("US$ 1,299.90", 1299.90, "USD"),
+    ("U$ 49.99", 49.99, "USD"),
+    ("USD 1,000,000.00", 1000000.0, "USD"),
+    ("$12,345,678.99", 12345678.99, "USD"),
+    ("$0.99", 0.99, "USD"),
+    ("$1,299", 1299.0, "USD"),
+    ("Price: $19.99 each", 19.99, "USD"),
+    ("49.99 USD", 49.99, "USD"),
+    # Other symbols and spacing
+    ("12,50 €", 12.50, "EUR"),
+    ("€12.50", 12.50, "EUR"),
+    ("£1,250.00", 1250.0, "GBP"),
+    ("1\u202f299,90\u00a0€", 1299.90, "EUR"),
+    ("1\u00a0299,90", 1299.90, None),
+    ("1\u202f299.90", 1299.90, None),
+    # Bare numbers (meta tags, attributes)
+    ("349", 349.0, None),
+    ("1299.9", 1299.9, None),
+    ("1299,90", 1299.90, None),
+    ("19.90", 19.90, None),
+    ("0.5", 0.5, None),
+    ("007", 7.0, None),
+    ("1.299.000", 1299000.0, None),
+    ("1,299,000", 1299000.0, None),
+    ("12345.678", 12345.678, None),
+    ("0.299", 0.299, None),
+    # Split prices: whole part with a dangling decimal separator
+    ("1.299,", 1299.0, None),
+    ("1,299.", 1299.0, None),
+    ("  499  ", 499.0, None),
+]
+
+MALFORMED = [
+    "",
+    "   ",
+    "R$",
+    "Indisponível",
+    "R$ ,",
+    "1.2.3",
+    "1,2,3",
+    "12.34.56",
+    "1,299.99.99",
+    "1.299,999,99",
+    "1.29.900",
+    "1234.567.890",
+    "9" * 40,
+    ".99",
+    "R$ .99",
+    "R$ ,99",
+]
+
+
+class TestParsePrice:
+    """Tests for the locale-aware price parser"""
+    
+    @pytest.mark.parametrize("text, amount, currency", CORPUS)
+    def test_corpus(self, text, amount, currency):
+        """Test real-world price strings"""
+        assert parse_price(text) == Price(pytest.approx(amount), currency)
+    
+    @pytest.mark.parametrize("text", MALFORMED)
+    def test_malformed(self, text):
+        """Test text without a well-formed amount gives None"""
+        assert parse_price(text) is None
+    
+    def test_decimal_hint(self):
+        """Test the site's decimal separator settles a three-digit fraction"""
+        assert parse_price("1,299").amount == 1299.0
+        assert parse_price("1,299", decimal=",").amount == pytest.approx(1.299)
+        assert parse_price("1.299", decimal=",").amount == 1299.0
+        assert parse_price("1.299,90", decimal=".").amount == pytest.approx(1299.90)
+    
+    def test_currency_codes_are_whole_words(self):
+        """Test codes inside other words are not currencies"""
+        assert parse_price("SUBRL 5") == Price(5.0, None)
+        assert detect_currency("usd") is None
+        assert detect_currency("Preço em R$") == "BRL"
+        assert detect_currency("US$") == "USD"
+    
+    def test_with_cents(self):
+        """Test cents from their own element complete a whole amount"""
+        assert with_cents(Price(1299.0, "BRL"), "90") == Price(1299.90, "BRL")
+        assert with_cents(Price(10.0, None), " 05 ") == Price(10.05, None)
+        assert with_cents(Price(10.5, None), "90") == Price(10.5, None)
+        assert with_cents(Price(10.0, None), "abc") == Price(10.0, None)
+
+
+def format_price(rng: random.Random, cents: int) -> tuple:
+    """Render an amount in a random locale style; returns (text, currency)"""
+    thousands, decimal = rng.choice([(".", ","), (",", "."), ("\u00a0", ","), ("", ","), ("", ".")])
+    integer = f"{cents // 100:,}".replace(",", thousands)
+    symbol, currency = rng.choice([("R$ ", "BRL"), ("$", "USD"), ("US$ ", "USD"), ("", None), ("€", "EUR")])
+    text = f"{symbol}{integer}{decimal}{cents % 100:02d}"
+    prefix = rng.choice(["", "Por ", "Preço: ", "\n  "])
+    suffix = rng.choice(["", " à vista", " em 12x", "\n"])
+    return prefix + text + suffix, currency
+
+
+class TestParsePriceFuzz:
+    """Randomized round-trip and robustness tests"""
+    
+    def test_round_trip(self):
+        """Test formatted amounts parse back to the same value"""
+        rng = random.Random(42)
+        for _ in range(5000):
+            cents = rng.choice([rng.randint(1, 999), rng.randint(1000, 10 ** 6), rng.randint(10 ** 6, 10 ** 11)])
+            text, currency = format_price(rng, cents)
+            
+            assert parse_price(text) == Price(pytest.approx(cents / 100), currency), text
+    
+    def test_arbitrary_text_never_raises(self):
+        """Test random input gives None or a finite non-negative amount"""
+        rng = random.Random(7)
+        alphabet = "0123456789.,  \u00a0\u202fR$US€£BRLabc-x\n"
+        for _ in range(5000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            
+            price = parse_price(text)
+            
+            assert price is None or price.amount >= 0, text
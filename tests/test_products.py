@@ -103,6 +103,23 @@ class TestProducts:
         )
         assert response.status_code == status.HTTP_404_NOT_FOUND
     
+    def test_delete_product_with_history_and_alerts(self, client, auth_headers, db_session, test_product):
+        """Test deleting a product removes its history and alerts"""
+        from app.domain.models import PriceAlert, PriceHistory
+        
+        db_session.add(PriceHistory(product_id=test_product.id, price=99.99))
+        db_session.add(PriceAlert(user_id=test_product.user_id, product_id=test_product.id, target_price=80.0))
+        db_session.commit()
+        
+        response = client.delete(
+            f"/api/v1/products/{test_product.id}",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert db_session.query(PriceHistory).count() == 0
+        assert db_session.query(PriceAlert).count() == 0
+    
     def test_get_price_history_empty(self, client, auth_headers, test_product):
         """Test getting price history when empty"""
         response = client.get(
@@ -115,6 +132,28 @@ class TestProducts:
         assert isinstance(data, list)
         assert len(data) == 0
     
+    def test_get_price_history_time_range(self, client, auth_headers, test_product, db_session):
+        """Test filtering price history by time range"""
+        from datetime import datetime, timedelta
+        from app.domain.models import PriceHistory
+        
+        now = datetime.utcnow()
+        db_session.add_all([
+            PriceHistory(product_id=test_product.id, price=90.0, timestamp=now - timedelta(days=40)),
+            PriceHistory(product_id=test_product.id, price=80.0, timestamp=now - timedelta(days=5)),
+        ])
+        db_session.commit()
+        
+        response = client.get(
+            f"/api/v1/products/{test_product.id}/history",
+            headers=auth_headers,
+            params={"since": (now - timedelta(days=30)).isoformat()}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [h["price"] for h in data] == [80.0]
+    
     def test_create_product_invalid_url(self, client, auth_headers):
         """Test creating product with invalid URL"""
         response = client.post(
@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore, ProfilingMiddleware, StackSampler, get_profile_store, profiled
+from app.workers.celery_worker import check_product_task
+from main import app
+
+
+def spin_for_profile(seconds: float = 0.1):
+    """Keeps the CPU busy so the sampler finds this frame"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+TOKEN = "profiling-secret"
+
+
+@pytest.fixture
+def store(tmp_path):
+    profile_store = ProfileStore(directory=str(tmp_path), max_files=3)
+    app.dependency_overrides[get_profile_store] = lambda: profile_store
+    with patch.object(settings, "PROFILING_TOKEN", TOKEN):
+        yield profile_store
+    app.dependency_overrides.pop(get_profile_store, None)
+
+
+@pytest.fixture
+def operator_headers(auth_headers):
+    """A user's headers plus the profiling token"""
+    return {**auth_headers, "X-Profile": TOKEN}
+
+
+class TestStackSampler:
+    """Tests for the stack sampler"""
+    
+    def test_busy_frames_are_sampled(self):
+        """Test a busy function shows up in a stack rooted at its thread name"""
+        sampler = StackSampler(interval=0.002)
+        sampler.start()
+        spin_for_profile()
+        stacks = sampler.stop()
+        
+        assert sampler.samples > 0
+        busy = [stack for stack in stacks if "spin_for_profile" in stack]
+        assert busy
+        assert all(stack.startswith(f"{threading.current_thread().name};") for stack in busy)
+    
+    def test_waiting_threads_are_left_out(self):
+        """Test a thread parked on an event adds no stacks"""
+        parked = threading.Event()
+        waiter = threading.Thread(target=parked.wait, name="parked-waiter", daemon=True)
+        waiter.start()
+        try:
+            sampler = StackSampler()
+            for _ in range(5):
+                sampler.sample()
+        finally:
+            parked.set()
+            waiter.join()
+        
+        assert not any(stack.startswith("parked-waiter") for stack in sampler.stacks)
+
+
+class TestProfileStore:
+    """Tests for stored profiles"""
+    
+    def test_round_trip(self, store):
+        """Test a saved profile is listed and read back in folded format"""
+        profile_id = store.new_id("request")
+        store.save(profile_id, Counter({"main;handler;query": 3, "main;handler": 1}))
+        
+        assert store.read(profile_id) == "main;handler;query 3\nmain;handler 1\n"
+        assert [(p["id"], p["kind"]) for p in store.list()] == [(profile_id, "request")]
+    
+    def test_oldest_are_removed(self, store):
+        """Test only the newest max_files profiles are kept"""
+        ids = [f"2026010{i}T000000-request-0000000{i}" for i in range(1, 6)]
+        for profile_id in ids:
+            store.save(profile_id, Counter({"main": 1}))
+        
+        assert [p["id"] for p in store.list()] == ids[:1:-1]
+        assert store.read(ids[0]) is None
+    
+    def test_ids_cannot_leave_the_directory(self, store):
+        """Test ids that aren't profile ids are not read"""
+        assert store.read("../../etc/passwd") is None
+        assert store.read("20260101T000000-request-zzzzzzzz") is None
+
+
+class TestProfiled:
+    """Tests for profiling a block"""
+    
+    def test_saves_a_profile(self, store):
+        """Test the block's stacks are saved under the id handed out"""
+        with profiled("task", store) as profile:
+            spin_for_profile(0.05)
+        
+        assert profile.id and profile.samples > 0
+        assert "spin_for_profile" in store.read(profile.id)
+    
+    def test_concurrency_cap(self, store):
+        """Test blocks beyond PROFILING_MAX_CONCURRENT run unprofiled"""
+        with patch("app.core.profiling._slots", threading.BoundedSemaphore(1)):
+            with profiled("task", store) as first:
+                with profiled("task", store) as second:
+                    pass
+        
+        assert first.id is not None
+        assert second.id is None
+        assert len(store.list()) == 1
+
+
+class TestProfilingMiddleware:
+    """Tests for profiling API requests"""
+    
+    def test_requested_profile_is_downloadable(self, client, auth_headers, operator_headers, store):
+        """Test a request sent with the token names its profile, which the API serves"""
+        profiling_client = TestClient(ProfilingMiddleware(app, store=store))
+        
+        response = profiling_client.get("/api/v1/products/", headers=operator_headers)
+        profile_id = response.headers["x-profile-id"]
+        
+        listed = client.get("/api/v1/profiles/", headers=operator_headers).json()
+        assert [p["id"] for p in listed] == [profile_id]
+        download = client.get(f"/api/v1/profiles/{profile_id}", headers=operator_headers)
+        assert download.status_code == 200
+        assert download.headers["content-type"].startswith("text/plain")
+    
+    @pytest.mark.parametrize("token,value", [(TOKEN, "1"), (TOKEN, ""), ("", "")])
+    def test_header_needs_the_token(self, client, auth_headers, store, token, value):
+        """Test the header alone, or with a wrong token, does not profile"""
+        profiling_client = TestClient(ProfilingMiddleware(app, store=store))
+        
+        with patch.object(settings, "PROFILING_TOKEN", token):
+            response = profiling_client.get("/api/v1/products/", headers={**auth_headers, "X-Profile": value})
+        
+        assert "x-profile-id" not in response.headers
+        assert store.list() == []
+    
+    def test_other_requests_are_not_profiled(self, client, auth_headers, store):
+        """Test requests without the header are left alone at a zero sample rate"""
+        profiling_client = TestClient(ProfilingMiddleware(app, store=store))
+        
+        response = profiling_client.get("/api/v1/products/", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert store.list() == []
+    
+    def test_sample_rate(self, client, store):
+        """Test a sample rate of 1 profiles every request"""
+        profiling_client = TestClient(ProfilingMiddleware(app, sample_rate=1.0, store=store))
+        
+        assert "x-profile-id" in profiling_client.get("/health").headers
+    
+    def test_profiles_need_a_user(self, client, store):
+        """Test profiles are not served anonymously"""
+        assert client.get("/api/v1/profiles/", headers={"X-Profile": TOKEN}).status_code == 401
+    
+    def test_profiles_need_the_token(self, client, auth_headers, store):
+        """Test a logged-in user without the token cannot read profiles"""
+        assert client.get("/api/v1/profiles/", headers=auth_headers).status_code == 403
+        assert client.get("/api/v1/profiles/", headers={**auth_headers, "X-Profile": "guess"}).status_code == 403
+    
+    def test_unknown_profile(self, client, operator_headers, store):
+        """Test a missing profile is a 404"""
+        response = client.get("/api/v1/profiles/20260101T000000-request-00000000", headers=operator_headers)
+        
+        assert response.status_code == 404
+
+
+class TestTaskProfiling:
+    """Tests for the profile option of the check tasks"""
+    
+    def run_task(self, store, **kwargs):
+        monitor = MagicMock()
+        
+        async def check_product_price(product_id):
+            spin_for_profile(0.05)
+            return {"product_id": product_id}
+        
+        monitor.check_product_price = check_product_price
+        with patch("app.workers.celery_worker.SessionLocal"), \
+                patch("app.workers.celery_worker.PriceMonitorService", return_value=monitor), \
+                patch("app.core.profiling.profile_store", store):
+            return check_product_task(7, **kwargs)
+    
+    def test_profile_option(self, store):
+        """Test profile=True saves the check's stacks and returns their id"""
+        result = self.run_task(store, profile=True)
+        
+        assert result["status"] == "success"
+        assert "check_product_price" in store.read(result["profile_id"])
+    
+    def test_off_by_default(self, store):
+        """Test tasks don't profile unless asked"""
+        result = self.run_task(store)
+        
+        assert result["status"] == "success"
+        assert "profile_id" not in result
+        assert store.list() == []
@@ -0,0 +1,186 @@
+"""
+SQL statement budgets for every API endpoint and for price sweeps.
+
+Each request runs against PRODUCTS products with history and an alert each,
+with empty caches, so a query per row pushes it over its budget. Budgets are
+the statements a request needs today; raise one only together with the
+change that needs the extra query.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.domain.models import PriceAlert, PriceHistory, Product, User
+from app.services.monitor import PriceMonitorService
+from tests.query_counter import count_queries
+
+PRODUCTS = 5
+
+# Statements per product in a sweep: the product, its aggregates and alerts,
+# the price and history writes and the reload after the commit
+SWEEP_PER_PRODUCT = 12
+
+# (method, route, body, budget); every authenticated request starts with the user lookup
+BUDGETS = [
+    ("POST", "/api/v1/auth/register", {"email": "new@example.com", "username": "new", "password": "secret123"}, 4),
+    ("POST", "/api/v1/auth/login", None, 1),
+    ("GET", "/api/v1/products/", None, 2),
+    ("POST", "/api/v1/products/", {"name": "New", "url": "https://example.com/new"}, 4),
+    ("GET", "/api/v1/products/{product_id}", None, 3),
+    ("PATCH", "/api/v1/products/{product_id}", {"name": "Renamed"}, 5),
+    ("DELETE", "/api/v1/products/{product_id}", None, 9),
+    ("GET", "/api/v1/products/{product_id}/history", None, 3),
+    ("GET", "/api/v1/alerts/", None, 2),
+    ("POST", "/api/v1/alerts/", {"product_id": "{product_id}", "target_price": 60.0}, 4),
+    # One INSERT per alert
+    ("POST", "/api/v1/alerts/group", {"product_ids": "{product_ids}", "target_price": 60.0}, 3 + PRODUCTS),
+    ("DELETE", "/api/v1/alerts/{alert_id}", None, 4),
+    ("GET", "/api/v1/dashboard/", None, 3),
+    ("GET", "/api/v1/monitor/adapters", None, 1),
+    ("GET", "/api/v1/monitor/stats", None, 4),
+    ("GET", "/api/v1/monitor/stats/{product_id}", None, 4),
+    ("POST", "/api/v1/monitor/check/{product_id}", None, 2 + SWEEP_PER_PRODUCT),
+    ("POST", "/api/v1/monitor/check-all", None, 2 + SWEEP_PER_PRODUCT * PRODUCTS),
+    ("GET", "/api/v1/profiles/", None, 1),
+]
+
+
+def scraped(price: float = 79.9) -> dict:
+    return {"price": price, "title": "Produto", "currency": "BRL", "source": "Generic", "timestamp": datetime.utcnow()}
+
+
+def fill(value, ids: dict):
+    """Replace a "{name}" placeholder with the fixture's id"""
+    if isinstance(value, str) and value.startswith("{"):
+        return ids[value[1:-1]]
+    return value
+
+
+@pytest.fixture
+def catalog(db_session, test_user):
+    """PRODUCTS products with history and an alert each, next to another user's product"""
+    now = datetime.utcnow()
+    other = User(email="other@example.com", username="other", hashed_password="x", is_active=True)
+    db_session.add(other)
+    db_session.flush()
+    db_session.add(Product(user_id=other.id, name="Other", url="https://example.com/other", current_price=10.0))
+    
+    products = []
+    for i in range(PRODUCTS):
+        product = Product(
+            user_id=test_user.id, name=f"Product {i}", url=f"https://example.com/p/{i}",
+            current_price=100.0 + i, last_checked=now, is_active=True
+        )
+        db_session.add(product)
+        db_session.flush()
+        db_session.add_all(
+            PriceHistory(product_id=product.id, price=100.0 + i + day, timestamp=now - timedelta(days=day))
+            for day in range(3)
+        )
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=product.id, target_price=50.0))
+        products.append(product)
+    db_session.commit()
+    return products
+
+
+@pytest.fixture
+def scraper():
+    with patch("app.services.monitor.scraper_service.scrape_price", AsyncMock(return_value=scraped())) as scrape:
+        yield scrape
+
+
+class TestEndpointQueryBudgets:
+    """Tests for the statements each endpoint runs"""
+    
+    @pytest.mark.parametrize("method,route,body,budget", BUDGETS, ids=[f"{m} {r}" for m, r, _, _ in BUDGETS])
+    def test_budget(self, client, auth_headers, catalog, scraper, db_session, method, route, body, budget):
+        """Test the request stays within its budget without lazy loads per row"""
+        ids = {
+            "product_id": catalog[0].id,
+            "product_ids": [product.id for product in catalog],
+            "alert_id": db_session.query(PriceAlert.id).first()[0]
+        }
+        kwargs = {"headers": auth_headers}
+        if route.startswith("/api/v1/profiles"):
+            kwargs["headers"] = {**auth_headers, settings.PROFILING_HEADER: "budget"}
+        if route.endswith("/login"):
+            kwargs["data"] = {"username": "testuser", "password": "testpass123"}
+        elif body:
+            kwargs["json"] = {key: fill(value, ids) for key, value in body.items()}
+        
+        with count_queries() as queries, patch.object(settings, "PROFILING_TOKEN", "budget"):
+            response = client.request(method, route.format(**ids), **kwargs)
+        
+        assert response.status_code < 400, response.text
+        queries.assert_at_most(budget)
+        queries.assert_no_n_plus_one()
+    
+    def test_every_endpoint_has_a_budget(self):
+        """Test new endpoints get a budget too"""
+        from main import app
+        
+        budgeted = {(method, route) for method, route, _, _ in BUDGETS}
+        # Streams and files: no queries beyond the user lookup, or none at all
+        exempt = {("GET", "/api/v1/events/stream"), ("GET", "/api/v1/profiles/{profile_id}"), ("GET", "/metrics")}
+        for route in app.routes:
+            if not route.path.startswith("/api/"):
+                continue
+            for method in getattr(route, "methods", set()) - {"HEAD", "OPTIONS"}:
+                assert (method, route.path) in budgeted | exempt, f"No query budget for {method} {route.path}"
+
+
+class TestSweepQueryBudget:
+    """Tests for the statements a price sweep runs"""
+    
+    async def test_check_all_products(self, db_session, cache, catalog, scraper):
+        """Test a sweep costs a fixed number of statements per product"""
+        monitor = PriceMonitorService(db_session, cache)
+        
+        with count_queries() as queries:
+            results = await monitor.check_all_products()
+        
+        assert len(results) == PRODUCTS + 1
+        queries.assert_at_most(1 + SWEEP_PER_PRODUCT * (PRODUCTS + 1))
+        queries.assert_no_n_plus_one()
+
+
+class TestQueryCounter:
+    """Tests for the query counter and the N+1 detector"""
+    
+    @pytest.mark.allow_lazy_loads
+    def test_lazy_loads_in_a_loop_are_flagged(self, db_session, test_user, catalog):
+        """Test touching a relationship of each row is reported as N+1"""
+        user_id = test_user.id
+        db_session.expire_all()
+        
+        with count_queries() as queries:
+            for product in db_session.query(Product).filter(Product.user_id == user_id).all():
+                product.alerts
+        
+        assert queries.lazy_loads["Product.alerts"] == PRODUCTS
+        assert queries.count == 1 + PRODUCTS
+        with pytest.raises(AssertionError, match="N\\+1"):
+            queries.assert_no_n_plus_one()
+    
+    def test_eager_loads_are_not_flagged(self, db_session, catalog):
+        """Test selectinload() counts as one query and no lazy loads"""
+        db_session.expire_all()
+        
+        with count_queries() as queries:
+            for product in db_session.query(Product).options(selectinload(Product.alerts)).all():
+                product.alerts
+        
+        assert queries.count == 2
+        queries.assert_no_n_plus_one()
+    
+    def test_budget_failure_lists_statements(self, db_session, catalog):
+        """Test an exceeded budget shows the statements that ran"""
+        with count_queries() as queries:
+            db_session.query(Product).count()
+            db_session.query(PriceAlert).count()
+        
+        with pytest.raises(AssertionError, match="price_alerts"):
+            queries.assert_at_most(1)
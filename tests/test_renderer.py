@@ -0,0 +1,315 @@
+import asyncio
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from app.services.renderer import BrowserPool, RenderQueueFull, launch_chromium
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.services.sites import AdapterMetrics, SiteRegistry
+
+FIXTURES = Path(__file__).parent / "fixtures" / "render"
+
+JS_SHOP = {
+    "name": "jsshop",
+    "domains": ["localhost"],
+    "needs_js": True,
+    "price": [{"css": "#price"}],
+    "title": [{"css": "h1"}]
+}
+
+
+class FixtureSite:
+    """Local server for the fixture pages, counting requests per path"""
+    
+    def __init__(self):
+        self.requests = Counter()
+        site = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests[self.path] += 1
+                path = FIXTURES / self.path.lstrip("/")
+                body = path.read_bytes() if self.path.endswith(".html") and path.exists() else b""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html" if body else "application/octet-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://localhost:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeRoute:
+    def __init__(self, resource_type: str):
+        self.request = type("Request", (), {"resource_type": resource_type})()
+        self.action = None
+    
+    async def abort(self):
+        self.action = "abort"
+    
+    async def continue_(self):
+        self.action = "continue"
+
+
+class FakePage:
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.html = ""
+    
+    async def set_extra_http_headers(self, headers):
+        self.browser.headers.append(headers)
+    
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.browser.open_pages += 1
+        self.browser.max_open_pages = max(self.browser.max_open_pages, self.browser.open_pages)
+        self.browser.started.append(url)
+        try:
+            # The page and its subresources go through the context's route handler
+            for resource_type in ("document", "stylesheet", "script", "image", "font", "media", "xhr"):
+                route = FakeRoute(resource_type)
+                await self.context.handler(route)
+                self.browser.routed[resource_type].add(route.action)
+            await self.browser.gate.wait()
+            if "broken" in url:
+                raise RuntimeError("Target crashed")
+            self.html = self.browser.pages.get(url, "<html></html>")
+        finally:
+            self.browser.open_pages -= 1
+    
+    async def content(self):
+        return self.html
+    
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.handler = None
+        self.closed = False
+    
+    async def route(self, pattern, handler):
+        self.handler = handler
+    
+    async def new_page(self):
+        return FakePage(self.browser, self)
+    
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    """Browser double: returns prepared HTML for each URL, optionally held at a gate"""
+    
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+        self.contexts = []
+        self.headers = []
+        self.started = []
+        self.open_pages = 0
+        self.max_open_pages = 0
+        self.launches = 0
+        self.stopped = False
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.routed = {kind: set() for kind in ("document", "stylesheet", "script", "image", "font", "media", "xhr")}
+    
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+    
+    async def launch(self):
+        self.launches += 1
+        
+        async def stop():
+            self.stopped = True
+        
+        return self, stop
+
+
+@pytest.fixture
+def site():
+    fixture_site = FixtureSite()
+    yield fixture_site
+    fixture_site.close()
+
+
+@pytest.fixture
+def browser():
+    return FakeBrowser()
+
+
+def scraper_for(sites, pool, cache):
+    return ScraperService(
+        snapshots=None,
+        breakers=CircuitBreakers(),
+        registry=SiteRegistry(sites),
+        renderer=pool
+    )
+
+
+class TestBrowserPool:
+    """Tests for the bounded browser context pool"""
+    
+    async def test_blocks_heavy_resources(self, browser):
+        """Test images, fonts and media are aborted and everything else continues"""
+        pool = BrowserPool(launcher=browser.launch)
+        
+        await pool.render("http://shop.test/p", {"Accept-Language": "pt-BR"})
+        
+        assert browser.routed["image"] == browser.routed["font"] == browser.routed["media"] == {"abort"}
+        assert browser.routed["document"] == browser.routed["script"] == browser.routed["xhr"] == {"continue"}
+        assert browser.headers == [{"Accept-Language": "pt-BR"}]
+        assert pool.stats()["blocked_requests"] == 3
+    
+    async def test_contexts_are_reused_and_recycled(self, browser):
+        """Test one browser is launched and contexts are replaced after max_uses pages"""
+        pool = BrowserPool(size=1, max_uses=2, launcher=browser.launch)
+        
+        for i in range(5):
+            await pool.render(f"http://shop.test/{i}")
+        
+        assert browser.launches == 1
+        assert len(browser.contexts) == 3
+        assert [context.closed for context in browser.contexts] == [True, True, False]
+        assert pool.stats()["contexts_recycled"] == 2
+        assert pool.stats()["rendered"] == 5
+    
+    async def test_concurrency_is_capped_and_queued_in_order(self, browser):
+        """Test at most size pages render at once and the rest wait their turn"""
+        browser.gate.clear()
+        pool = BrowserPool(size=2, launcher=browser.launch)
+        
+        renders = [asyncio.create_task(pool.render(f"http://shop.test/{i}")) for i in range(6)]
+        await asyncio.sleep(0.05)
+        
+        assert browser.open_pages == 2
+        assert pool.stats()["waiting"] == 4
+        
+        browser.gate.set()
+        await asyncio.gather(*renders)
+        
+        assert browser.max_open_pages == 2
+        assert browser.started == [f"http://shop.test/{i}" for i in range(6)]
+        assert len(browser.contexts) == 2
+        assert pool.stats()["waiting"] == pool.stats()["in_use"] == 0
+    
+    async def test_full_queue_fails_fast(self, browser):
+        """Test requests beyond the queue limit are refused instead of piling up"""
+        browser.gate.clear()
+        pool = BrowserPool(size=1, max_queue=1, launcher=browser.launch)
+        
+        renders = [asyncio.create_task(pool.render(f"http://shop.test/{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        
+        with pytest.raises(RenderQueueFull):
+            await pool.render("http://shop.test/late")
+        
+        browser.gate.set()
+        await asyncio.gather(*renders)
+    
+    async def test_failed_context_is_discarded(self, browser):
+        """Test a context that errored mid-page is closed, not reused"""
+        pool = BrowserPool(size=1, launcher=browser.launch)
+        
+        with pytest.raises(RuntimeError):
+            await pool.render("http://shop.test/broken")
+        await pool.render("http://shop.test/ok")
+        
+        assert len(browser.contexts) == 2
+        assert browser.contexts[0].closed
+        assert pool.stats()["in_use"] == 0
+    
+    async def test_close(self, browser):
+        """Test closing the pool closes idle contexts and stops the browser"""
+        pool = BrowserPool(launcher=browser.launch)
+        await pool.render("http://shop.test/p")
+        
+        await pool.close()
+        
+        assert browser.stopped
+        assert browser.contexts[0].closed
+        assert pool.stats()["idle_contexts"] == 0
+
+
+class TestScraperRendering:
+    """Tests for when the scraper falls back to the browser"""
+    
+    async def test_flagged_site_is_rendered_on_miss(self, site, browser, cache):
+        """Test a JS-only page on a needs_js site is rendered and parsed"""
+        url = f"{site.base}/js_product.html"
+        browser.pages[url] = (FIXTURES / "js_product_rendered.html").read_text()
+        scraper = scraper_for([JS_SHOP], BrowserPool(launcher=browser.launch), cache)
+        before = AdapterMetrics().summary(scraper.registry.get("jsshop"))
+        
+        result = await scraper.scrape_price(url)
+        
+        assert (result["price"], result["title"]) == (1299.90, "Fone Bluetooth")
+        assert browser.started == [url]
+        after = AdapterMetrics().summary(scraper.registry.get("jsshop"))
+        assert (after["success"] - before["success"], after["rendered"] - before["rendered"]) == (1, 1)
+    
+    async def test_static_hit_is_not_rendered(self, site, browser, cache):
+        """Test flagged sites skip the browser when the static page has the price"""
+        scraper = scraper_for([JS_SHOP], BrowserPool(launcher=browser.launch), cache)
+        
+        result = await scraper.scrape_price(f"{site.base}/static_product.html")
+        
+        assert result["price"] == 49.90
+        assert browser.launches == 0
+    
+    async def test_unflagged_site_is_not_rendered(self, site, browser, cache):
+        """Test sites without needs_js never start a browser"""
+        scraper = scraper_for([{**JS_SHOP, "needs_js": False}], BrowserPool(launcher=browser.launch), cache)
+        
+        assert await scraper.scrape_price(f"{site.base}/js_product.html") is None
+        assert browser.launches == 0
+    
+    def test_render_domains_setting(self):
+        """Test domains can be flagged without writing an adapter"""
+        registry = SiteRegistry([], render_domains=["www.spa-shop.com.br"])
+        
+        assert registry.needs_js("https://loja.spa-shop.com.br/p/1")
+        assert not registry.needs_js("https://other.example.com/p/1")
+
+
+@pytest.fixture
+async def chromium():
+    try:
+        _, stop = await launch_chromium()
+    except Exception as e:
+        pytest.skip(f"Chromium is not available: {e}")
+    await stop()
+
+
+class TestChromium:
+    """Tests against a real headless Chromium (skipped when it isn't installed)"""
+    
+    async def test_renders_fixture_page(self, site, chromium):
+        """Test scripts run, the price is read and heavy resources are never requested"""
+        pool = BrowserPool(size=1)
+        url = f"{site.base}/js_product.html"
+        try:
+            html = await pool.render(url)
+        finally:
+            await pool.close()
+        
+        assert SiteRegistry([JS_SHOP]).get("jsshop").parse(html)["price"] == 1299.90
+        assert site.requests["/js_product.html"] == 1
+        assert site.requests["/photo.jpg"] == site.requests["/font.woff2"] == 0
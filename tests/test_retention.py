@@ -0,0 +1,98 @@
+import csv
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.domain.models import PriceHistory
+from app.services.archive import ColdArchive
+from app.services.dashboard import dashboard_cache_key
+from app.services.retention import CHECKPOINT_KEY, HistoryCleanupJob, purge_history_before
+
+
+@pytest.fixture
+def old_history(db_session, test_product):
+    """25 expired rows followed by 5 recent ones"""
+    now = datetime.utcnow()
+    db_session.add_all([
+        PriceHistory(product_id=test_product.id, price=float(i), timestamp=now - timedelta(days=200 - i))
+        for i in range(25)
+    ])
+    db_session.add_all([
+        PriceHistory(product_id=test_product.id, price=1000.0 + i, timestamp=now - timedelta(hours=i))
+        for i in range(5)
+    ])
+    db_session.commit()
+    return now - timedelta(days=90)
+
+
+class TestHistoryCleanupJob:
+    """Tests for the batched retention job"""
+    
+    def test_deletes_in_batches(self, db_session, cache, old_history):
+        """Test only expired rows are deleted, in bounded batches"""
+        job = HistoryCleanupJob(db_session, cache, batch_size=10, pause_seconds=0, archive_dir=None)
+        
+        result = job.run(old_history)
+        
+        assert result["deleted_count"] == 25
+        assert result["batches"] == 3
+        assert result["completed"] is True
+        assert result["rows_per_second"] > 0
+        assert db_session.query(PriceHistory).count() == 5
+        assert cache.get(CHECKPOINT_KEY) is None
+    
+    def test_resumes_from_checkpoint(self, db_session, cache, old_history):
+        """Test a run stopped by max runtime resumes with its original cutoff"""
+        stopped = HistoryCleanupJob(
+            db_session, cache, batch_size=10, pause_seconds=0, max_runtime_seconds=0, archive_dir=None
+        )
+        first = stopped.run(old_history)
+        assert first["completed"] is False
+        assert cache.get(CHECKPOINT_KEY)["cutoff"] == old_history.isoformat()
+        
+        # A later run with a different cutoff first finishes the interrupted one
+        job = HistoryCleanupJob(db_session, cache, batch_size=10, pause_seconds=0, archive_dir=None)
+        result = job.run(datetime.utcnow() - timedelta(days=1000))
+        
+        assert result["resumed"] is True
+        assert result["cutoff"] == old_history.isoformat()
+        assert result["deleted_count"] == 25
+        assert cache.get(CHECKPOINT_KEY) is None
+    
+    def test_archives_before_deleting(self, db_session, cache, old_history, tmp_path):
+        """Test expired rows are written to compressed CSV files"""
+        job = HistoryCleanupJob(db_session, cache, batch_size=10, pause_seconds=0, archive_dir=str(tmp_path))
+        
+        job.run(old_history)
+        
+        files = sorted(tmp_path.glob("*.csv.gz"))
+        assert len(files) == 3
+        archived = []
+        for path in files:
+            with gzip.open(path, "rt", newline="") as f:
+                archived.extend(csv.DictReader(f))
+        assert sorted(float(row["price"]) for row in archived) == [float(i) for i in range(25)]
+
+
+class TestPurgeHistory:
+    """Tests for retention combined with the cold archive"""
+    
+    def test_moves_to_cold_archive_before_deleting(self, db_session, cache, test_product, old_history, tmp_path):
+        """Test rows past retention but inside the hot window still reach the cold tier"""
+        archive = ColdArchive(str(tmp_path / "cold"))
+        
+        result = purge_history_before(db_session, old_history, cache, cold_archive=archive, pause_seconds=0)
+        
+        assert result["moved_to_cold"] == 25
+        assert result["deleted_count"] == 0
+        assert db_session.query(PriceHistory).count() == 5
+        assert sorted(row.price for row in archive.read(test_product.id)) == [float(i) for i in range(25)]
+    
+    def test_invalidates_dashboards(self, db_session, cache, test_product, old_history):
+        """Test deleting history drops the cached dashboards of product owners"""
+        cache.set(dashboard_cache_key(test_product.user_id), {"stale": True})
+        
+        purge_history_before(db_session, old_history, cache, pause_seconds=0, archive_dir=None)
+        
+        assert not cache.exists(dashboard_cache_key(test_product.user_id))
@@ -0,0 +1,190 @@
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services.retry import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpen, RetriesExhausted,
+    RetryPolicy, fetch_with_retry, parse_retry_after
+)
+from app.services.scraper import ScraperService
+
+
+class StubShop:
+    """Local shop answering with queued (status, headers) pairs, then 200"""
+    
+    def __init__(self):
+        self.responses = []
+        self.requests = 0
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                status_code, headers = stub.responses.pop(0) if stub.responses else (200, {})
+                body = b"<html><h1>Widget</h1><div>R$ 10,00</div></html>"
+                self.send_response(status_code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/product"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve(html: str) -> AsyncMock:
+    """AsyncClient.send replacement answering every request with the page"""
+    return AsyncMock(side_effect=lambda request, **kwargs: httpx.Response(200, text=html, request=request))
+
+
+@pytest.fixture
+def shop():
+    stub = StubShop()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def policy():
+    """Three attempts; sleeps are recorded instead of waited"""
+    return RetryPolicy(max_attempts=3, backoff_seconds=1, backoff_max_seconds=4, sleep=AsyncMock())
+
+
+async def fetch(shop, policy, breakers):
+    async with httpx.AsyncClient() as client:
+        return await fetch_with_retry(client, shop.url, policy=policy, breakers=breakers)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestRetryPolicy:
+    """Tests for which failures are retried and how long to wait"""
+    
+    async def test_retries_server_errors(self, shop, policy):
+        """Test a 503 is retried with backoff and then succeeds"""
+        shop.responses = [(503, {}), (502, {})]
+        
+        response = await fetch(shop, policy, CircuitBreakers())
+        
+        assert response.status_code == 200
+        assert shop.requests == 3
+        delays = [call.args[0] for call in policy.sleep.await_args_list]
+        assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+    
+    async def test_honors_retry_after(self, shop, policy):
+        """Test the server's Retry-After replaces the backoff"""
+        shop.responses = [(429, {"Retry-After": "7"})]
+        
+        await fetch(shop, policy, CircuitBreakers())
+        
+        policy.sleep.assert_awaited_once_with(7.0)
+    
+    async def test_client_errors_are_not_retried(self, shop, policy):
+        """Test a 404 fails at once"""
+        shop.responses = [(404, {})]
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch(shop, policy, CircuitBreakers())
+        
+        assert shop.requests == 1
+    
+    async def test_gives_up(self, shop, policy):
+        """Test retries stop after max_attempts"""
+        shop.responses = [(500, {})] * 3
+        
+        with pytest.raises(RetriesExhausted):
+            await fetch(shop, policy, CircuitBreakers())
+        
+        assert shop.requests == 3
+    
+    async def test_long_retry_after_sheds_domain(self, shop, policy):
+        """Test a Retry-After beyond the limit opens the breaker instead of waiting"""
+        shop.responses = [(503, {"Retry-After": "3600"})]
+        breakers = CircuitBreakers()
+        
+        with pytest.raises(RetriesExhausted):
+            await fetch(shop, policy, breakers)
+        with pytest.raises(CircuitOpen):
+            await fetch(shop, policy, breakers)
+        
+        assert shop.requests == 1
+        policy.sleep.assert_not_awaited()
+    
+    def test_retry_after_http_date(self):
+        """Test Retry-After given as an HTTP date"""
+        assert parse_retry_after(formatdate(1000030, usegmt=True), now=1000000) == 30
+        assert parse_retry_after("soon") is None
+    
+    async def test_parse_miss_is_not_refetched(self):
+        """Test a page without a price is downloaded once"""
+        with patch("httpx.AsyncClient.send", serve("<html><h1>New layout</h1></html>")) as mock_send:
+            result = await ScraperService(breakers=CircuitBreakers())._scrape_amazon("https://www.amazon.com.br/dp/1")
+        
+        assert result is None
+        assert mock_send.call_count == 1
+
+
+class TestCircuitBreaker:
+    """Tests for per-domain load shedding"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the breaker opens at the threshold and a success resets the count"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60, clock=FakeClock())
+        
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+    
+    def test_half_open_probe(self):
+        """Test one probe after the reset time decides whether to close"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60, clock=clock)
+        breaker.record_failure()
+        
+        clock.now = 61
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        
+        clock.now = 122
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+    
+    def test_breakers_are_per_domain(self):
+        """Test one failing retailer doesn't shed another"""
+        breakers = CircuitBreakers(failure_threshold=1)
+        breakers.for_url("https://shop-a.example/1").record_failure()
+        
+        assert not breakers.for_url("https://shop-a.example/2").allow()
+        assert breakers.for_url("https://shop-b.example/1").allow()
+        assert breakers.states() == {"shop-a.example": OPEN, "shop-b.example": CLOSED}
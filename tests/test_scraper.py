@@ -1,8 +1,14 @@
+import httpx
 import pytest
 from unittest.mock import patch, AsyncMock
 from app.services.scraper import ScraperService
 
 
+def serve(html: str) -> AsyncMock:
+    """AsyncClient.send replacement answering every request with the page"""
+    return AsyncMock(side_effect=lambda request, **kwargs: httpx.Response(200, text=html, request=request))
+
+
 class TestScraperService:
     """Tests for scraping service"""
     
@@ -20,12 +26,7 @@ class TestScraperService:
         </html>
         """
         
-        with patch("httpx.AsyncClient.get") as mock_get:
-            mock_response = AsyncMock()
-            mock_response.text = mock_html
-            mock_response.raise_for_status = AsyncMock()
-            mock_get.return_value = mock_response
-            
+        with patch("httpx.AsyncClient.send", serve(mock_html)):
             result = await scraper._scrape_mercadolivre(
                 "https://www.mercadolivre.com.br/product"
             )
@@ -38,7 +39,7 @@ class TestScraperService:
     @pytest.mark.asyncio
     async def test_scrape_price_invalid_url(self, scraper):
         """Test scraping with connection error"""
-        with patch("httpx.AsyncClient.get", side_effect=Exception("Connection error")):
+        with patch("httpx.AsyncClient.send", side_effect=Exception("Connection error")):
             result = await scraper.scrape_price("https://invalid-url.com/product")
             
             assert result is None
@@ -53,12 +54,7 @@ class TestScraperService:
         </html>
         """
         
-        with patch("httpx.AsyncClient.get") as mock_get:
-            mock_response = AsyncMock()
-            mock_response.text = mock_html
-            mock_response.raise_for_status = AsyncMock()
-            mock_get.return_value = mock_response
-            
+        with patch("httpx.AsyncClient.send", serve(mock_html)):
             result = await scraper._scrape_generic("https://example.com/product")
             
             assert result is not None
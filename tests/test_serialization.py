@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.domain.models import Product, PriceHistory, PriceAlert
+from app.domain.schemas import ProductResponse, PriceHistoryResponse, PriceAlertResponse
+
+
+def _pydantic_json(schema, objects) -> bytes:
+    """What response_model validation of ORM objects produces"""
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+
+def _legacy_body(schema, objects) -> list:
+    """What the endpoints returned before the fast path"""
+    return jsonable_encoder([schema.model_validate(obj) for obj in objects])
+
+
+@pytest.fixture
+def mixed_products(db_session, test_user):
+    created = datetime(2026, 3, 4, 5, 6, 7, 890123)
+    products = [
+        Product(user_id=test_user.id, name="Café ☕ “special”", url="https://example.com/cafe",
+                current_price=1299.9, last_checked=created, is_active=True, created_at=created),
+        Product(user_id=test_user.id, name="No price yet", url="https://example.com/new?q=1&x=2",
+                current_price=None, last_checked=None, is_active=False, created_at=created.replace(microsecond=0)),
+    ]
+    db_session.add_all(products)
+    db_session.commit()
+    for product in products:
+        db_session.add_all([
+            PriceHistory(product_id=product.id, price=10.0 + i * 0.1, timestamp=created + timedelta(minutes=i))
+            for i in range(5)
+        ])
+        db_session.add(PriceAlert(user_id=test_user.id, product_id=product.id, target_price=9.99, created_at=created))
+    db_session.commit()
+    return products
+
+
+class TestFastSerialization:
+    """Tests that the column-only fast path matches the Pydantic schemas"""
+    
+    def test_list_products_identical(self, client, auth_headers, db_session, mixed_products):
+        """Test product list bytes equal schema-validated output"""
+        response = client.get("/api/v1/products/", headers=auth_headers)
+        
+        objects = db_session.query(Product).order_by(Product.id).all()
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == _pydantic_json(ProductResponse, objects)
+        assert response.json() == _legacy_body(ProductResponse, objects)
+    
+    def test_price_history_identical(self, client, auth_headers, db_session, mixed_products):
+        """Test history page bytes equal schema-validated output"""
+        product = mixed_products[0]
+        
+        response = client.get(f"/api/v1/products/{product.id}/history", headers=auth_headers)
+        
+        objects = db_session.query(PriceHistory).filter(
+            PriceHistory.product_id == product.id
+        ).order_by(PriceHistory.timestamp.desc()).all()
+        assert response.content == _pydantic_json(PriceHistoryResponse, objects)
+        assert response.json() == _legacy_body(PriceHistoryResponse, objects)
+    
+    def test_list_alerts_identical(self, client, auth_headers, db_session, mixed_products):
+        """Test alert list bytes equal schema-validated output"""
+        response = client.get("/api/v1/alerts/", headers=auth_headers)
+        
+        objects = db_session.query(PriceAlert).order_by(PriceAlert.id).all()
+        assert response.content == _pydantic_json(PriceAlertResponse, objects)
+        assert response.json() == _legacy_body(PriceAlertResponse, objects)
+    
+    def test_empty_list(self, client, auth_headers):
+        """Test an empty page is an empty JSON array"""
+        response = client.get("/api/v1/alerts/", headers=auth_headers)
+        
+        assert response.content == b"[]"
@@ -0,0 +1,195 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import status
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from app.core.metrics import SCRAPE_BUCKETS
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.services.sites import AdapterMetrics, SiteRegistry, load_sites, registered_domain, site_registry
+
+
+def scrape_registry(scrapes) -> CollectorRegistry:
+    """Registry holding the scraper's metrics for (site, outcome, seconds) scrapes of 1000 bytes"""
+    registry = CollectorRegistry()
+    results = Counter("scrape_results", "Scrape outcomes", ["site", "outcome"], registry=registry)
+    seconds = Histogram("scrape_duration_seconds", "Whole scrape", ["site"], buckets=SCRAPE_BUCKETS, registry=registry)
+    downloaded = Counter("scrape_downloaded_bytes", "Bytes downloaded", ["site"], registry=registry)
+    for site, outcome, duration in scrapes:
+        results.labels(site, outcome).inc()
+        seconds.labels(site).observe(duration)
+        downloaded.labels(site).inc(1000)
+    return registry
+
+
+def serve(html: str) -> AsyncMock:
+    """AsyncClient.send replacement answering every request with the page"""
+    return AsyncMock(side_effect=lambda request, **kwargs: httpx.Response(200, text=html, request=request))
+
+
+class TestSiteRegistry:
+    """Tests for dispatching URLs to site adapters"""
+    
+    @pytest.mark.parametrize("hostname, expected", [
+        ("www.mercadolivre.com.br", "mercadolivre.com.br"),
+        ("produto.mercadolivre.com.br", "mercadolivre.com.br"),
+        ("www.amazon.com", "amazon.com"),
+        ("example.co.uk", "example.co.uk"),
+        ("localhost", "localhost"),
+    ])
+    def test_registered_domain(self, hostname, expected):
+        """Test subdomains collapse to the registered domain"""
+        assert registered_domain(hostname) == expected
+    
+    @pytest.mark.parametrize("url, adapter", [
+        ("https://www.mercadolivre.com.br/p/MLB1", "mercadolivre"),
+        ("https://produto.mercadolivre.com.br/MLB-1", "mercadolivre"),
+        ("https://www.mercadolibre.com.ar/p/MLA1", "mercadolivre"),
+        ("https://www.amazon.com.br/dp/B0", "amazon"),
+        ("https://www.amazon.com/dp/B0", "amazon"),
+        ("https://shop.example.com/product", "generic"),
+        ("https://mercadolivre.com.br.example.com/p/1", "generic"),
+    ])
+    def test_dispatch(self, url, adapter):
+        """Test each URL goes to its site's adapter, unknown sites to the generic one"""
+        assert site_registry.for_url(url).name == adapter
+    
+    def test_sites_from_config_file(self, tmp_path):
+        """Test adapters can be added and overridden with a JSON file"""
+        path = tmp_path / "sites.json"
+        path.write_text(json.dumps([
+            {
+                "name": "shop",
+                "source": "Shop",
+                "domains": ["shop.example.com.br"],
+                "price": [{"css": "meta[itemprop=price]", "attr": "content"}],
+                "title": [{"css": "h2.name"}]
+            },
+            {"name": "amazon", "domains": ["amazon.de"], "price": [{"css": "span.preis"}]}
+        ]))
+        registry = SiteRegistry(load_sites(str(path)))
+        
+        adapter = registry.for_url("https://www.shop.example.com.br/item/1")
+        result = adapter.parse('<meta itemprop="price" content="19.90"><h2 class="name">Mug</h2>')
+        
+        assert (result["price"], result["title"], result["source"]) == (19.9, "Mug", "Shop")
+        assert registry.for_url("https://www.amazon.de/dp/1").name == "amazon"
+        assert registry.for_url("https://www.amazon.com/dp/1").name == "generic"
+
+
+class TestSiteAdapters:
+    """Tests for the built-in adapters' selectors"""
+    
+    def test_mercadolivre_meta_price(self):
+        """Test the og:price meta tag is read when no price span exists"""
+        html = '<meta property="og:price:amount" content="349"><h1>Fone</h1>'
+        
+        result = site_registry.get("mercadolivre").parse(html)
+        
+        assert (result["price"], result["title"]) == (349.0, "Fone")
+    
+    def test_mercadolivre_class_pattern(self):
+        """Test price spans are also matched by class pattern"""
+        html = '<span class="ui-price__fraction">52</span>'
+        
+        assert site_registry.get("mercadolivre").parse(html)["price"] == 52.0
+    
+    def test_amazon(self):
+        """Test the Amazon price and title selectors"""
+        html = '<span id="productTitle"> Kindle </span><span class="a-price-whole">499</span>'
+        
+        result = site_registry.get("amazon").parse(html)
+        
+        assert (result["price"], result["title"], result["source"]) == (499.0, "Kindle", "Amazon")
+    
+    def test_mercadolivre_cents_span(self):
+        """Test the cents span beside the fraction is added and the currency read"""
+        html = (
+            '<div class="andes-money-amount">'
+            '<span class="andes-money-amount__currency-symbol">R$</span>'
+            '<span class="andes-money-amount__fraction">1.299</span>'
+            '<span class="andes-money-amount__cents">90</span></div>'
+        )
+        
+        result = site_registry.get("mercadolivre").parse(html)
+        
+        assert (result["price"], result["currency"]) == (1299.90, "BRL")
+    
+    def test_amazon_split_price(self):
+        """Test Amazon's whole and fraction spans make one price"""
+        html = (
+            '<span class="a-price"><span class="a-price-symbol">US$</span>'
+            '<span class="a-price-whole">1,299<span class="a-price-decimal">.</span></span>'
+            '<span class="a-price-fraction">99</span></span>'
+        )
+        
+        result = site_registry.get("amazon").parse(html)
+        
+        assert (result["price"], result["currency"]) == (1299.99, "USD")
+    
+    def test_generic_brazilian_format(self):
+        """Test thousands separators no longer break the generic adapter"""
+        html = "<html><h1>TV</h1><p>Modelo 2024, 55 polegadas</p><p>R$ 1.299,90</p></html>"
+        
+        result = site_registry.generic.parse(html)
+        
+        assert (result["price"], result["currency"]) == (1299.90, "BRL")
+    
+    def test_generic_ignores_bare_numbers(self):
+        """Test a bare number without cents is not taken for a price"""
+        assert site_registry.generic.parse("<html><p>Modelo 2024, 55 polegadas</p></html>") is None
+        assert site_registry.generic.parse("<html><p>Apenas 49,90</p></html>")["price"] == 49.90
+    
+    def test_no_price(self):
+        """Test pages without a price give None"""
+        assert site_registry.get("amazon").parse("<html><h1>Gone</h1></html>") is None
+
+
+class TestAdapterMetrics:
+    """Tests for per-adapter scrape metrics"""
+    
+    async def test_scrapes_are_recorded(self):
+        """Test outcomes and latency are counted per adapter"""
+        scraper = ScraperService(breakers=CircuitBreakers())
+        amazon = site_registry.get("amazon")
+        before = AdapterMetrics().summary(amazon)
+        
+        with patch("httpx.AsyncClient.send", serve('<span class="a-price-whole">10</span>')):
+            await scraper.scrape_price("https://www.amazon.com.br/dp/1")
+        with patch("httpx.AsyncClient.send", serve("<html></html>")):
+            await scraper.scrape_price("https://www.amazon.com.br/dp/2")
+        with patch("httpx.AsyncClient.send", side_effect=Exception("Connection error")):
+            await scraper.scrape_price("https://www.amazon.com.br/dp/3")
+        
+        after = AdapterMetrics().summary(amazon)
+        assert [after[key] - before[key] for key in ("requests", "success", "miss", "failure")] == [3, 1, 1, 1]
+        assert after["p95_latency_ms"] is not None
+    
+    def test_summary(self):
+        """Test rates, averages and bucket percentiles from the Prometheus samples"""
+        registry = scrape_registry([("mercadolivre", "success", 0.12), ("mercadolivre", "miss", 0.7)])
+        
+        summary = AdapterMetrics(registry).summary(site_registry.get("mercadolivre"))
+        
+        assert (summary["requests"], summary["success"], summary["miss"]) == (2, 1, 1)
+        assert summary["success_rate"] == 0.5
+        assert summary["avg_latency_ms"] == pytest.approx(410.0)
+        assert (summary["p50_latency_ms"], summary["p95_latency_ms"]) == (250.0, 1000.0)
+        assert summary["avg_bytes"] == 1000
+    
+    def test_endpoint(self, client, auth_headers):
+        """Test the metrics endpoint lists every adapter"""
+        registry = scrape_registry([("mercadolivre", "success", 0.12)])
+        
+        with patch("app.services.sites.metrics_registry", return_value=registry):
+            response = client.get("/api/v1/monitor/adapters", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        adapters = {adapter["name"]: adapter for adapter in response.json()["adapters"]}
+        assert set(adapters) == {"mercadolivre", "amazon", "generic"}
+        assert adapters["mercadolivre"]["requests"] == 1
+        assert adapters["mercadolivre"]["p50_latency_ms"] == 250.0
+        assert adapters["amazon"]["success_rate"] is None
@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.domain.models import PriceHistory, ProductPriceAggregate
+from app.services.dashboard import dashboard_cache_key
+from app.services.scraper import ScraperService
+from app.services.snapshots import SnapshotStore, content_hash, reparse_snapshots
+
+PAGE = b"<html><body>" + b"<div class='row'>Some product details</div>" * 200 + b"</body></html>"
+
+
+def serve(html: str) -> AsyncMock:
+    """AsyncClient.send replacement answering every request with the page"""
+    return AsyncMock(side_effect=lambda request, **kwargs: httpx.Response(200, text=html, request=request))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots"))
+
+
+def fixed_parser(url: str, html: str):
+    """Stands in for a parser whose selectors were fixed"""
+    return {"price": 77.7, "title": "Fixed", "timestamp": datetime.utcnow(), "source": "Generic"}
+
+
+class TestSnapshotStore:
+    """Tests for the content-addressed page store"""
+    
+    def test_dedup_and_compression(self, store):
+        """Test identical pages are stored once, compressed"""
+        store.record("https://example.com/a", PAGE, ok=True)
+        store.record("https://example.com/a", PAGE, ok=False)
+        store.record("https://example.com/b", PAGE, ok=True)
+        
+        assert list(store._object_files()) == [store.object_path(content_hash(PAGE))]
+        assert store.size() < len(PAGE) / 10
+        assert [snapshot.ok for snapshot in store.history("https://example.com/a")] == [True, False]
+        assert store.get(content_hash(PAGE)) == PAGE
+    
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test the oldest objects and their fetches go once over the limit"""
+        pages = [os.urandom(2000) for _ in range(3)]
+        store = SnapshotStore(str(tmp_path / "snapshots"), max_bytes=5000)
+        digests = [store.record(f"https://example.com/{n}", page, ok=True) for n, page in enumerate(pages[:2])]
+        os.utime(store.object_path(digests[0]), (1, 1))
+        os.utime(store.object_path(digests[1]), (2, 2))
+        # A dedup hit makes the first page the most recently used
+        store.record("https://example.com/0", pages[0], ok=True)
+        
+        store.record("https://example.com/2", pages[2], ok=True)
+        
+        assert store.get(digests[1]) is None
+        assert store.get(digests[0]) == pages[0]
+        assert store.size() <= 5000 * 0.9
+        assert store.history("https://example.com/1") == []
+    
+    def test_limit_holds_across_processes(self, tmp_path):
+        """Test stores sharing a directory see each other's writes before evicting"""
+        root = str(tmp_path / "snapshots")
+        workers = [SnapshotStore(root, max_bytes=20000) for _ in range(3)]
+        for worker in workers:
+            worker.size()
+        
+        for n in range(30):
+            workers[n % 3].record(f"https://example.com/{n}", os.urandom(1000), ok=True)
+        
+        assert SnapshotStore(root).size() <= 20000
+
+
+class TestScraperSnapshots:
+    """Tests for snapshots taken while scraping"""
+    
+    async def test_parse_miss_is_not_refetched(self, store):
+        """Test a page without a price is stored once instead of downloaded again"""
+        url = "https://www.mercadolivre.com.br/product"
+        
+        with patch("httpx.AsyncClient.send", serve("<html><h1>New layout</h1></html>")) as mock_send:
+            result = await ScraperService(snapshots=store).scrape_price(url)
+        
+        assert result is None
+        assert mock_send.call_count == 1
+        assert [snapshot.ok for snapshot in store.history(url)] == [False]
+
+
+class TestReparse:
+    """Tests for recovering prices from stored pages"""
+    
+    def test_backfills_missed_window(self, db_session, store, test_product):
+        """Test missed fetches become history at their fetch time, once"""
+        fetched_at = [datetime(2026, 10, 1, hour) for hour in (1, 2, 3)]
+        for at in fetched_at:
+            store.record(test_product.url, b"<html>new layout</html>", ok=False, at=at)
+        store.record(test_product.url, b"<html>old layout</html>", ok=True, at=fetched_at[-1] + timedelta(hours=1))
+        test_product.created_at = datetime(2026, 9, 1)
+        db_session.add(ProductPriceAggregate(product_id=test_product.id, observations=1))
+        db_session.commit()
+        
+        result = reparse_snapshots(db_session, store, parse=fixed_parser)
+        
+        assert result == {"recovered": 3, "failed": 0, "products": 1}
+        history = db_session.query(PriceHistory).order_by(PriceHistory.timestamp).all()
+        assert [(row.timestamp, row.price) for row in history] == [(at, 77.7) for at in fetched_at]
+        assert db_session.query(ProductPriceAggregate).count() == 0
+        assert all(snapshot.ok for snapshot in store.history(test_product.url))
+        
+        assert reparse_snapshots(db_session, store, parse=fixed_parser)["recovered"] == 0
+    
+    def test_time_window(self, db_session, store, test_product):
+        """Test only fetches inside the window are re-parsed"""
+        for hour in range(5):
+            store.record(test_product.url, b"<html></html>", ok=False, at=datetime(2026, 10, 1, hour))
+        test_product.created_at = datetime(2026, 9, 1)
+        db_session.commit()
+        
+        result = reparse_snapshots(
+            db_session, store, since=datetime(2026, 10, 1, 1), until=datetime(2026, 10, 1, 3), parse=fixed_parser
+        )
+        
+        assert result["recovered"] == 2
+    
+    def test_skips_fetches_before_the_product_existed(self, db_session, store, test_product):
+        """Test a page fetched for another product with the same URL is not backfilled"""
+        store.record(test_product.url, b"<html></html>", ok=False, at=datetime(2026, 9, 1))
+        store.record(test_product.url, b"<html></html>", ok=False, at=datetime(2026, 10, 2))
+        test_product.created_at = datetime(2026, 10, 1)
+        db_session.commit()
+        
+        reparse_snapshots(db_session, store, parse=fixed_parser)
+        
+        assert [row.timestamp for row in db_session.query(PriceHistory)] == [datetime(2026, 10, 2)]
+    
+    def test_invalidates_owner_dashboard(self, db_session, cache, store, test_product):
+        """Test backfilled prices drop the owner's cached dashboard"""
+        store.record(test_product.url, b"<html></html>", ok=False, at=datetime(2026, 10, 1))
+        test_product.created_at = datetime(2026, 9, 1)
+        db_session.commit()
+        cache.set(dashboard_cache_key(test_product.user_id), {"stale": True})
+        
+        reparse_snapshots(db_session, store, parse=fixed_parser, cache=cache)
+        
+        assert not cache.exists(dashboard_cache_key(test_product.user_id))
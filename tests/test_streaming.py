@@ -0,0 +1,167 @@
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.retry import CircuitBreakers
+from app.services.scraper import ScraperService
+from app.services.sites import site_registry
+from app.services.streaming import read_page
+
+FILLER = b"<div class='review'>" + b"Muito bom, chegou antes do prazo. " * 30 + b"</div>\n"
+
+PRICE = (
+    b'<h1 class="ui-pdp-title">Notebook Gamer</h1>'
+    b'<div class="andes-money-amount"><span class="andes-money-amount__currency-symbol">R$</span>'
+    b'<span class="andes-money-amount__fraction">4.299</span>'
+    b'<span class="andes-money-amount__cents">90</span></div>\n'
+)
+
+
+def page(size: int, price_at: float, head: bytes = b"") -> bytes:
+    """Product page of about size bytes with the price block at the given fraction of it"""
+    blocks = size // len(FILLER)
+    before = int(blocks * price_at)
+    return b"".join([
+        b"<html><head>", head, b"</head><body>", FILLER * before, PRICE, FILLER * (blocks - before), b"</body></html>"
+    ])
+
+
+class PageServer:
+    """Local server sending its pages in small chunks"""
+    
+    def __init__(self, pages):
+        self.pages = pages
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.pages[self.path]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    for start in range(0, len(body), 16 * 1024):
+                        self.wfile.write(body[start:start + 16 * 1024])
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    pages = {
+        "/early": page(4 * 1024 * 1024, 0.001),
+        "/late": page(1024 * 1024, 1.0),
+        "/huge": page(4 * 1024 * 1024, 0.999),
+        "/meta-first": page(
+            512 * 1024, 0.5, head=b'<meta property="og:price:amount" content="3999">'
+        ),
+    }
+    page_server = PageServer(pages)
+    yield page_server
+    page_server.close()
+
+
+async def stream(url: str, max_bytes: int = 8 * 1024 * 1024):
+    adapter = site_registry.get("mercadolivre")
+    async with httpx.AsyncClient() as client:
+        async with client.stream("GET", url) as response:
+            return await read_page(response, adapter, max_bytes)
+
+
+async def measure_peak(coro):
+    """Run a coroutine and return its result and peak traced memory"""
+    tracemalloc.start()
+    try:
+        result = await coro
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class TestReadPage:
+    """Tests for reading product pages incrementally"""
+    
+    async def test_stops_once_price_is_in(self, server):
+        """Test a 4 MB page with the price near the top is only partly downloaded"""
+        read, peak = await measure_peak(stream(f"{server.base}/early"))
+        
+        assert (read.result["price"], read.result["title"], read.result["currency"]) == (4299.90, "Notebook Gamer", "BRL")
+        assert not read.complete
+        assert read.bytes_read < 256 * 1024
+        assert peak < 2 * 1024 * 1024
+    
+    async def test_uses_less_memory_than_full_read(self, server):
+        """Test streaming peaks far below reading the whole body"""
+        async def full_read():
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{server.base}/early")
+                return site_registry.get("mercadolivre").parse(response.text)
+        
+        full, full_peak = await measure_peak(full_read())
+        read, stream_peak = await measure_peak(stream(f"{server.base}/early"))
+        
+        assert read.result["price"] == full["price"]
+        assert stream_peak * 4 < full_peak
+    
+    async def test_price_at_the_end(self, server):
+        """Test the whole body is read when the price comes last"""
+        read = await stream(f"{server.base}/late")
+        
+        assert read.result["price"] == 4299.90
+        assert read.bytes_read == len(server.pages["/late"])
+    
+    async def test_max_bytes_cap(self, server):
+        """Test reading stops at the cap even without a price"""
+        read = await stream(f"{server.base}/huge", max_bytes=256 * 1024)
+        
+        assert read.result is None
+        assert read.truncated
+        assert len(read.html) <= 256 * 1024
+        assert read.bytes_read < 512 * 1024
+    
+    async def test_lower_priority_selector_does_not_stop_early(self, server):
+        """Test an early og:price meta doesn't win over the price span further down"""
+        read = await stream(f"{server.base}/meta-first")
+        
+        assert read.result["price"] == 4299.90
+    
+    def test_cut_off_price_is_not_trusted(self):
+        """Test a price element cut by the end of the received bytes gives no result"""
+        adapter = site_registry.get("mercadolivre")
+        html = PRICE.decode()
+        cut = html.index("4.299") + 3
+        
+        assert adapter.parse_prefix(html[:cut]) is None
+        assert adapter.parse_prefix(html + "<div>")["price"] == 4299.90
+
+
+class TestScraperStreaming:
+    """Tests for bytes read per scrape"""
+    
+    async def test_bytes_per_scrape_are_recorded(self, server, cache):
+        """Test the scraper streams pages and records how much it downloaded"""
+        scraper = ScraperService(snapshots=None, breakers=CircuitBreakers())
+        adapter = site_registry.get("mercadolivre")
+        before = REGISTRY.get_sample_value("scrape_downloaded_bytes_total", {"site": "mercadolivre"}) or 0.0
+        
+        result = await scraper.scrape_with(adapter, f"{server.base}/early")
+        
+        assert result["price"] == 4299.90
+        downloaded = REGISTRY.get_sample_value("scrape_downloaded_bytes_total", {"site": "mercadolivre"}) - before
+        assert 0 < downloaded < 256 * 1024